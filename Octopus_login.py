@@ -5,6 +5,12 @@ from datetime import datetime, timedelta
 import logging
 import email_reader_attachment_download  # <-- Script2
 import report_generator                 # <-- Script3
+import request_planner
+import compaction
+import browser_routing
+from work_leases import CLAIMED, LeaseSession, shard_ids
+from instrumentation import annotate, span, timed
+from vehicle_registry import get_registry
 import tkinter as tk
 import time
 
@@ -12,6 +18,11 @@ import time
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+DEFAULT_OCTOPUS_URL = "https://octopus.eulerlogistics.com/"  # OCTO_URL (environment or .env) overrides, e.g. benchmarks/local_octopus.py
+BROWSER_SLOW_MO_MS = 200  # Delay Playwright adds before each action
+SUBMIT_SETTLE_MS = 5000  # Wait after Submit before the browser is closed
+PHASE1_LEASE_STAGE = "phase1.request"  # work_leases stage: one Shepherd submission per vehicle across runs / hosts
+
 
 # -------------------- Countdown GUI --------------------
 class CountdownGUI:
@@ -62,14 +73,15 @@ class OctopusReportTester:
         load_dotenv()
         self.username = os.getenv("OCTO_USER")
         self.password = os.getenv("OCTO_PASS")
-        self.base_url = "https://octopus.eulerlogistics.com/"
+        self.base_url = os.getenv("OCTO_URL", DEFAULT_OCTOPUS_URL)
         if not self.username or not self.password:
             raise ValueError("Missing credentials in environment variables")
 
     def login(self, page):
         logger.info("Logging in...")
-        page.goto(self.base_url)
-        page.wait_for_selector("input[name='username']", timeout=10000)
+        with span("phase1.page_load"):
+            page.goto(self.base_url)
+            page.wait_for_selector("input[name='username']", timeout=10000)
         page.fill("input[name='username']", self.username)
         page.fill("input[name='password']", self.password)
         page.click("button[type='submit']")
@@ -152,55 +164,75 @@ class OctopusReportTester:
         submit_button.click()
         logger.info("Submit clicked successfully")
 
+    @timed("phase1.run_full_test", vehicle="registration_no")
     def run_full_test(self, registration_no, start_date, end_date, headless=False):
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=headless, slow_mo=200)
-            page = browser.new_page()
-            page.set_extra_http_headers({'User-Agent': 'Mozilla/5.0'})
+            with span("phase1.launch_browser"):
+                browser = p.chromium.launch(headless=headless, slow_mo=BROWSER_SLOW_MO_MS)
+                context = browser.new_context()
+                # Abort images / fonts / analytics / map tiles, reuse scripts across vehicles
+                policy = browser_routing.RoutePolicy() if browser_routing.ROUTE_FILTER else None
+                stats = browser_routing.install(context, policy=policy)
+                page = context.new_page()
+                page.set_extra_http_headers({'User-Agent': 'Mozilla/5.0'})
             try:
-                self.login(page)
-                self.search_vehicle(page, registration_no)
-                self.open_shepherd_dialog(page)
-                self.select_start_date(page, start_date)
-                self.select_end_date(page, end_date)
-                self.submit_report(page)
+                with span("phase1.login"):
+                    self.login(page)
+                with span("phase1.search_vehicle"):
+                    self.search_vehicle(page, registration_no)
+                with span("phase1.open_shepherd_dialog"):
+                    self.open_shepherd_dialog(page)
+                with span("phase1.select_start_date"):
+                    self.select_start_date(page, start_date)
+                with span("phase1.select_end_date"):
+                    self.select_end_date(page, end_date)
+                with span("phase1.submit_report"):
+                    self.submit_report(page)
                 logger.info("✅ Shepherd automation completed successfully")
-                page.wait_for_timeout(5000)
+                page.wait_for_timeout(SUBMIT_SETTLE_MS)
             finally:
+                annotate(route_filter=policy is not None, **stats.as_attrs())
+                logger.info(f"Network: {stats.requests} request(s), {stats.blocked} blocked, {stats.cached} from cache, "
+                            f"{stats.bytes / 1e6:.2f} MB transferred")
                 browser.close()
 
 
 # -------------------- Vehicle List Reader --------------------
 def read_vehicle_list(filename="vehicle_list.txt"):
+    """Active vehicles from the registry as (reg_no, start datetime) pairs."""
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(base_dir, filename)
-    vehicles = []
-    with open(file_path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                reg_no, start_date = line.split(",", 1)
-                reg_no = reg_no.strip()
-                start_date = start_date.replace("Start date", "").strip()
-                start_date_obj = datetime.strptime(start_date, "%d%b%Y")
-                vehicles.append((reg_no, start_date_obj))
-            except Exception as e:
-                logger.warning(f"Skipping invalid line: {line} ({e})")
-    return vehicles
+    registry = get_registry(os.path.join(base_dir, filename))
+    return [(v.reg_no, datetime.combine(v.start_date, datetime.min.time())) for v in registry.active()]
 
 
 # -------------------- Main Flow --------------------
 def main():
     tester = OctopusReportTester()
     end_date = datetime.now() - timedelta(days=1)
-    vehicles = read_vehicle_list("vehicle_list.txt")
 
-    # Phase 1: Shepherd Automation
-    for reg_no, start_date in vehicles:
-        logger.info(f"Processing {reg_no}: {start_date.strftime('%d-%b-%Y')} → {end_date.strftime('%d-%b-%Y')}")
-        tester.run_full_test(reg_no, start_date, end_date, headless=False)
+    # Phase 1: Shepherd Automation — only the date ranges not already downloaded
+    # A vehicle held by a concurrent run, or whose same ranges another run already submitted, is skipped
+    ledger = request_planner.RequestLedger()
+    submitted = {}  # vehicle -> VehiclePlan whose ranges were requested this run
+    registry = get_registry()
+    in_shard = set(shard_ids(registry.active_ids()))
+    vehicles = [v for v in registry.active() if v.reg_no in in_shard]
+    with LeaseSession(PHASE1_LEASE_STAGE) as leases:
+        for plan in request_planner.plan_fleet(vehicles, end=end_date.date(), ledger=ledger):
+            if plan.up_to_date:
+                logger.info(f"Skipping {plan.vehicle}: up to date ({len(plan.covered)} day(s) present)")
+                continue
+            requested = repr(plan.ranges)
+            if leases.acquire(plan.vehicle, requested) != CLAIMED:
+                logger.info(f"Skipping {plan.vehicle}: requested by another run")
+                continue
+            for first, last in plan.ranges:
+                start_date = datetime.combine(first, datetime.min.time())
+                range_end = datetime.combine(last, datetime.min.time())
+                logger.info(f"Processing {plan.vehicle}: {start_date.strftime('%d-%b-%Y')} → {range_end.strftime('%d-%b-%Y')}")
+                tester.run_full_test(plan.vehicle, start_date, range_end, headless=False)
+            submitted[plan.vehicle] = plan
+            leases.complete(plan.vehicle, requested)
 
     # Countdown before Script2
     logger.info("Waiting before starting email fetch...")
@@ -211,15 +243,30 @@ def main():
 
     # Phase 2: Email Reports Fetch
     logger.info("Starting Phase 2: Fetching reports from email...")
-    email_reader_attachment_download.fetch_reports_for_all_vehicles()
+    email_days = email_reader_attachment_download.fetch_reports_for_all_vehicles()
     logger.info("✅ All email reports fetched successfully.")
 
+    # Count request attempts only for ranges whose email was processed in Phase 2 (one email per
+    # range); days that arrived leave the ledger, the rest move toward MAX_REQUESTS_PER_DAY
+    for vehicle, plan in submitted.items():
+        seen = set().union(*email_days.get(vehicle, []))
+        answered = [(first, last) for first, last in plan.ranges if any(first <= d <= last for d in seen)]
+        if answered:
+            ledger.record(vehicle, answered, request_planner.local_coverage(vehicle))
+        if len(answered) < len(plan.ranges):
+            logger.info(f"{vehicle}: {len(plan.ranges) - len(answered)} requested range(s) without a processed email "
+                        f"— not counted as attempts")
+    ledger.save()
+
     # Phase 3: Report Generator
     logger.info("Starting Phase 3: Generating consolidated reports...")
     # Call Script3 function with optional GUI
     report_generator.generate_all_reports(show_gui=True)
     logger.info("✅ All consolidated reports generated successfully.")
 
+    # Fold old exports into monthly archives and apply raw retention
+    compaction.compact_all()
+
 
 if __name__ == "__main__":
     main()
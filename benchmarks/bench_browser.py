@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Phase 1 page loads with and without request interception.
+Each "vehicle" is one fresh browser, as in OctopusReportTester.run_full_test,
+loading the Octopus page until the network is idle. Per mode it reports
+load time and bytes transferred per vehicle:
+
+    off           no route, Playwright defaults
+    filter        browser_routing policy, no asset cache
+    filter+cache  policy plus the process-wide asset cache (what Phase 1 runs)
+
+Offline, point --url at benchmarks/local_octopus.py.
+
+    python benchmarks/bench_browser.py [--url https://octopus.eulerlogistics.com/] [--vehicles 5]
+                                       [--modes off,filter,filter+cache] [--out results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import browser_routing  # noqa: E402
+from bench_pipeline import RESULTS_DIR, git_commit  # noqa: E402
+
+DEFAULT_URL = "https://octopus.eulerlogistics.com/"
+MODES = ("off", "filter", "filter+cache")
+
+
+def load_once(p, url, mode, cache):
+    browser = p.chromium.launch(headless=True)
+    try:
+        context = browser.new_context()
+        if mode == "off":
+            stats = browser_routing.install(context, policy=None)
+        else:
+            stats = browser_routing.install(context, cache=cache if mode == "filter+cache"
+                                            else browser_routing.AssetCache(types=()))
+        page = context.new_page()
+        started = time.perf_counter()
+        page.goto(url)
+        page.wait_for_load_state("networkidle")
+        seconds = time.perf_counter() - started
+        return seconds, stats
+    finally:
+        browser.close()
+
+
+def run(args):
+    from playwright.sync_api import sync_playwright
+    results = {}
+    with sync_playwright() as p:
+        for mode in args.modes.split(","):
+            cache = browser_routing.AssetCache()  # Fresh per mode, shared across its vehicles
+            loads = [load_once(p, args.url, mode, cache) for _ in range(args.vehicles)]
+            seconds = [s for s, _ in loads]
+            results[mode] = {
+                "vehicles": len(loads),
+                "load_s_mean": round(statistics.mean(seconds), 3),
+                "load_s_first": round(seconds[0], 3),
+                "load_s_rest": round(statistics.mean(seconds[1:]), 3) if len(seconds) > 1 else None,
+                "bytes_per_vehicle": round(statistics.mean(st.bytes for _, st in loads)),
+                "requests_per_vehicle": round(statistics.mean(st.requests for _, st in loads), 1),
+                "blocked_per_vehicle": round(statistics.mean(st.blocked for _, st in loads), 1),
+                "cached_per_vehicle": round(statistics.mean(st.cached for _, st in loads), 1),
+            }
+    return results
+
+
+def print_results(results):
+    print(f"{'mode':<14} {'load s':>8} {'first':>7} {'rest':>7} {'MB/veh':>8} {'req':>6} {'blocked':>8} {'cached':>7}")
+    for mode, r in results.items():
+        rest = f"{r['load_s_rest']:.2f}" if r["load_s_rest"] is not None else "-"
+        print(f"{mode:<14} {r['load_s_mean']:>8.2f} {r['load_s_first']:>7.2f} {rest:>7} "
+              f"{r['bytes_per_vehicle'] / 1e6:>8.2f} {r['requests_per_vehicle']:>6} "
+              f"{r['blocked_per_vehicle']:>8} {r['cached_per_vehicle']:>7}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default=DEFAULT_URL)
+    ap.add_argument("--vehicles", type=int, default=5, help="fresh browsers (page loads) per mode")
+    ap.add_argument("--modes", default=",".join(MODES))
+    ap.add_argument("--out", help="results JSON (default benchmarks/results/browser_<timestamp>.json)")
+    args = ap.parse_args()
+
+    results = run(args)
+    print_results(results)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"browser_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(out, "w") as f:
+        json.dump({"commit": git_commit(), "url": args.url, "results": results}, f, indent=2)
+    print(f"Results written to {out}", file=sys.stderr)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: embedded chart size and render+encode time per image setting,
+against the legacy full-colour PNG at dpi=120. Overlapping exports are
+simulated by repeating some days, which the pipeline encodes only once.
+
+    python benchmarks/bench_chart_images.py [--days 30] [--duplicates 10]
+"""
+
+import os
+import sys
+import time
+import argparse
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report_charts  # noqa: E402
+from docx_template import assemble_docx_template  # noqa: E402
+from report_generator import overall_max_text  # noqa: E402
+from telemetry_frame import daily_metrics  # noqa: E402
+from bench_docx_assembly import synthetic_frame  # noqa: E402
+
+
+def legacy_png(group):
+    return report_charts.render_day_chart(group, fmt="png", dpi=report_charts.CHART_DPI).getvalue()
+
+
+def docx_size(sections, images, summary):
+    out = BytesIO()
+    assemble_docx_template([(r, m, BytesIO(img)) for (r, _, m), img in zip(sections, images)], summary).save(out)
+    return out.tell()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--rows-per-day", type=int, default=300)
+    ap.add_argument("--duplicates", type=int, default=10, help="days exported twice (CAN + CSV / overlapping ranges)")
+    args = ap.parse_args()
+
+    frame = synthetic_frame(args.days, args.rows_per_day)
+    metrics = list(daily_metrics(frame).itertuples(index=False))
+    sections = [("861409078038958", frame.day_slice(m.day), m) for m in metrics]
+    sections += sections[:args.duplicates]
+    summary = overall_max_text(m for _, _, m in sections)
+
+    settings = [
+        ("legacy png 120dpi", legacy_png, True),
+        ("png palette", lambda g: report_charts.chart_image(g, "png").data, True),
+        ("jpeg", lambda g: report_charts.chart_image(g, "jpeg").data, True),
+        ("webp (html)", lambda g: report_charts.chart_image(g, "webp").data, False),
+    ]
+    print(f"{len(sections)} charts ({args.duplicates} repeated days), "
+          f"embed {report_charts.CHART_EMBED_WIDTH_IN} in @ {report_charts.CHART_TARGET_PPI} ppi")
+    for name, encode, docx in settings:
+        report_charts._image_cache.clear()
+        t = time.perf_counter()
+        images = [encode(group) for _, group, _ in sections]
+        elapsed = time.perf_counter() - t
+        unique = {img: None for img in images}
+        line = (f"  {name:<18} {elapsed:6.1f}s  images {sum(map(len, images)) / 1e6:6.2f} MB, "
+                f"unique {sum(map(len, unique)) / 1e6:6.2f} MB ({len(unique)})")
+        if docx:
+            line += f", docx {docx_size(sections, images, summary) / 1e6:6.2f} MB"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to assemble a 30-day temperature report DOCX,
+python-docx call-per-element ("incremental") vs bulk XML into the template.
+Charts are rendered once up front so only assembly + save is timed.
+
+    python benchmarks/bench_docx_assembly.py [--days 30] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+from io import BytesIO
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report_generator as rg  # noqa: E402
+from report_charts import chart_image  # noqa: E402
+from telemetry_frame import TelemetryFrame, daily_metrics, NS_PER_DAY  # noqa: E402
+
+
+def synthetic_frame(days, rows_per_day, cells=6, seed=0):
+    rng = np.random.default_rng(seed)
+    n = days * rows_per_day
+    start = np.datetime64("2025-08-01T00:00:00", "ns").astype(np.int64)
+    offsets = np.repeat(np.arange(days, dtype=np.int64) * NS_PER_DAY, rows_per_day)
+    offsets += np.tile(np.linspace(0, NS_PER_DAY - 10**9, rows_per_day).astype(np.int64), days)
+    created_at = (start + offsets).view("datetime64[ns]")
+    soc = np.tile(np.linspace(95, 20, rows_per_day), days)
+    temps = (30 + rng.normal(0, 1, (n, cells)).cumsum(axis=0) * 0.05).round().astype(np.float32)
+    return TelemetryFrame(created_at, soc, temps, [f"batteryBmsTemperature{i + 1}" for i in range(cells)])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--rows-per-day", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    frame = synthetic_frame(args.days, args.rows_per_day)
+    metrics = daily_metrics(frame)
+    charts = []
+    for m in metrics.itertuples(index=False):
+        charts.append(("861409078038958", m, chart_image(frame.day_slice(m.day)).data))
+    summary = rg.overall_max_text(m for _, m, _ in charts)
+
+    print(f"{args.days}-day report, {len(charts)} sections, best of {args.repeat}")
+    texts = {}
+    for name, assemble in rg.DOCX_ASSEMBLERS.items():
+        best, size = float("inf"), 0
+        for _ in range(args.repeat):
+            rendered = [(r, m, BytesIO(png)) for r, m, png in charts]
+            t = time.perf_counter()
+            doc = assemble(rendered, summary)
+            out = BytesIO()
+            doc.save(out)
+            best = min(best, time.perf_counter() - t)
+            size = out.tell()
+        texts[name] = [p.text for p in doc.paragraphs] + [c.text for t in doc.tables for c in t._cells]
+        print(f"  {name:<12} {best * 1000:8.1f} ms  {size / 1e6:6.2f} MB")
+    if len({tuple(t) for t in texts.values()}) != 1:
+        print("  ⚠️ assemblers produced different report text")
+
+
+if __name__ == "__main__":
+    main()
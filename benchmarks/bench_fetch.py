@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Phase 2 (fetch_reports_for_all_vehicles) end to end and offline.
+A synthetic fleet is served by local_http.py, one report email per vehicle
+by local_imap.py; the fetcher runs unchanged against both, with IMAP
+round-trip latency, HTTP latency and a bandwidth cap to mimic the real
+services. Results are written as JSON next to the pipeline benchmark's.
+
+    python benchmarks/bench_fetch.py [--vehicles 20] [--files 2] [--rows 2000]
+                                     [--imap-latency-ms 40] [--http-latency-ms 150] [--kbps 4000]
+                                     [--imap-workers 4] [--imap-drop-rate 0.05]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import tempfile
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation  # noqa: E402
+import telemetry_store  # noqa: E402
+import email_reader_attachment_download as script2  # noqa: E402
+import fixtures  # noqa: E402
+from bench_pipeline import RESULTS_DIR, git_commit  # noqa: E402
+from local_http import LocalHttpServer  # noqa: E402
+from local_imap import LocalImapServer, Mailbox  # noqa: E402
+
+
+def run(args):
+    instrumentation.TIMINGS_ENABLED = False
+    tmp = tempfile.mkdtemp(prefix="octopus_fetch_")
+    served = os.path.join(tmp, "served")
+    ids = fixtures.vehicle_ids(args.vehicles)
+    files = {v: fixtures.make_vehicle_folder(served, v, files=args.files, rows=args.rows, days=args.days, seed=i * 100)
+             for i, v in enumerate(ids)}
+
+    http = LocalHttpServer.from_folder(served, latency_ms=args.http_latency_ms, kbps=args.kbps).start()
+    mailbox = Mailbox(fixtures.report_email_for_files(v, files[v], http.base_url) for v in ids)
+    imap = LocalImapServer(mailbox, latency_ms=args.imap_latency_ms, drop_rate=args.imap_drop_rate).start()
+
+    vehicle_file = os.path.join(tmp, "vehicle_list.txt")
+    with open(vehicle_file, "w") as f:
+        f.writelines(f"{v}, Start date 01Aug2025\n" for v in ids)
+
+    saved = {name: getattr(script2, name) for name in
+             ("IMAP_SERVER", "IMAP_PORT", "IMAP_SSL", "IMAP_WORKERS", "EMAIL_USER", "EMAIL_PASS", "ROOT_DOWNLOAD_DIR")}
+    script2.IMAP_SERVER, script2.IMAP_PORT, script2.IMAP_SSL = "127.0.0.1", imap.port, False
+    script2.IMAP_WORKERS = args.imap_workers
+    script2.EMAIL_USER, script2.EMAIL_PASS = "bench", "bench"
+    script2.ROOT_DOWNLOAD_DIR = os.path.join(tmp, "download")
+    telemetry_store._store = telemetry_store.TelemetryStore(os.path.join(tmp, "store.sqlite"))
+    logging.getLogger(script2.__name__).setLevel(logging.WARNING)
+    try:
+        started = time.perf_counter()
+        script2.fetch_reports_for_all_vehicles(vehicle_file)
+        seconds = time.perf_counter() - started
+        vehicles_done = sum(1 for v in ids if os.path.isdir(os.path.join(script2.ROOT_DOWNLOAD_DIR, v)))
+        downloaded = [os.path.join(dp, f) for dp, _, fs in os.walk(script2.ROOT_DOWNLOAD_DIR)
+                      for f in fs if f.lower().endswith(".xlsx")]
+        result = {
+            "vehicles": len(ids),
+            "vehicles_done": vehicles_done,
+            "files_expected": sum(len(p) for p in files.values()),
+            "files_downloaded": len(downloaded),
+            "bytes": http.bytes_served,
+            "seconds": round(seconds, 3),
+            "vehicles_per_s": round(len(ids) / seconds, 3),
+            "mb_per_s": round(http.bytes_served / 1e6 / seconds, 3),
+            "imap_commands": dict(imap.commands),
+        }
+    finally:
+        for name, value in saved.items():
+            setattr(script2, name, value)
+        telemetry_store._store = None
+        imap.stop()
+        http.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "params": {k: getattr(args, k) for k in ("vehicles", "files", "rows", "days", "imap_latency_ms",
+                                                     "http_latency_ms", "kbps", "imap_workers", "imap_drop_rate")},
+        },
+        "results": [result],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--vehicles", type=int, default=20)
+    ap.add_argument("--files", type=int, default=2, help="exports (email rows) per vehicle")
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--days", type=int, default=3)
+    ap.add_argument("--imap-latency-ms", type=float, default=40)
+    ap.add_argument("--http-latency-ms", type=float, default=150)
+    ap.add_argument("--kbps", type=float, default=4000, help="per-download bandwidth cap, KB/s (0 = unlimited)")
+    ap.add_argument("--imap-workers", type=int, default=script2.IMAP_WORKERS)
+    ap.add_argument("--imap-drop-rate", type=float, default=0, help="chance the IMAP stand-in drops a command")
+    ap.add_argument("--out", help="results JSON (default benchmarks/results/fetch_<timestamp>.json)")
+    args = ap.parse_args()
+
+    current = run(args)
+    r = current["results"][0]
+    print(f"{r['vehicles_done']}/{r['vehicles']} vehicle(s), {r['files_downloaded']}/{r['files_expected']} file(s), "
+          f"{r['bytes'] / 1e6:.1f} MB in {r['seconds']:.1f}s — {r['vehicles_per_s']:.2f} vehicles/s, "
+          f"{r['mb_per_s']:.2f} MB/s")
+    out = args.out or os.path.join(RESULTS_DIR, f"fetch_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Phase 3 split across processes through work_leases.
+A synthetic fleet is reported by 1, 2, 4 … separate processes started at
+the same time on one shared workspace (download tree, telemetry store and
+lease database), as GUI + scheduled job would be. Reports wall time per
+process count and checks that every vehicle was reported exactly once.
+All processes run on this machine; sharing leases between hosts is not
+exercised here.
+
+    python benchmarks/bench_leases.py [--vehicles 20] [--processes 1,2,4] [--workers 1]
+                                      [--files 2] [--rows 2000] [--sharded]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures  # noqa: E402
+from bench_pipeline import RESULTS_DIR, git_commit  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# An explicit vehicle list is not sharded by generate_all_reports, so the worker applies OCTOPUS_SHARD itself
+_WORKER = """
+import sys, report_generator as rg, work_leases
+rg.generate_all_reports(sys.argv[1], show_gui=False, fleet_summary=False, max_workers=int(sys.argv[2]),
+                        vehicles=work_leases.shard_ids(sys.argv[3].split(",")))
+"""
+
+
+def run_processes(root, ids, count, workers, env, sharded):
+    procs = []
+    started = time.perf_counter()
+    for i in range(count):
+        penv = dict(env, OCTOPUS_SHARD=f"{i}/{count}") if sharded else env
+        procs.append(subprocess.Popen([sys.executable, "-c", _WORKER, root, str(workers), ",".join(ids)],
+                                      cwd=REPO_DIR, env=penv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                      text=True))
+    outputs = [p.communicate()[0] for p in procs]
+    seconds = time.perf_counter() - started
+    # "📂 Starting <vehicle>" is printed once per vehicle a process claimed
+    claimed = [sorted({line.split("Starting ", 1)[1].strip() for line in out.splitlines() if "📂 Starting" in line})
+               for out in outputs]
+    return seconds, claimed
+
+
+def run(args):
+    tmp = tempfile.mkdtemp(prefix="octopus_leases_")
+    source = os.path.join(tmp, "source")
+    ids = fixtures.vehicle_ids(args.vehicles)
+    for i, v in enumerate(ids):
+        fixtures.make_vehicle_folder(source, v, files=args.files, rows=args.rows, seed=i * 100)
+
+    results = []
+    try:
+        for count in (int(c) for c in args.processes.split(",")):
+            run_dir = os.path.join(tmp, f"run_{count}")
+            root = os.path.join(run_dir, "download")
+            shutil.copytree(source, root)
+            env = dict(os.environ, OCTOPUS_LEASES=os.path.join(run_dir, "leases.sqlite"),
+                       OCTOPUS_STORE=os.path.join(run_dir, "store.sqlite"), OCTOPUS_TIMINGS_DISABLED="1")
+            # Warm the shared store first so every process count measures report work, not parsing
+            subprocess.run([sys.executable, "-c", "import sys, telemetry_store as t; t.get_store().ingest_tree(sys.argv[1])",
+                            root], cwd=REPO_DIR, env=env, check=True)
+            seconds, claimed = run_processes(root, ids, count, args.workers, env, args.sharded)
+            all_claimed = [v for c in claimed for v in c]
+            results.append({
+                "processes": count,
+                "seconds": round(seconds, 2),
+                "vehicles_per_s": round(len(ids) / seconds, 3),
+                "claimed_per_process": [len(c) for c in claimed],
+                "duplicates": len(all_claimed) - len(set(all_claimed)),
+                "missing": len(set(ids) - set(all_claimed)),
+            })
+            r = results[-1]
+            print(f"{count:>3} process(es)  {seconds:7.1f}s  {r['vehicles_per_s']:.2f} vehicles/s  "
+                  f"claimed {r['claimed_per_process']}  duplicates {r['duplicates']}  missing {r['missing']}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    base = results[0]["seconds"] if results else None
+    for r in results:
+        r["speedup"] = round(base / r["seconds"], 2) if base else None
+    return results
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--vehicles", type=int, default=20)
+    ap.add_argument("--processes", default="1,2,4")
+    ap.add_argument("--workers", type=int, default=1, help="max_workers inside each process")
+    ap.add_argument("--files", type=int, default=2, help="exports per vehicle")
+    ap.add_argument("--rows", type=int, default=2000, help="rows per export")
+    ap.add_argument("--sharded", action="store_true", help="also give each process a static OCTOPUS_SHARD")
+    ap.add_argument("--out", help="results JSON (default benchmarks/results/leases_<timestamp>.json)")
+    args = ap.parse_args()
+
+    results = run(args)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"leases_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(out, "w") as f:
+        json.dump({"commit": git_commit(), "cpus": os.cpu_count(), "args": vars(args), "results": results}, f,
+                  indent=2)
+    print(f"Results written to {out}", file=sys.stderr)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Phase 1 (Shepherd automation) offline, against local_octopus.py.
+OctopusReportTester.run_full_test runs unchanged for a synthetic fleet, one
+fresh browser per vehicle as in Octopus_login.main, with latency and
+failure injection on the stand-in. Measures vehicles per minute, attempts
+and retries, and checks every requested range actually reached the server.
+
+Concurrency modes: --workers 1 is the sequential loop main() runs; more
+workers run vehicles on that many threads, each with its own Playwright.
+
+    python benchmarks/bench_phase1.py [--vehicles 10] [--workers 1,2,4] [--retries 1]
+                                      [--latency-ms 50] [--api-latency-ms 300]
+                                      [--search-fail-rate 0.05] [--submit-fail-rate 0.05]
+                                      [--no-route-filter] [--slow-mo 200] [--settle-ms 5000]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation  # noqa: E402
+import browser_routing  # noqa: E402
+import Octopus_login  # noqa: E402
+import fixtures  # noqa: E402
+from bench_pipeline import RESULTS_DIR, git_commit  # noqa: E402
+from local_octopus import LocalOctopusServer  # noqa: E402
+
+
+def run_vehicle(tester, vehicle, start, end, retries):
+    """Attempts used and whether the last one finished without raising."""
+    for attempt in range(1, retries + 2):
+        try:
+            tester.run_full_test(vehicle, start, end, headless=True)
+            return attempt, True
+        except Exception as e:
+            logging.getLogger(__name__).debug(f"{vehicle} attempt {attempt} failed: {e}")
+    return retries + 1, False
+
+
+def run_mode(args, workers):
+    srv = LocalOctopusServer(latency_ms=args.latency_ms, api_latency_ms=args.api_latency_ms,
+                             search_fail_rate=args.search_fail_rate, submit_fail_rate=args.submit_fail_rate,
+                             seed=workers).start()
+    os.environ.setdefault("OCTO_USER", "bench")
+    os.environ.setdefault("OCTO_PASS", "bench")
+    tester = Octopus_login.OctopusReportTester()
+    tester.base_url = srv.base_url
+    end = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=1), datetime.time())
+    start = end - datetime.timedelta(days=args.days - 1)
+    ids = fixtures.vehicle_ids(args.vehicles)
+    try:
+        browser_routing.get_cache().clear()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(lambda v: run_vehicle(tester, v, start, end, args.retries), ids))
+        seconds = time.perf_counter() - started
+        accepted = set(srv.accepted())
+        received = [(v, f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}") in accepted for v in ids]
+        return {
+            "workers": workers,
+            "vehicles": len(ids),
+            "seconds": round(seconds, 2),
+            "vehicles_per_min": round(len(ids) / seconds * 60, 2),
+            "attempts": sum(a for a, _ in outcomes),
+            "retried": sum(1 for a, _ in outcomes if a > 1),
+            "failed": sum(1 for _, ok in outcomes if not ok),
+            # Runs that finished without error although the server rejected the submit
+            "silently_lost": sum(1 for (_, ok), got in zip(outcomes, received) if ok and not got),
+            "requests_received": sum(received),
+            "server_failures": dict(srv.failures),
+            "bytes_served": srv.bytes_served,
+        }
+    finally:
+        srv.stop()
+
+
+def run(args):
+    instrumentation.TIMINGS_ENABLED = False
+    logging.getLogger(Octopus_login.__name__).setLevel(logging.WARNING)
+    Octopus_login.BROWSER_SLOW_MO_MS = args.slow_mo
+    Octopus_login.SUBMIT_SETTLE_MS = args.settle_ms
+    browser_routing.ROUTE_FILTER = not args.no_route_filter
+    return [run_mode(args, int(w)) for w in args.workers.split(",")]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--vehicles", type=int, default=10)
+    ap.add_argument("--days", type=int, default=7, help="days per requested range")
+    ap.add_argument("--workers", default="1,2,4", help="concurrency modes to compare")
+    ap.add_argument("--retries", type=int, default=1, help="extra attempts per vehicle after a failure")
+    ap.add_argument("--latency-ms", type=float, default=50)
+    ap.add_argument("--api-latency-ms", type=float, default=300)
+    ap.add_argument("--search-fail-rate", type=float, default=0.05)
+    ap.add_argument("--submit-fail-rate", type=float, default=0.05)
+    ap.add_argument("--no-route-filter", action="store_true")
+    ap.add_argument("--slow-mo", type=int, default=Octopus_login.BROWSER_SLOW_MO_MS)
+    ap.add_argument("--settle-ms", type=int, default=Octopus_login.SUBMIT_SETTLE_MS)
+    ap.add_argument("--out", help="results JSON (default benchmarks/results/phase1_<timestamp>.json)")
+    args = ap.parse_args()
+
+    results = run(args)
+    print(f"{'workers':>7} {'seconds':>8} {'veh/min':>8} {'attempts':>8} {'retried':>7} {'failed':>6} "
+          f"{'lost':>5} {'received':>8}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['seconds']:>8.1f} {r['vehicles_per_min']:>8.2f} {r['attempts']:>8} "
+              f"{r['retried']:>7} {r['failed']:>6} {r['silently_lost']:>5} {r['requests_received']:>5}/{r['vehicles']}")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"phase1_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(out, "w") as f:
+        json.dump({"commit": git_commit(), "args": vars(args), "results": results}, f, indent=2)
+    print(f"Results written to {out}", file=sys.stderr)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pipeline functions on a synthetic fleet at several fleet sizes.
+Times get_existing_first_created_dates, extract_all_links,
+generate_report_for_vehicle (sequential) and generate_all_reports (threaded)
+at 1 / 5 / 20 / 100 vehicles, and writes the results as JSON so runs on
+different commits can be compared.
+
+    python benchmarks/bench_pipeline.py [--sizes 1,5,20,100] [--rows 2000] [--temps 6] [--days 3]
+                                        [--fixtures DIR] [--out results.json] [--compare old.json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import contextlib
+import datetime
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation  # noqa: E402
+import telemetry_store  # noqa: E402
+import report_generator as rg  # noqa: E402
+import email_reader_attachment_download as script2  # noqa: E402
+import fixtures  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def fresh_store(tmp):
+    """Every measured function starts from an empty telemetry store (cold parse)."""
+    path = os.path.join(tmp, f"store_{time.monotonic_ns()}.sqlite")
+    telemetry_store._store = telemetry_store.TelemetryStore(path)
+
+
+def fleet_root(source_root, tmp, ids):
+    """A download root holding copies of the given vehicle folders (reports get written into them)."""
+    root = os.path.join(tmp, f"fleet_{len(ids)}_{time.monotonic_ns()}")
+    for v in ids:
+        shutil.copytree(os.path.join(source_root, v), os.path.join(root, v))
+    return root
+
+
+def timed_call(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def run(args):
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    instrumentation.TIMINGS_ENABLED = False
+    tmp = tempfile.mkdtemp(prefix="octopus_bench_")
+    fixture_dir = args.fixtures or os.path.join(tmp, "fixtures")
+    source_root = os.path.join(fixture_dir, "download")
+    ids = fixtures.vehicle_ids(max(sizes))
+
+    t = time.perf_counter()
+    missing = [v for v in ids if not os.path.isdir(os.path.join(source_root, v))]
+    for v in missing:
+        fixtures.make_vehicle_folder(source_root, v, files=args.files, rows=args.rows,
+                                     temp_columns=args.temps, days=args.days, seed=ids.index(v) * 100)
+    print(f"Fixtures: {len(missing)} vehicle folder(s) generated in {time.perf_counter() - t:.1f}s ({source_root})")
+    emails = {v: fixtures.report_email(v, days=args.email_days) for v in ids}
+
+    results = []
+    try:
+        for n in sizes:
+            subset = ids[:n]
+
+            def existing_dates():
+                for v in subset:
+                    script2.get_existing_first_created_dates(os.path.join(source_root, v))
+
+            def links():
+                for v in subset:
+                    script2.extract_all_links(emails[v])
+
+            per_vehicle_root = fleet_root(source_root, tmp, subset)
+            all_root = fleet_root(source_root, tmp, subset)
+
+            def per_vehicle():
+                for v in subset:
+                    rg.generate_report_for_vehicle(os.path.join(per_vehicle_root, v))
+
+            def all_reports():
+                # Per-vehicle progress lines would drown the results
+                with contextlib.redirect_stdout(io.StringIO()):
+                    rg.generate_all_reports(all_root, show_gui=False, max_workers=args.workers, vehicles=subset)
+
+            for name, fn in (("get_existing_first_created_dates", existing_dates),
+                             ("extract_all_links", links),
+                             ("generate_report_for_vehicle", per_vehicle),
+                             ("generate_all_reports", all_reports)):
+                fresh_store(tmp)
+                seconds = timed_call(fn)
+                results.append({"function": name, "vehicles": n, "seconds": round(seconds, 4),
+                                "per_vehicle_s": round(seconds / n, 4)})
+                print(f"  {name:<34} {n:>4} vehicle(s)  {seconds:8.2f}s  ({seconds / n:.3f}s/vehicle)")
+            shutil.rmtree(per_vehicle_root, ignore_errors=True)
+            shutil.rmtree(all_root, ignore_errors=True)
+    finally:
+        telemetry_store._store = None
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {"sizes": sizes, "files": args.files, "rows": args.rows, "temps": args.temps,
+                       "days": args.days, "email_days": args.email_days, "workers": args.workers},
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["function"], r["vehicles"]): r["seconds"] for r in baseline["results"]}
+    print(f"Compared with {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for r in current["results"]:
+        before = old.get((r["function"], r["vehicles"]))
+        if before:
+            print(f"  {r['function']:<34} {r['vehicles']:>4}  {before:8.2f}s -> {r['seconds']:8.2f}s  "
+                  f"x{before / r['seconds'] if r['seconds'] else float('inf'):.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1,5,20,100")
+    ap.add_argument("--files", type=int, default=2, help="exports per vehicle")
+    ap.add_argument("--rows", type=int, default=2000, help="rows per export")
+    ap.add_argument("--temps", type=int, default=6, help="battery*temp* columns per export")
+    ap.add_argument("--days", type=int, default=3, help="days covered by each export")
+    ap.add_argument("--email-days", type=int, default=7, help="table rows per report email")
+    ap.add_argument("--workers", type=int, default=rg.MAX_CONCURRENT_VEHICLES)
+    ap.add_argument("--fixtures", help="reuse / keep generated fixtures in this directory")
+    ap.add_argument("--out", help="results JSON (default benchmarks/results/pipeline_<timestamp>.json)")
+    ap.add_argument("--compare", help="earlier results JSON to compare against")
+    args = ap.parse_args()
+
+    current = run(args)
+    out = args.out or os.path.join(RESULTS_DIR, f"pipeline_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {out}")
+    if args.compare:
+        compare(current, args.compare)
+
+
+if __name__ == "__main__":
+    main()
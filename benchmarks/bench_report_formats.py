@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: output size and generation time of the report formats
+(docx / html / pdf) for the same sections.
+
+    python benchmarks/bench_report_formats.py [--days 30]        # synthetic vehicle
+    python benchmarks/bench_report_formats.py --root download/   # real fleet, reports written in place
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report_generator as rg  # noqa: E402
+from telemetry_frame import daily_metrics  # noqa: E402
+from bench_docx_assembly import synthetic_frame  # noqa: E402
+
+
+def bench_synthetic(days, rows_per_day, formats):
+    frame = synthetic_frame(days, rows_per_day)
+    sections = [("861409078038958", frame.day_slice(m.day), m) for m in daily_metrics(frame).itertuples(index=False)]
+    summary = rg.overall_max_text(m for _, _, m in sections)
+    print(f"Synthetic {days}-day report, {rows_per_day} rows/day")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in formats:
+            out_path = os.path.join(tmp, f"temp_report_bench.{fmt}")
+            t = time.perf_counter()
+            rg.REPORT_RENDERERS[fmt](sections, out_path, summary)
+            print(f"  {fmt:<5} {rg.format_size_time({'bytes': os.path.getsize(out_path), 'seconds': time.perf_counter() - t})}")
+
+
+def bench_fleet(root, formats):
+    totals = {fmt: {"bytes": 0, "seconds": 0.0} for fmt in formats}
+    vehicles = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    for v in vehicles:
+        stats = rg.generate_report_for_vehicle(os.path.join(root, v), formats=formats)
+        for fmt, stat in stats.items():
+            totals[fmt]["bytes"] += stat["bytes"]
+            totals[fmt]["seconds"] += stat["seconds"]
+            print(f"  {v:<14} {fmt:<5} {rg.format_size_time(stat)}")
+    print(f"Fleet of {len(vehicles)} vehicle(s):")
+    for fmt, total in totals.items():
+        print(f"  {fmt:<5} {rg.format_size_time(total)}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--rows-per-day", type=int, default=300)
+    ap.add_argument("--root", help="download root to benchmark on real vehicle folders")
+    ap.add_argument("--formats", default=",".join(rg.REPORT_RENDERERS))
+    args = ap.parse_args()
+
+    formats = [f for f in args.formats.split(",") if f]
+    if args.root:
+        bench_fleet(args.root, formats)
+    else:
+        bench_synthetic(args.days, args.rows_per_day, formats)
+
+
+if __name__ == "__main__":
+    main()
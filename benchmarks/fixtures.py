@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Synthetic fixtures for benchmarks: Octopus Internal Report exports
+(Internal_Report_CAN_Parsed xlsx) and "Internal Reports <vehicle>" emails
+with the Date | CSV Report | CAN Report table.
+
+    python benchmarks/fixtures.py OUT_DIR [--vehicles 5] [--rows 2000] [--temps 6] [--days 3]
+                                          [--base-url http://127.0.0.1:8088/internal]
+
+OUT_DIR/download can be served with local_http.py and OUT_DIR/mail with local_imap.py.
+"""
+
+import os
+import sys
+import uuid
+import argparse
+import datetime
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+import numpy as np
+import openpyxl
+
+EXPORT_BASE_URL = "https://reports.example.invalid/internal"
+FILLER_COLUMNS = ["vehicleAuxBatteryVoltage", "batteryCurrent", "batteryTotalVoltage", "batteryStateOfHealth",
+                  "controllerMotorRpm", "controllerSpeed", "vehicleCalculatedOdo", "vehicleState"]
+
+
+def vehicle_ids(count, prefix="BENCH"):
+    return [f"{prefix}-{i:04d}" for i in range(1, count + 1)]
+
+
+def imei_for(vehicle_id):
+    return 860000000000000 + sum(ord(c) * 31 ** i for i, c in enumerate(vehicle_id)) % 10**12
+
+
+def export_filename(first_day, imei, kind="CAN"):
+    return f"{first_day.day}-{first_day.month}-{first_day.year}_Internal_Report_{kind}_Parsed_{imei}_{uuid.uuid4()}.xlsx"
+
+
+def write_export(path, rows=2000, temp_columns=6, days=1, start=datetime.date(2025, 8, 1),
+                 imei=861409078038958, filler_columns=len(FILLER_COLUMNS), seed=0):
+    """
+    Write one export shaped like the real ones: unnamed index column, createdAt
+    text timestamps spread over `days` days, batteryStateOfCharge, batteryBmsTemperatureN
+    and some unrelated columns. Returns the path.
+    """
+    rng = np.random.default_rng(seed)
+    fillers = FILLER_COLUMNS[:filler_columns]
+    temps = [f"batteryBmsTemperature{i + 1}" for i in range(temp_columns)]
+    start_ts = datetime.datetime.combine(start, datetime.time(0, 30))
+    step = datetime.timedelta(seconds=max(1, int(days * 86400 * 0.9 / max(rows, 1))))
+    soc = np.clip(np.linspace(95, 15, rows) + rng.normal(0, 0.5, rows), 0, 100).round(1)
+    base = 28 + rng.normal(0, 1, (rows, 1)).cumsum(axis=0) * 0.02
+    cell_temps = (base + rng.normal(0, 0.6, (rows, temp_columns))).round()
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append([None, "createdAt", *fillers[:2], "batteryStateOfCharge", *fillers[2:], *temps, "imei"])
+    for i in range(rows):
+        ts = (start_ts + step * i).strftime("%Y-%m-%d %H:%M:%S")
+        filler_vals = [round(float(v), 2) for v in rng.random(len(fillers)) * 100]
+        ws.append([i, ts, *filler_vals[:2], float(soc[i]), *filler_vals[2:], *cell_temps[i].tolist(), imei])
+    wb.save(path)
+    return path
+
+
+def make_vehicle_folder(root, vehicle_id, files=2, rows=2000, temp_columns=6, days=3,
+                        start=datetime.date(2025, 8, 1), seed=0):
+    """One vehicle folder with `files` exports of `days` days each, on consecutive date ranges."""
+    folder = os.path.join(root, vehicle_id)
+    os.makedirs(folder, exist_ok=True)
+    imei = imei_for(vehicle_id)
+    paths = []
+    for f in range(files):
+        first_day = start + datetime.timedelta(days=f * days)
+        path = os.path.join(folder, export_filename(first_day, imei))
+        paths.append(write_export(path, rows=rows, temp_columns=temp_columns, days=days,
+                                  start=first_day, imei=imei, seed=seed + f))
+    return paths
+
+
+def make_fleet(root, vehicles=5, **kwargs):
+    """Vehicle folders BENCH-0001 … under root; returns the vehicle ids."""
+    ids = vehicle_ids(vehicles)
+    for i, v in enumerate(ids):
+        make_vehicle_folder(root, v, seed=i * 100, **kwargs)
+    return ids
+
+
+def _report_message(vehicle_id, rows_html, received=None):
+    html = (f"<html><body><p>Internal reports for {vehicle_id}</p><table>"
+            "<tr><th>Date</th><th>CSV Report</th><th>CAN Report</th></tr>"
+            f"{''.join(rows_html)}</table></body></html>")
+    msg = EmailMessage()
+    msg["Subject"] = f"Internal Reports {vehicle_id}"
+    msg["From"] = "reports@example.invalid"
+    msg["To"] = "tracker@example.invalid"
+    msg["Date"] = format_datetime(received or datetime.datetime.now(datetime.timezone.utc))
+    msg.set_content(f"Internal reports for {vehicle_id}")
+    msg.add_alternative(html, subtype="html")
+    return msg
+
+
+def _date_cell(day):
+    return f"{day.day}/{day.month}/{day.year}"
+
+
+def report_email(vehicle_id, days=7, end=datetime.date(2025, 8, 31), can_every=1, received=None,
+                 base_url=EXPORT_BASE_URL):
+    """
+    An "Internal Reports <vehicle>" email like the Octopus export mail: an HTML
+    table with one Date | CSV Report | CAN Report row per day. Every
+    `can_every`-th row carries a CAN link, the others only CSV.
+    """
+    imei = imei_for(vehicle_id)
+    rows = []
+    for i in range(days):
+        day = end - datetime.timedelta(days=days - 1 - i)
+        csv = f'<a href="{base_url}/{day:%d-%m-%Y}_Internal_Report_CSV_Parsed_{imei}_{uuid.uuid4()}.xlsx">Download</a>'
+        can = (f'<a href="{base_url}/{day:%d-%m-%Y}_Internal_Report_CAN_Parsed_{imei}_{uuid.uuid4()}.xlsx">Download</a>'
+               if i % can_every == 0 else "-")
+        rows.append(f"<tr><td>{_date_cell(day)}</td><td>{csv}</td><td>{can}</td></tr>")
+    return _report_message(vehicle_id, rows, received)
+
+
+def report_email_for_files(vehicle_id, paths, base_url, received=None):
+    """
+    Report email whose CAN links point at existing exports (served by
+    benchmarks/local_http.py at base_url). The Date cell is the file's first day.
+    """
+    rows = []
+    for path in paths:
+        name = os.path.basename(path)
+        d, m, y = name.split("_", 1)[0].split("-")
+        day = datetime.date(int(y), int(m), int(d))
+        can = f'<a href="{base_url}/{name}">Download</a>'
+        rows.append(f"<tr><td>{_date_cell(day)}</td><td>-</td><td>{can}</td></tr>")
+    return _report_message(vehicle_id, rows, received)
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Write a synthetic fleet of exports and report emails")
+    ap.add_argument("out_dir")
+    ap.add_argument("--vehicles", type=int, default=5)
+    ap.add_argument("--files", type=int, default=2)
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--temps", type=int, default=6)
+    ap.add_argument("--days", type=int, default=3)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8088/internal", help="where local_http.py serves the exports")
+    args = ap.parse_args()
+
+    download = os.path.join(args.out_dir, "download")
+    mails = os.path.join(args.out_dir, "mail")
+    os.makedirs(mails, exist_ok=True)
+    ids = vehicle_ids(args.vehicles)
+    for i, v in enumerate(ids):
+        paths = make_vehicle_folder(download, v, files=args.files, rows=args.rows,
+                                    temp_columns=args.temps, days=args.days, seed=i * 100)
+        with open(os.path.join(mails, f"{v}.eml"), "wb") as f:
+            f.write(report_email_for_files(v, paths, args.base_url).as_bytes())
+    print(f"{len(ids)} vehicle(s) written to {download}, emails in {mails}", file=sys.stderr)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Local HTTP stand-in for report downloads, with per-request latency and a
+bandwidth cap so download time behaves like the real export links.
+Files are served by name: GET /<prefix>/<file name>.
+
+    python benchmarks/local_http.py FILES_DIR [--port 8088] [--latency-ms 150] [--kbps 4000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+WRITE_CHUNK = 16 * 1024
+
+
+class _FileHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):  # keep benchmark output clean
+        pass
+
+    def do_GET(self):
+        server = self.server
+        name = os.path.basename(unquote(urlparse(self.path).path))
+        path = server.files.get(name)
+        if server.latency_s:
+            time.sleep(server.latency_s)
+        if path is None:
+            self.send_error(404, "Not found")
+            return
+
+        size = os.path.getsize(path)
+        self.send_response(200)
+        self.send_header("Content-Type", XLSX_MIME if name.endswith(".xlsx") else "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        started = time.perf_counter()
+        sent = 0
+        with open(path, "rb") as f:
+            while chunk := f.read(WRITE_CHUNK):
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if server.bytes_per_s:
+                    # Sleep until this many bytes are "due" at the capped rate
+                    ahead = sent / server.bytes_per_s - (time.perf_counter() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        server.record(sent)
+
+
+class LocalHttpServer(ThreadingHTTPServer):
+    """
+    Threaded file server. latency_ms is added before each response,
+    kbps caps each response's throughput (kilobytes per second, 0 = unlimited).
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, files, host="127.0.0.1", port=0, latency_ms=0, kbps=0):
+        super().__init__((host, port), _FileHandler)
+        self.files = {os.path.basename(p): p for p in files}
+        self.latency_s = latency_ms / 1000.0
+        self.bytes_per_s = kbps * 1024
+        self.requests_served = 0
+        self.bytes_served = 0
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_folder(cls, folder, **kwargs):
+        files = [os.path.join(dp, f) for dp, _, fs in os.walk(folder) for f in fs]
+        return cls(files, **kwargs)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/internal"
+
+    def record(self, nbytes):
+        with self._stats_lock:
+            self.requests_served += 1
+            self.bytes_served += nbytes
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serve report files with latency and a bandwidth cap")
+    ap.add_argument("files_dir")
+    ap.add_argument("--port", type=int, default=8088)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--kbps", type=float, default=0)
+    args = ap.parse_args()
+
+    srv = LocalHttpServer.from_folder(args.files_dir, port=args.port, latency_ms=args.latency_ms, kbps=args.kbps)
+    print(f"HTTP stand-in at {srv.base_url}/<file> serving {len(srv.files)} file(s)", file=sys.stderr)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        srv.stop()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Local IMAP stand-in for offline Phase 2 runs.
+Speaks the subset of IMAP4rev1 that email_reader_attachment_download uses
+(CAPABILITY, LOGIN, SELECT, SEARCH SINCE/SUBJECT, FETCH RFC822, NOOP, LOGOUT)
+over plain TCP, serving fixture messages from memory or a folder of .eml files.
+
+    python benchmarks/local_imap.py MAIL_DIR [--port 1143] [--latency-ms 40] [--drop-rate 0.05]
+
+Point the fetcher at it with IMAP_SERVER=127.0.0.1 IMAP_PORT=1143 IMAP_SSL=0.
+"""
+
+import os
+import re
+import sys
+import time
+import email
+import random
+import argparse
+import datetime
+import threading
+import socketserver
+from email.utils import parsedate_to_datetime
+
+_SEARCH_SUBJECT_RE = re.compile(r'SUBJECT\s+"([^"]*)"', re.IGNORECASE)
+_SEARCH_SINCE_RE = re.compile(r'SINCE\s+"?(\d{1,2}-[A-Za-z]{3}-\d{4})"?', re.IGNORECASE)
+
+
+class Mailbox:
+    """In-memory INBOX: sequence numbers are 1-based positions."""
+
+    def __init__(self, messages=()):
+        self._lock = threading.Lock()
+        self._messages = []
+        for raw in messages:
+            self.add(raw)
+
+    @classmethod
+    def from_folder(cls, folder):
+        box = cls()
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(".eml"):
+                with open(os.path.join(folder, name), "rb") as f:
+                    box.add(f.read())
+        return box
+
+    def add(self, raw):
+        if not isinstance(raw, bytes):
+            raw = raw.as_bytes()
+        msg = email.message_from_bytes(raw)
+        try:
+            received = parsedate_to_datetime(msg["Date"]).date()
+        except (TypeError, ValueError):
+            received = datetime.date.today()
+        with self._lock:
+            self._messages.append((raw, str(msg["Subject"] or ""), received))
+
+    def __len__(self):
+        return len(self._messages)
+
+    def search(self, subject=None, since=None):
+        with self._lock:
+            return [i for i, (_, subj, received) in enumerate(self._messages, 1)
+                    if (subject is None or subject.lower() in subj.lower())
+                    and (since is None or received >= since)]
+
+    def fetch(self, seq):
+        with self._lock:
+            if 1 <= seq <= len(self._messages):
+                return self._messages[seq - 1][0]
+        return None
+
+
+class _ImapHandler(socketserver.StreamRequestHandler):
+    def _send(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        self._send("* OK [CAPABILITY IMAP4rev1] local IMAP stand-in ready")
+        selected = False
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode(errors="replace").rstrip("\r\n").split(" ", 2)
+            if len(parts) < 2:
+                self._send("* BAD empty command")
+                continue
+            tag, command = parts[0], parts[1].upper()
+            args = parts[2] if len(parts) > 2 else ""
+            if server.latency_s:
+                time.sleep(server.latency_s)
+            server.count(command)
+            if command not in ("LOGIN", "LOGOUT", "CAPABILITY") and server.should_drop():
+                # Simulate the server dropping an idle / overloaded connection
+                server.count("DROPPED")
+                return
+
+            if command == "CAPABILITY":
+                self._send("* CAPABILITY IMAP4rev1")
+                self._send(f"{tag} OK CAPABILITY completed")
+            elif command == "LOGIN":
+                creds = args.split(" ", 1)
+                user, password = (c.strip('"') for c in creds) if len(creds) == 2 else ("", "")
+                if server.credentials is None or (user, password) == server.credentials:
+                    self._send(f"{tag} OK LOGIN completed")
+                else:
+                    self._send(f"{tag} NO [AUTHENTICATIONFAILED] Invalid credentials")
+            elif command in ("SELECT", "EXAMINE"):
+                selected = True
+                self._send(f"* {len(server.mailbox)} EXISTS")
+                self._send("* 0 RECENT")
+                self._send(f"{tag} OK [READ-WRITE] {command} completed")
+            elif command == "SEARCH" and selected:
+                subject = _SEARCH_SUBJECT_RE.search(args)
+                since = _SEARCH_SINCE_RE.search(args)
+                since_date = datetime.datetime.strptime(since.group(1), "%d-%b-%Y").date() if since else None
+                hits = server.mailbox.search(subject.group(1) if subject else None, since_date)
+                self._send("* SEARCH" + "".join(f" {i}" for i in hits))
+                self._send(f"{tag} OK SEARCH completed")
+            elif command == "FETCH" and selected:
+                seq, _, _ = args.partition(" ")
+                raw = server.mailbox.fetch(int(seq)) if seq.isdigit() else None
+                if raw is None:
+                    self._send(f"{tag} NO no such message")
+                    continue
+                self.wfile.write(f"* {seq} FETCH (RFC822 {{{len(raw)}}}\r\n".encode() + raw + b")\r\n")
+                self._send(f"{tag} OK FETCH completed")
+            elif command == "NOOP":
+                self._send(f"{tag} OK NOOP completed")
+            elif command == "LOGOUT":
+                self._send("* BYE logging out")
+                self._send(f"{tag} OK LOGOUT completed")
+                return
+            else:
+                self._send(f"{tag} BAD unsupported command {command}")
+
+
+class LocalImapServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded IMAP stand-in. latency_ms is added before every command reply
+    (round trip to the real server); credentials=None accepts any login.
+    drop_rate is the chance that a command gets no reply and the connection
+    is closed, which the client sees as imaplib.IMAP4.abort.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, mailbox, host="127.0.0.1", port=0, latency_ms=0, credentials=None, drop_rate=0.0, seed=0):
+        super().__init__((host, port), _ImapHandler)
+        self.mailbox = mailbox
+        self.latency_s = latency_ms / 1000.0
+        self.credentials = credentials
+        self.drop_rate = drop_rate
+        self.commands = {}
+        self._count_lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count(self, command):
+        with self._count_lock:
+            self.commands[command] = self.commands.get(command, 0) + 1
+
+    def should_drop(self):
+        if not self.drop_rate:
+            return False
+        with self._count_lock:
+            return self._rng.random() < self.drop_rate
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serve a folder of .eml files over IMAP")
+    ap.add_argument("mail_dir")
+    ap.add_argument("--port", type=int, default=1143)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--drop-rate", type=float, default=0)
+    args = ap.parse_args()
+
+    srv = LocalImapServer(Mailbox.from_folder(args.mail_dir), port=args.port, latency_ms=args.latency_ms,
+                          drop_rate=args.drop_rate)
+    print(f"IMAP stand-in on 127.0.0.1:{srv.port} with {len(srv.mailbox)} message(s)", file=sys.stderr)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        srv.stop()
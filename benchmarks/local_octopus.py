@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Octopus web UI, for offline Phase 1 runs.
+Reproduces the pages and selectors OctopusReportTester drives: the login
+form, the #vehicle_detail search with its "Vehicle Details" panel, the
+"Live Updates" download button, the Shepherd Report dialog with
+react-day-picker style calendars (td[data-day] buttons, rdp-button_next /
+rdp-button_previous) and the Submit button. Submitted requests are
+recorded on the server.
+
+Pages pull a CSS file, an app script, a padded vendor bundle, a web font
+and map-tile images, all cacheable, so route filtering and asset caching
+(browser_routing) have something to act on. latency_ms is added to every
+response, api_latency_ms on top for the search / submit API calls, and
+search / submit calls fail with HTTP 500 at the given rates.
+
+    python benchmarks/local_octopus.py [--port 8090] [--latency-ms 50] [--api-latency-ms 300]
+                                       [--search-fail-rate 0.05] [--submit-fail-rate 0.05]
+"""
+
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ASSET_VERSION = "3f9c2a1"  # Hashed-bundle style names, served as immutable
+
+_HEAD = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Octopus</title>
+<link rel="stylesheet" href="/static/app.{v}.css">
+<script src="/static/vendor.{v}.js" defer></script>
+<script src="/static/app.{v}.js" defer></script>
+</head><body>
+"""
+
+_LOGIN_PAGE = _HEAD + """<main class="login">
+<img src="/static/logo.{v}.png" alt="">
+<form method="post" action="/login">
+  <label>Username <input name="username" autocomplete="username"></label>
+  <label>Password <input name="password" type="password" autocomplete="current-password"></label>
+  <button type="submit">Sign in</button>
+  <p class="error">{error}</p>
+</form>
+</main></body></html>
+"""
+
+_DASHBOARD_PAGE = _HEAD + """<main>
+<input id="vehicle_detail" placeholder="Search vehicle">
+<p id="search-error" class="error"></p>
+<section id="vehicle-panel" hidden>
+  <h2>Vehicle Details</h2>
+  <p id="vehicle-reg"></p>
+  <div class="card">
+    <h3>Live Updates</h3>
+    <button type="button" id="live-download" aria-label="Download">
+      <svg class="lucide lucide-download" width="16" height="16" viewBox="0 0 24 24"><path d="M12 15V3"/></svg>
+    </button>
+  </div>
+  <div class="map">{tiles}</div>
+</section>
+<div role="dialog" id="shepherd-dialog" hidden>
+  <h2>Shepherd Report</h2>
+  <form id="shepherd-form">
+    <label for="start-date">Start Date</label>
+    <button type="button" data-slot="popover-trigger" id="start-date">Pick a date</button>
+    <label for="end-date">End Date</label>
+    <button type="button" data-slot="popover-trigger" id="end-date">Pick a date</button>
+    <button type="submit">Submit</button>
+  </form>
+  <p id="toast"></p>
+</div>
+<div id="rdp-popover" class="rdp" hidden>
+  <button type="button" class="rdp-button_previous" aria-label="Previous month">&lsaquo;</button>
+  <span id="rdp-caption"></span>
+  <button type="button" class="rdp-button_next" aria-label="Next month">&rsaquo;</button>
+  <table><tbody id="rdp-body"></tbody></table>
+</div>
+</main></body></html>
+"""
+
+_APP_CSS = """@font-face { font-family: Inter; src: url("/static/inter.{v}.woff2") format("woff2"); }
+body { font-family: Inter, sans-serif; margin: 2rem; }
+[hidden] { display: none !important; }
+.map img { width: 64px; height: 64px; }
+.rdp { border: 1px solid #ccc; padding: 0.5rem; display: inline-block; }
+"""
+
+_APP_JS = """(function () {
+  function $(s) { return document.querySelector(s); }
+  var search = $("#vehicle_detail");
+  if (!search) return;
+  var state = { vehicle: null, target: null, month: null, start: null, end: null };
+
+  search.addEventListener("keydown", function (e) {
+    if (e.key !== "Enter") return;
+    e.preventDefault();
+    $("#search-error").textContent = "";
+    fetch("/api/vehicle?reg=" + encodeURIComponent(search.value)).then(function (r) {
+      if (!r.ok) throw new Error(String(r.status));
+      return r.json();
+    }).then(function (v) {
+      state.vehicle = v.reg_no;
+      $("#vehicle-reg").textContent = v.reg_no;
+      $("#vehicle-panel").hidden = false;
+    }).catch(function () { $("#search-error").textContent = "Vehicle not found"; });
+  });
+  $("#live-download").addEventListener("click", function () { $("#shepherd-dialog").hidden = false; });
+
+  function pad(n) { return (n < 10 ? "0" : "") + n; }
+  function iso(y, m, d) { return y + "-" + pad(m + 1) + "-" + pad(d); }
+  function render() {
+    var y = state.month.getFullYear(), m = state.month.getMonth();
+    $("#rdp-caption").textContent = y + "-" + pad(m + 1);
+    var body = $("#rdp-body"), row = document.createElement("tr");
+    body.innerHTML = "";
+    for (var i = 0; i < new Date(y, m, 1).getDay(); i++) row.appendChild(document.createElement("td"));
+    for (var d = 1; d <= new Date(y, m + 1, 0).getDate(); d++) {
+      var td = document.createElement("td"), b = document.createElement("button");
+      td.setAttribute("data-day", iso(y, m, d));
+      b.type = "button";
+      b.textContent = d;
+      b.addEventListener("click", pick.bind(null, iso(y, m, d)));
+      td.appendChild(b);
+      row.appendChild(td);
+      if (row.children.length === 7) { body.appendChild(row); row = document.createElement("tr"); }
+    }
+    if (row.children.length) body.appendChild(row);
+  }
+  function open(which) {
+    var now = new Date();
+    state.target = which;
+    state.month = new Date(now.getFullYear(), now.getMonth(), 1);  // Always opens on the current month
+    render();
+    $("#rdp-popover").hidden = false;
+  }
+  function step(n) {
+    state.month = new Date(state.month.getFullYear(), state.month.getMonth() + n, 1);
+    render();
+  }
+  function pick(day) {
+    state[state.target] = day;
+    $("#" + state.target + "-date").textContent = day;
+    $("#rdp-popover").hidden = true;
+  }
+  $("#start-date").addEventListener("click", function () { open("start"); });
+  $("#end-date").addEventListener("click", function () { open("end"); });
+  $(".rdp-button_next").addEventListener("click", function () { step(1); });
+  $(".rdp-button_previous").addEventListener("click", function () { step(-1); });
+
+  $("#shepherd-form").addEventListener("submit", function (e) {
+    e.preventDefault();
+    fetch("/api/shepherd", {
+      method: "POST", headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ vehicle: state.vehicle, start: state.start, end: state.end })
+    }).then(function (r) { $("#toast").textContent = r.ok ? "Report requested" : "Request failed"; });
+  });
+})();
+"""
+
+
+class _OctopusHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):  # keep benchmark output clean
+        pass
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+        self.server.record(len(body))
+
+    def _redirect(self, location, headers=None):
+        self._send(303, b"", headers={"Location": location, **(headers or {})})
+
+    def _session(self):
+        cookie = self.headers.get("Cookie", "")
+        token = next((c.split("=", 1)[1] for c in cookie.split("; ") if c.startswith("session=")), None)
+        return token if token in self.server.sessions else None
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        server.wait(url.path)
+        if url.path == "/":
+            error = "Invalid credentials" if "error" in parse_qs(url.query) else ""
+            self._send(200, _LOGIN_PAGE.format(v=ASSET_VERSION, error=error))
+        elif url.path == "/dashboard":
+            if not self._session():
+                self._redirect("/")
+                return
+            tiles = "".join(f'<img src="/static/tile_{i}.{ASSET_VERSION}.png" alt="">' for i in range(server.images))
+            self._send(200, _DASHBOARD_PAGE.format(v=ASSET_VERSION, tiles=tiles))
+        elif url.path.startswith("/static/"):
+            self._static(url.path[len("/static/"):])
+        elif url.path == "/api/vehicle":
+            reg = parse_qs(url.query).get("reg", [""])[0].strip()
+            if not self._session() or not reg or server.fails("search"):
+                self._send(500, json.dumps({"error": "lookup failed"}), "application/json")
+                return
+            self._send(200, json.dumps({"reg_no": reg}), "application/json")
+        else:
+            self._send(404, "Not found", "text/plain")
+
+    def do_POST(self):
+        server = self.server
+        url = urlparse(self.path)
+        server.wait(url.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if url.path == "/login":
+            form = parse_qs(body.decode("utf-8"))
+            user, password = form.get("username", [""])[0], form.get("password", [""])[0]
+            if server.credentials is not None and (user, password) != server.credentials:
+                self._redirect("/?error=1")
+                return
+            token = uuid.uuid4().hex
+            server.sessions.add(token)
+            self._redirect("/dashboard", {"Set-Cookie": f"session={token}; Path=/; HttpOnly"})
+        elif url.path == "/api/shepherd":
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                request = {}
+            ok = bool(self._session() and request.get("vehicle") and request.get("start") and request.get("end"))
+            ok = ok and not server.fails("submit")
+            server.submit(request, ok)
+            self._send(200 if ok else 500, json.dumps({"ok": ok}), "application/json")
+        else:
+            self._send(404, "Not found", "text/plain")
+
+    def _static(self, name):
+        server = self.server
+        immutable = {"Cache-Control": "public, max-age=31536000, immutable"}
+        if name == f"app.{ASSET_VERSION}.css":
+            self._send(200, _APP_CSS.replace("{v}", ASSET_VERSION), "text/css", immutable)
+        elif name == f"app.{ASSET_VERSION}.js":
+            self._send(200, _APP_JS, "application/javascript", immutable)
+        elif name == f"vendor.{ASSET_VERSION}.js":
+            self._send(200, server.padding("/* vendor */\n", server.bundle_bytes), "application/javascript", immutable)
+        elif name == f"inter.{ASSET_VERSION}.woff2":
+            self._send(200, server.padding("", server.image_bytes), "font/woff2", immutable)
+        elif name.endswith(f".{ASSET_VERSION}.png"):
+            self._send(200, server.padding("", server.image_bytes), "image/png", immutable)
+        else:
+            self._send(404, "Not found", "text/plain")
+
+
+class LocalOctopusServer(ThreadingHTTPServer):
+    """
+    Threaded Octopus UI stand-in. credentials=None accepts any login.
+    bundle_kb / image_kb / images size the static assets a page pulls.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, api_latency_ms=0, search_fail_rate=0.0,
+                 submit_fail_rate=0.0, credentials=None, bundle_kb=800, image_kb=40, images=12, seed=0):
+        super().__init__((host, port), _OctopusHandler)
+        self.latency_s = latency_ms / 1000.0
+        self.api_latency_s = api_latency_ms / 1000.0
+        self.fail_rates = {"search": search_fail_rate, "submit": submit_fail_rate}
+        self.credentials = credentials
+        self.bundle_bytes = bundle_kb * 1024
+        self.image_bytes = image_kb * 1024
+        self.images = images
+        self.sessions = set()
+        self.submissions = []  # [{"vehicle", "start", "end", "ok", "at"}]
+        self.requests_served = 0
+        self.bytes_served = 0
+        self.failures = {"search": 0, "submit": 0}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._padding = {}
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def wait(self, path):
+        delay = self.latency_s + (self.api_latency_s if path.startswith("/api/") else 0)
+        if delay:
+            time.sleep(delay)
+
+    def fails(self, kind):
+        if not self.fail_rates[kind]:
+            return False
+        with self._lock:
+            failed = self._rng.random() < self.fail_rates[kind]
+            self.failures[kind] += failed
+        return failed
+
+    def padding(self, prefix, size):
+        key = (prefix, size)
+        if key not in self._padding:
+            self._padding[key] = prefix.encode("utf-8") + b"x" * max(0, size - len(prefix))
+        return self._padding[key]
+
+    def record(self, nbytes):
+        with self._lock:
+            self.requests_served += 1
+            self.bytes_served += nbytes
+
+    def submit(self, request, ok):
+        with self._lock:
+            self.submissions.append({"vehicle": request.get("vehicle"), "start": request.get("start"),
+                                     "end": request.get("end"), "ok": ok,
+                                     "at": datetime.datetime.now().isoformat(timespec="seconds")})
+
+    def accepted(self):
+        """(vehicle, start, end) of every successful submission."""
+        with self._lock:
+            return [(s["vehicle"], s["start"], s["end"]) for s in self.submissions if s["ok"]]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serve an offline stand-in of the Octopus web UI")
+    ap.add_argument("--port", type=int, default=8090)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--api-latency-ms", type=float, default=0)
+    ap.add_argument("--search-fail-rate", type=float, default=0.0)
+    ap.add_argument("--submit-fail-rate", type=float, default=0.0)
+    ap.add_argument("--bundle-kb", type=int, default=800)
+    ap.add_argument("--image-kb", type=int, default=40)
+    ap.add_argument("--images", type=int, default=12)
+    args = ap.parse_args()
+
+    srv = LocalOctopusServer(port=args.port, latency_ms=args.latency_ms, api_latency_ms=args.api_latency_ms,
+                             search_fail_rate=args.search_fail_rate, submit_fail_rate=args.submit_fail_rate,
+                             bundle_kb=args.bundle_kb, image_kb=args.image_kb, images=args.images)
+    print(f"Octopus stand-in at {srv.base_url} (any username / password)", file=sys.stderr)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        srv.stop()
+    for s in srv.submissions:
+        print(json.dumps(s))
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Request interception for the Octopus browser automation (Phase 1).
+The Shepherd flow only needs the SPA's documents, scripts, styles and API
+calls; images, fonts, media, analytics beacons and map tiles are aborted
+by a Playwright route on the browser context. Scripts and stylesheets that
+pass the filter are kept in an in-process cache and fulfilled from memory
+for every later page and vehicle of the run (Playwright disables the
+browser's own HTTP cache as soon as a route is installed, and each vehicle
+gets a fresh browser anyway).
+
+install() also counts requests and bytes per page, so the same numbers are
+available with the filter switched off:
+
+    stats = browser_routing.install(context)              # filter + cache + stats
+    stats = browser_routing.install(context, policy=None)  # stats only
+"""
+
+import threading
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+# =========================
+# Configuration
+# =========================
+ROUTE_FILTER = True  # Install the allow/deny route in OctopusReportTester; False = measure only
+BLOCK_RESOURCE_TYPES = ("image", "media", "font")  # Playwright request.resource_type values
+DENY_DOMAINS = (  # Host suffixes aborted whatever the resource type
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "hotjar.com", "clarity.ms",
+    "segment.io", "sentry.io", "intercom.io", "tile.openstreetmap.org", "basemaps.cartocdn.com",
+    "maps.googleapis.com", "maps.gstatic.com", "api.mapbox.com", "tiles.mapbox.com",
+)
+ALLOW_DOMAINS = None  # Host suffixes allowed; None allows every host not denied
+CACHE_RESOURCE_TYPES = ("script", "stylesheet")  # Served from memory after the first fetch
+MAX_CACHE_MB = 64  # Cache stops admitting new assets beyond this
+
+
+# =========================
+# Policy
+# =========================
+def _host_matches(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    block_types: tuple = BLOCK_RESOURCE_TYPES
+    deny_domains: tuple = DENY_DOMAINS
+    allow_domains: tuple | None = ALLOW_DOMAINS
+
+    def allows(self, resource_type, url):
+        if resource_type == "document":
+            return True  # Never block the page itself
+        host = (urlparse(url).hostname or "").lower()
+        if _host_matches(host, self.deny_domains):
+            return False
+        if self.allow_domains is not None and not _host_matches(host, self.allow_domains):
+            return False
+        return resource_type not in self.block_types
+
+
+# =========================
+# Asset cache
+# =========================
+class AssetCache:
+    """url -> (status, headers, body) for cacheable GET responses, shared by every page of the process."""
+
+    def __init__(self, types=CACHE_RESOURCE_TYPES, max_mb=MAX_CACHE_MB):
+        self.types = tuple(types)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.nbytes = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            return self._entries.get(url)
+
+    def put(self, url, status, headers, body):
+        cache_control = headers.get("cache-control", "").lower()
+        if status != 200 or "no-store" in cache_control or "private" in cache_control:
+            return
+        with self._lock:
+            if url in self._entries or self.nbytes + len(body) > self.max_bytes:
+                return
+            self._entries[url] = (status, dict(headers), body)
+            self.nbytes += len(body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide AssetCache, so assets fetched for one vehicle are reused for the next."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AssetCache()
+        return _cache
+
+
+# =========================
+# Interception + stats
+# =========================
+@dataclass
+class PageStats:
+    requests: int = 0  # Requests the page issued
+    blocked: int = 0
+    cached: int = 0  # Fulfilled from the AssetCache
+    bytes: int = 0  # Response headers + bodies that came over the network
+    bytes_saved: int = 0  # Bodies served from the cache
+    blocked_types: dict = field(default_factory=dict)
+
+    def as_attrs(self):
+        """Flat attributes for instrumentation.annotate()."""
+        return {"requests": self.requests, "blocked": self.blocked, "cached": self.cached,
+                "bytes": self.bytes, "bytes_saved": self.bytes_saved}
+
+
+def install(target, policy=RoutePolicy(), cache=None, stats=None):
+    """
+    Route every request of a Playwright BrowserContext (or Page) through
+    `policy` and `cache` (default: the process-wide cache; pass policy=None
+    to only measure). Returns the PageStats it keeps updated.
+    """
+    stats = stats or PageStats()
+    lock = threading.Lock()
+    fulfilled = set()  # Requests answered by the route, whose bytes are counted there
+    if policy is not None and cache is None:
+        cache = get_cache()
+
+    def add(**counts):
+        with lock:
+            for k, n in counts.items():
+                setattr(stats, k, getattr(stats, k) + n)
+
+    def on_request(request):
+        add(requests=1)
+
+    def on_finished(request):
+        if request in fulfilled:
+            return
+        try:
+            sizes = request.sizes()
+            add(bytes=sizes["responseHeadersSize"] + sizes["responseBodySize"])
+        except Exception:
+            pass  # Response gone (navigation, closed page): not counted
+
+    def handle(route):
+        request = route.request
+        if not policy.allows(request.resource_type, request.url):
+            with lock:
+                stats.blocked += 1
+                stats.blocked_types[request.resource_type] = stats.blocked_types.get(request.resource_type, 0) + 1
+            route.abort("blockedbyclient")
+            return
+        if request.method != "GET" or request.resource_type not in cache.types:
+            route.continue_()
+            return
+        hit = cache.get(request.url)
+        with lock:
+            fulfilled.add(request)
+        try:
+            if hit is not None:
+                status, headers, body = hit
+                route.fulfill(status=status, headers=headers, body=body)
+                add(cached=1, bytes_saved=len(body))
+            else:
+                response = route.fetch()
+                body = response.body()
+                try:
+                    cache.put(request.url, response.status, response.headers, body)
+                except Exception:
+                    pass  # Not cached; the page still gets the response
+                route.fulfill(response=response, body=body)
+                add(bytes=len(body))
+        except Exception:
+            with lock:
+                fulfilled.discard(request)
+            fallback(route)
+
+    def fallback(route):
+        """Fetch/fulfill failed: let the browser load the request itself (counted by on_finished)."""
+        try:
+            route.continue_()
+        except Exception:
+            pass  # Already handled, or the page is gone
+
+    target.on("request", on_request)
+    target.on("requestfinished", on_finished)
+    if policy is not None:
+        target.route("**/*", handle)
+    return stats
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Compaction and retention for the download tree.
+Canonical exports (see content_index) whose first day is older than
+COMPACT_AFTER_DAYS are folded into one compressed columnar archive per
+vehicle and month, <vehicle>/archive/<vehicle>_<YYYY-MM>.npz: createdAt,
+SoC and the battery temperature matrix of every member file as separate
+NumPy arrays, plus a JSON manifest. Only the columns the reader extracts are
+kept; the other export columns are not used by any phase.
+
+Raw xlsx files that are archived (or superseded duplicates) are deleted once
+older than RAW_RETENTION_DAYS. Archived members keep their original path, so
+report_files() / read_archived() let the report generator, the Phase 1
+planner and the downloader see them as if the xlsx were still there.
+
+    python compaction.py [DOWNLOAD_ROOT] [--compact-after 14] [--retention 30] [--dry-run]
+"""
+
+import os
+import sys
+import json
+import argparse
+import datetime
+import threading
+
+import numpy as np
+
+import content_index
+from telemetry_reader import TelemetryColumns
+from telemetry_store import get_store
+
+# =========================
+# Configuration
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DOWNLOAD_ROOT = os.path.join(BASE_DIR, "download")
+ARCHIVE_DIR_NAME = "archive"
+COMPACT_AFTER_DAYS = 14  # Exports whose first day is older than this are archived
+RAW_RETENTION_DAYS = 30  # Archived raw xlsx older than this are deleted; None keeps them forever
+
+_manifest_cache = {}  # archive path -> (mtime, manifest)
+_manifest_lock = threading.Lock()
+
+
+# =========================
+# Helpers
+# =========================
+def archive_dir(vehicle_folder):
+    return os.path.join(vehicle_folder, ARCHIVE_DIR_NAME)
+
+
+def archive_path(vehicle_folder, month):
+    vehicle = os.path.basename(os.path.normpath(vehicle_folder))
+    return os.path.join(archive_dir(vehicle_folder), f"{vehicle}_{month}.npz")
+
+
+def key_day(name):
+    key = content_index.file_key(name)
+    return datetime.date.fromisoformat(key.split("|")[1]) if key else None
+
+
+def load_manifest(path):
+    """Member list of an archive: [{name, sha256, key, days, soc_column, temp_columns, rows_read}]."""
+    mtime = os.path.getmtime(path)
+    with _manifest_lock:
+        cached = _manifest_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with np.load(path) as z:
+        manifest = json.loads(bytes(z["manifest"]).decode("utf-8"))
+    with _manifest_lock:
+        _manifest_cache[path] = (mtime, manifest)
+    return manifest
+
+
+def archived_members(vehicle_folder):
+    """{member name: (archive path, manifest entry)} over every archive of the vehicle."""
+    folder = archive_dir(vehicle_folder)
+    if not os.path.isdir(folder):
+        return {}
+    members = {}
+    for f in sorted(os.listdir(folder)):
+        if f.endswith(".npz") and not f.endswith(".tmp.npz"):
+            path = os.path.join(folder, f)
+            for entry in load_manifest(path):
+                members[entry["name"]] = (path, entry)
+    return members
+
+
+def archived_days(vehicle_folder):
+    return {datetime.date.fromisoformat(d) for _, e in archived_members(vehicle_folder).values() for d in e["days"]}
+
+
+def archived_keys(vehicle_folder):
+    return {e["key"] for _, e in archived_members(vehicle_folder).values() if e["key"]}
+
+
+def read_archived(path):
+    """TelemetryColumns for an archived export, addressed by its original xlsx path; None if not archived."""
+    folder, name = os.path.split(path)
+    member = archived_members(folder).get(name)
+    if member is None:
+        return None
+    apath, entry = member
+    i = entry["index"]
+    with np.load(apath) as z:
+        created_at, soc, temps = z[f"ts_{i}"], z[f"soc_{i}"], z[f"temps_{i}"]
+    return TelemetryColumns(
+        path=path, created_at=created_at.view("datetime64[ns]"), soc=soc, temps=temps,
+        temp_columns=entry["temp_columns"], soc_column=entry["soc_column"],
+        rows_read=entry["rows_read"], backend="archive",
+    )
+
+
+def report_files(vehicle_folder):
+    """
+    Canonical raw exports plus archived members whose raw file is gone,
+    one per IMEI/day key (a raw canonical file wins over an archived one),
+    ordered by first day so compaction does not reorder report sections.
+    """
+    raw = content_index.canonical_files(vehicle_folder)
+    index = content_index.ContentIndex(vehicle_folder)
+    raw_keys = {index.entries[os.path.basename(p)]["key"] for p in raw} - {None}
+    raw_hashes = {e["sha256"] for e in index.entries.values()}
+    archived = [os.path.join(vehicle_folder, name) for name, (_, e) in archived_members(vehicle_folder).items()
+                if not os.path.exists(os.path.join(vehicle_folder, name))
+                and e["key"] not in raw_keys and e["sha256"] not in raw_hashes]
+    return sorted(raw + archived, key=lambda p: (key_day(p) or datetime.date.max, os.path.basename(p)))
+
+
+# =========================
+# Compaction
+# =========================
+def _write_archive(path, members):
+    """members: [(manifest entry, TelemetryColumns)] -> one compressed .npz, replaced atomically."""
+    arrays, manifest = {}, []
+    for i, (entry, cols) in enumerate(members):
+        arrays[f"ts_{i}"] = cols.created_at.astype("datetime64[ns]").view(np.int64)
+        arrays[f"soc_{i}"] = cols.soc
+        arrays[f"temps_{i}"] = np.ascontiguousarray(cols.temps, dtype=np.float32)
+        manifest.append(dict(entry, index=i))
+    arrays["manifest"] = np.frombuffer(json.dumps(manifest).encode("utf-8"), dtype=np.uint8)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def compact_vehicle(vehicle_folder, compact_after_days=COMPACT_AFTER_DAYS, retention_days=RAW_RETENTION_DAYS,
+                    today=None, dry_run=False):
+    """Archive old canonical exports by month, then apply raw retention. Returns a stats dict."""
+    today = today or datetime.date.today()
+    compact_before = today - datetime.timedelta(days=compact_after_days)
+    stats = {"archived": 0, "deleted": 0, "bytes_freed": 0, "archives": 0}
+
+    canonical = {os.path.basename(p) for p in content_index.canonical_files(vehicle_folder)}
+    index = content_index.ContentIndex(vehicle_folder)
+    members = archived_members(vehicle_folder)
+
+    by_month = {}
+    for name in canonical:
+        day = key_day(name)
+        if name in members or day is None or day >= compact_before:
+            continue
+        by_month.setdefault(day.strftime("%Y-%m"), []).append(name)
+
+    store = get_store()
+    newly_archived = set()
+    for month, names in sorted(by_month.items()):
+        path = archive_path(vehicle_folder, month)
+        existing = [(e, read_archived(os.path.join(vehicle_folder, e["name"])))
+                    for e in (load_manifest(path) if os.path.exists(path) else [])]
+        added = []
+        for name in sorted(names, key=key_day):
+            cols = store.read_file(os.path.join(vehicle_folder, name), os.path.basename(vehicle_folder))
+            if cols is None:
+                continue
+            e = index.entries[name]
+            days = sorted({str(d) for d in cols.created_at.astype("datetime64[D]")})
+            added.append(({"name": name, "sha256": e["sha256"], "key": e["key"], "days": days,
+                           "soc_column": cols.soc_column, "temp_columns": list(cols.temp_columns),
+                           "rows_read": cols.rows_read}, cols))
+        if added and not dry_run:
+            _write_archive(path, [(dict(e), c) for e, c in existing] + added)
+            stats["archives"] += 1
+        stats["archived"] += len(added)
+        newly_archived.update(e["name"] for e, _ in added)
+
+    if retention_days is not None:
+        delete_before = today - datetime.timedelta(days=retention_days)
+        archived = set(members) | newly_archived
+        for name, e in index.entries.items():
+            day = key_day(name)
+            if day is None or day >= delete_before:
+                continue
+            if name in archived or name not in canonical:
+                stats["deleted"] += 1
+                stats["bytes_freed"] += e["size"]
+                if not dry_run:
+                    os.remove(os.path.join(vehicle_folder, name))
+        if stats["deleted"] and not dry_run:
+            content_index.canonical_files(vehicle_folder)  # drop the deleted files from the index
+    return stats
+
+
+def compact_all(download_root=DOWNLOAD_ROOT, vehicles=None, **kwargs):
+    """Compact every active registry vehicle (or the given ids) under download_root."""
+    if vehicles is None:
+        from vehicle_registry import get_registry
+        vehicles = get_registry().active_ids()
+    totals = {}
+    for v in vehicles:
+        folder = os.path.join(download_root, v)
+        if not os.path.isdir(folder):
+            continue
+        stats = compact_vehicle(folder, **kwargs)
+        if any(stats.values()):
+            print(f"🗜️ {v}: {stats['archived']} file(s) archived, {stats['deleted']} raw file(s) removed "
+                  f"({stats['bytes_freed'] / 1e6:.1f} MB)")
+        for k, n in stats.items():
+            totals[k] = totals.get(k, 0) + n
+    return totals
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fold old exports into monthly archives and apply raw retention")
+    ap.add_argument("download_root", nargs="?", default=DOWNLOAD_ROOT)
+    ap.add_argument("--compact-after", type=int, default=COMPACT_AFTER_DAYS, help="archive exports older than N days")
+    ap.add_argument("--retention", type=int, default=RAW_RETENTION_DAYS,
+                    help="delete archived raw xlsx older than N days (-1 keeps them)")
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+
+    totals = compact_all(args.download_root, compact_after_days=args.compact_after,
+                         retention_days=None if args.retention < 0 else args.retention, dry_run=args.dry_run)
+    print(f"{totals.get('archived', 0)} file(s) archived into {totals.get('archives', 0)} archive(s), "
+          f"{totals.get('deleted', 0)} raw file(s) {'would be ' if args.dry_run else ''}removed, "
+          f"{totals.get('bytes_freed', 0) / 1e6:.1f} MB", file=sys.stderr)
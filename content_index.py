@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Per-vehicle content index for downloaded exports.
+Every xlsx in a vehicle folder is recorded by SHA-256, size, kind (CAN/CSV)
+and (IMEI, first day) key, in <vehicle folder>/.content_index.json.
+
+- Byte-identical downloads are detected while streaming and never written.
+- Same-IMEI same-day exports (re-sent emails, CAN and CSV variants) are kept
+  on disk, but only one canonical file per key is handed to the report
+  stage: CAN over CSV, then the larger file, then the first one downloaded.
+
+    python content_index.py [DOWNLOAD_ROOT]   # index existing folders, list duplicates
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import logging
+import datetime
+import threading
+
+from telemetry_store import imei_from_filename
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Configuration
+# =========================
+INDEX_NAME = ".content_index.json"
+HASH_CHUNK = 1024 * 1024
+KIND_PRIORITY = {"CAN": 2, "CSV": 1}  # Preferred export variant for a day
+
+_DAY_PREFIX_RE = re.compile(r'^(\d{1,2})-(\d{1,2})-(\d{4})_')
+_KIND_RE = re.compile(r'Internal_Report_([A-Z]+)_', re.IGNORECASE)
+_folder_locks = {}
+_folder_locks_guard = threading.Lock()
+
+
+# =========================
+# Helpers
+# =========================
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_key(name):
+    """'<imei>|<YYYY-MM-DD>' from '<D-M-YYYY>_…_Parsed_<imei>_…', or None when either part is missing."""
+    m = _DAY_PREFIX_RE.match(os.path.basename(name))
+    imei = imei_from_filename(name)
+    if not m or not imei:
+        return None
+    try:
+        day = datetime.date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+    except ValueError:
+        return None
+    return f"{imei}|{day.isoformat()}"
+
+
+def file_kind(name):
+    m = _KIND_RE.search(os.path.basename(name))
+    return m.group(1).upper() if m else None
+
+
+def folder_lock(folder):
+    """One lock per vehicle folder guards its index file."""
+    folder = os.path.abspath(folder)
+    with _folder_locks_guard:
+        return _folder_locks.setdefault(folder, threading.Lock())
+
+
+# =========================
+# Index
+# =========================
+class ContentIndex:
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, INDEX_NAME)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": self.entries}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def add(self, name, sha256, size):
+        self.entries[name] = {"sha256": sha256, "size": size, "key": file_key(name), "kind": file_kind(name)}
+
+    def refresh(self):
+        """Index xlsx files not seen yet (or changed size); forget removed ones. Returns True if anything changed."""
+        on_disk = {f: os.path.getsize(os.path.join(self.folder, f))
+                   for f in os.listdir(self.folder) if f.lower().endswith(".xlsx")}
+        changed = False
+        for name in list(self.entries):
+            if name not in on_disk:
+                del self.entries[name]
+                changed = True
+        for name, size in on_disk.items():
+            entry = self.entries.get(name)
+            if entry is None or entry["size"] != size:
+                self.add(name, sha256_file(os.path.join(self.folder, name)), size)
+                changed = True
+        return changed
+
+    def find_hash(self, sha256):
+        return next((name for name, e in self.entries.items() if e["sha256"] == sha256), None)
+
+    def _rank(self, name):
+        e = self.entries[name]
+        return KIND_PRIORITY.get(e["kind"], 0), e["size"]
+
+    def canonical(self):
+        """Canonical file names in index order: one per key, every unkeyed file, identical copies once."""
+        best, seen_hashes, unkeyed = {}, set(), []
+        for name, e in self.entries.items():
+            if e["sha256"] in seen_hashes:
+                continue
+            seen_hashes.add(e["sha256"])
+            if e["key"] is None:
+                unkeyed.append(name)
+            elif e["key"] not in best or self._rank(name) > self._rank(best[e["key"]]):
+                best[e["key"]] = name
+        chosen = set(best.values()) | set(unkeyed)
+        return [name for name in self.entries if name in chosen]
+
+    def duplicates(self):
+        chosen = set(self.canonical())
+        return [name for name in self.entries if name not in chosen]
+
+
+def canonical_files(vehicle_folder):
+    """Paths of the canonical xlsx exports in a vehicle folder (indexes new files first)."""
+    with folder_lock(vehicle_folder):
+        index = ContentIndex(vehicle_folder)
+        if index.refresh():
+            index.save()
+        return [os.path.join(vehicle_folder, name) for name in index.canonical()]
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "download")
+    total_dupes = total_bytes = 0
+    for d in sorted(os.listdir(root)):
+        folder = os.path.join(root, d)
+        if not os.path.isdir(folder):
+            continue
+        with folder_lock(folder):
+            index = ContentIndex(folder)
+            index.refresh()
+            index.save()
+        dupes = index.duplicates()
+        if dupes:
+            size = sum(index.entries[n]["size"] for n in dupes)
+            total_dupes += len(dupes)
+            total_bytes += size
+            print(f"{d}: {len(dupes)} non-canonical file(s), {size / 1e6:.1f} MB")
+            for n in dupes:
+                print(f"    {n}")
+    print(f"{total_dupes} non-canonical file(s), {total_bytes / 1e6:.1f} MB", file=sys.stderr)
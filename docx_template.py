@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Template-based DOCX assembly for temperature reports.
+The styles, page border and layout live in a prebuilt template
+(templates/temp_report_template.docx) with {{SUMMARY}} / {{SECTIONS}}
+placeholder paragraphs. The whole report body is generated as one XML
+string and parsed in a single pass instead of one python-docx call per
+paragraph, cell and shading element.
+"""
+
+import os
+import threading
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.shared import Inches
+
+from report_formats import section_table_rows
+
+# =========================
+# Configuration
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_PATH = os.path.join(BASE_DIR, "templates", "temp_report_template.docx")
+SUMMARY_PLACEHOLDER = "{{SUMMARY}}"
+SECTIONS_PLACEHOLDER = "{{SECTIONS}}"
+
+IMAGE_WIDTH_EMU = int(Inches(6.5))
+TABLE_STYLE_ID = "LightList-Accent1"
+TABLE_COL_TWIPS = 4320  # 2 x 3 inches, same grid python-docx uses for a 2-column table
+SHADE_FILL = "FF0000"
+
+_NS = nsdecls("w", "wp", "a", "pic", "r")
+
+
+# =========================
+# Template
+# =========================
+def build_report_template(path=TEMPLATE_PATH):
+    """(Re)build the styled template: page border + the two placeholder paragraphs."""
+    from report_generator import set_page_border
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    doc = Document()
+    set_page_border(doc.sections[0])
+    doc.add_paragraph(SUMMARY_PLACEHOLDER)
+    doc.add_paragraph(SECTIONS_PLACEHOLDER)
+    doc.save(path)
+    return path
+
+
+_template_lock = threading.Lock()
+
+def get_report_template(path=TEMPLATE_PATH):
+    with _template_lock:
+        if not os.path.exists(path):
+            build_report_template(path)
+    return path
+
+
+# =========================
+# XML fragments
+# =========================
+def _run(text, bold=False, size_half_pts=None, color=None):
+    props = ""
+    if bold:
+        props += "<w:b/>"
+    if color:
+        props += f'<w:color w:val="{color}"/>'
+    if size_half_pts:
+        props += f'<w:sz w:val="{size_half_pts}"/>'
+    rpr = f"<w:rPr>{props}</w:rPr>" if props else ""
+    return f'<w:r>{rpr}<w:t xml:space="preserve">{escape(str(text))}</w:t></w:r>'
+
+
+def _paragraph(runs_xml, style=None):
+    ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{ppr}{runs_xml}</w:p>"
+
+
+def _picture(r_id, px_width, px_height, pic_id, ext="png"):
+    cx = IMAGE_WIDTH_EMU
+    cy = int(cx * px_height / px_width) if px_width else cx
+    return (
+        '<w:p><w:r><w:drawing><wp:inline>'
+        f'<wp:extent cx="{cx}" cy="{cy}"/>'
+        f'<wp:docPr id="{pic_id}" name="Picture {pic_id}"/>'
+        '<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+        '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<pic:pic><pic:nvPicPr><pic:cNvPr id="0" name="chart_{pic_id}.{ext}"/><pic:cNvPicPr/></pic:nvPicPr>'
+        f'<pic:blipFill><a:blip r:embed="{r_id}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+        f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+        '<a:prstGeom prst="rect"/></pic:spPr></pic:pic>'
+        '</a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>'
+    )
+
+
+def _cell(text, shaded=False):
+    shade = f'<w:shd w:val="clear" w:color="auto" w:fill="{SHADE_FILL}"/>' if shaded else ""
+    run = _run(text, bold=True, color="FFFFFF") if shaded else _run(text)
+    return f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{TABLE_COL_TWIPS}"/>{shade}</w:tcPr><w:p>{run}</w:p></w:tc>'
+
+
+def _table(rows):
+    """rows: [(label, value, shaded)]"""
+    body = "".join(f"<w:tr>{_cell(k, s)}{_cell(v, s)}</w:tr>" for k, v, s in rows)
+    return (
+        f'<w:tbl><w:tblPr><w:tblStyle w:val="{TABLE_STYLE_ID}"/><w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/>'
+        f'</w:tblPr><w:tblGrid><w:gridCol w:w="{TABLE_COL_TWIPS}"/><w:gridCol w:w="{TABLE_COL_TWIPS}"/></w:tblGrid>'
+        f"{body}</w:tbl>"
+    )
+
+
+_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+def section_xml(report_id, m, r_id, px_width, px_height, pic_id, ext="png"):
+    """Body XML of one day section: headings, chart, metrics table, page break."""
+    return "".join((
+        _paragraph(_run(f"TEMPERATURE PROFILE FOR {report_id}", bold=True, size_half_pts=28), style="Title"),
+        _paragraph(_run(f"Date: {m.date}"), style="Heading1"),
+        _picture(r_id, px_width, px_height, pic_id, ext),
+        _table(section_table_rows(m)),
+        _PAGE_BREAK,
+    ))
+
+
+def summary_xml(text):
+    return _paragraph(_run(text, bold=True, size_half_pts=22, color="FF0000"))
+
+
+# =========================
+# Assembly
+# =========================
+def _replace_placeholder(body, placeholder, fragment_xml):
+    target = next((p for p in body.iterchildren(qn("w:p"))
+                   if "".join(t.text or "" for t in p.iter(qn("w:t"))) == placeholder), None)
+    if target is None:
+        return
+    if fragment_xml:
+        container = parse_xml(f"<w:body {_NS}>{fragment_xml}</w:body>")
+        for el in list(container):
+            target.addprevious(el)
+    body.remove(target)
+
+
+def assemble_docx_template(rendered, summary_text=None, template_path=None):
+    """
+    rendered: [(report_id, metrics row, image stream)]; returns a docx Document.
+    Images are registered as package parts (deduplicated by content), then the
+    whole body is generated and parsed in one go.
+    """
+    doc = Document(template_path or get_report_template())
+    part = doc.part
+    chunks = []
+    for pic_id, (report_id, m, image_stream) in enumerate(rendered, start=1):
+        r_id, image = part.get_or_add_image(image_stream)
+        chunks.append(section_xml(report_id, m, r_id, image.px_width, image.px_height, pic_id, image.ext))
+
+    body = doc.element.body
+    _replace_placeholder(body, SECTIONS_PLACEHOLDER, "".join(chunks))
+    _replace_placeholder(body, SUMMARY_PLACEHOLDER, summary_xml(summary_text) if summary_text else "")
+    return doc
+
+
+if __name__ == "__main__":
+    print(f"Template written to {build_report_template()}")
@@ -5,22 +5,44 @@ import os
 import logging
 import datetime
 import requests
+import queue
+import socket
+import ssl
 import threading
 import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import tkinter as tk
 from email.header import decode_header
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup  # pip install beautifulsoup4
 import pandas as pd            # pip install pandas openpyxl
 import re
+import hashlib
+
+import compaction
+import content_index
+import imbalance_alerts
+from instrumentation import annotate, span, timed
+from telemetry_reader import read_first_timestamp
+from vehicle_registry import get_registry
 
 # ----------------- Config -----------------
 DEFAULT_WAIT_MINUTES = 60  # Default countdown (in minutes)
 load_dotenv()
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASS = os.getenv("EMAIL_PASS")
-IMAP_SERVER = "imap.gmail.com"
-IMAP_PORT = 993
+# Overridable for offline runs against benchmarks/local_imap.py (IMAP_SERVER=127.0.0.1 IMAP_SSL=0 …)
+IMAP_SERVER = os.getenv("IMAP_SERVER", "imap.gmail.com")
+IMAP_PORT = int(os.getenv("IMAP_PORT", "993"))
+IMAP_SSL = os.getenv("IMAP_SSL", "1") != "0"
+IMAP_TIMEOUT_SECS = 60  # Socket timeout per IMAP connection
+IMAP_WORKERS = 4  # Vehicles fetched in parallel, one pooled IMAP connection each
+IMAP_MAX_CONNECTIONS = 10  # Gmail allows 15 simultaneous IMAP connections per account; keep headroom
+IMAP_RETRIES = 2  # Reconnect-and-retry attempts per vehicle after abort / timeout
+IMAP_RETRY_DELAY_SECS = 1.0  # Grows linearly with the attempt number
+HTTP_TIMEOUT_SECS = 30
+HTTP_GET = requests.get  # Swappable HTTP backend for download_file
 
 # Logging setup
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -46,7 +68,10 @@ def decode_mime_words(s):
 def connect_to_mailbox():
     """Connect to IMAP mailbox."""
     try:
-        mail = imaplib.IMAP4_SSL(IMAP_SERVER, IMAP_PORT)
+        if IMAP_SSL:
+            mail = imaplib.IMAP4_SSL(IMAP_SERVER, IMAP_PORT, timeout=IMAP_TIMEOUT_SECS)
+        else:
+            mail = imaplib.IMAP4(IMAP_SERVER, IMAP_PORT, timeout=IMAP_TIMEOUT_SECS)
         mail.login(EMAIL_USER, EMAIL_PASS)
         mail.select("inbox")
         return mail
@@ -55,8 +80,89 @@ def connect_to_mailbox():
         raise
 
 
-def search_latest_vehicle_email(mail, vehicle_id):
-    """Find latest email with Internal Reports for a vehicle."""
+# Errors after which a connection is unusable: dropped by the server, timed out, socket/SSL failure.
+# Not bare OSError: local file errors (permissions, disk full) leave the connection healthy and a retry
+# would not help
+RECONNECT_ERRORS = (imaplib.IMAP4.abort, socket.timeout, ssl.SSLError, ConnectionError)
+
+
+class ImapConnectionPool:
+    """
+    Up to `size` authenticated connections, each selected on the inbox.
+    Connections are opened lazily and handed to one worker at a time.
+    A connection that fails with abort / timeout is dropped and a fresh
+    one is opened on the next checkout.
+    """
+
+    def __init__(self, size=IMAP_WORKERS, connect=None):
+        self.size = max(1, min(size, IMAP_MAX_CONNECTIONS))
+        self._connect = connect or connect_to_mailbox
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._all = set()
+        self.reconnects = 0
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                mail = self._idle.get_nowait()
+            except queue.Empty:
+                mail = self._connect()
+                with self._lock:
+                    self._all.add(mail)
+            try:
+                yield mail
+            except RECONNECT_ERRORS:
+                self._discard(mail)
+                raise
+            except BaseException:
+                self._idle.put(mail)
+                raise
+            self._idle.put(mail)
+        finally:
+            self._slots.release()
+
+    def run(self, fn, *args, retries=IMAP_RETRIES):
+        """fn(mail, *args) on a pooled connection, retried on a fresh connection after abort / timeout."""
+        for attempt in range(retries + 1):
+            try:
+                with self.connection() as mail:
+                    return fn(mail, *args)
+            except RECONNECT_ERRORS as e:
+                if attempt == retries:
+                    raise
+                with self._lock:
+                    self.reconnects += 1
+                logger.warning(f"IMAP connection lost ({type(e).__name__}: {e}); reconnecting "
+                               f"(attempt {attempt + 1}/{retries})")
+                time.sleep(IMAP_RETRY_DELAY_SECS * (attempt + 1))
+
+    def _discard(self, mail):
+        with self._lock:
+            self._all.discard(mail)
+        try:
+            mail.shutdown()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            conns, self._all = list(self._all), set()
+        for mail in conns:
+            try:
+                mail.logout()
+            except Exception:
+                pass
+
+
+def search_vehicle_emails(mail, vehicle_id):
+    """
+    Ids of every Internal Reports email for a vehicle from the last 2 days, newest first.
+    Phase 1 submits one Shepherd request per missing range and each produces its own email.
+    """
     since_date = (datetime.datetime.now() - datetime.timedelta(days=2)).strftime("%d-%b-%Y")
     search_query = f'(SINCE "{since_date}" SUBJECT "Internal Reports {vehicle_id}")'
     status, data = mail.search(None, search_query)
@@ -66,8 +172,8 @@ def search_latest_vehicle_email(mail, vehicle_id):
         return None
 
     email_ids = data[0].split()
-    logger.info(f"Found {len(email_ids)} emails for {vehicle_id}. Using latest one.")
-    return email_ids[-1]
+    logger.info(f"Found {len(email_ids)} emails for {vehicle_id}.")
+    return email_ids[::-1]
 
 
 def clean_or_create_folder(vehicle_id):
@@ -77,23 +183,27 @@ def clean_or_create_folder(vehicle_id):
     return vehicle_folder
 
 
+EMAIL_DATE_RE = re.compile(r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})')  # D/M/YYYY (or D-M-YYYY) in a report row
+
+
 def parse_email_date(date_str):
     """
     Parse a date like '1/9/2025' (DD/MM/YYYY) to a date object.
-    If the cell contains extra text, extract the first DD/MM/YYYY pattern.
+    If the cell contains extra text, the first DD/MM/YYYY pattern is used.
     Returns datetime.date or None.
     """
-    # Try direct parse (handles many formats)
+    m = EMAIL_DATE_RE.search(str(date_str))
+    if m:
+        day, month, year = (int(g) for g in m.groups())
+        try:
+            return datetime.date(year, month, day)
+        except ValueError:
+            pass
+
+    # Anything else: let pandas guess (day first), as before
     dt = pd.to_datetime(date_str, dayfirst=True, errors="coerce")
     if pd.notna(dt):
         return dt.date()
-
-    # Fallback: regex extract first dd/mm/yyyy
-    m = re.search(r'(\d{1,2}/\d{1,2}/\d{4})', str(date_str))
-    if m:
-        dt = pd.to_datetime(m.group(1), dayfirst=True, errors="coerce")
-        if pd.notna(dt):
-            return dt.date()
     return None
 
 
@@ -108,19 +218,12 @@ def get_existing_first_created_dates(folder):
         if file.lower().endswith(".xlsx"):
             path = os.path.join(folder, file)
             try:
-                df = pd.read_excel(path, engine="openpyxl")
-                if "createdAt" in df.columns:
-                    ser = df["createdAt"].dropna()
-                    if not ser.empty:
-                        # First non-null value only (as requested)
-                        first_val = ser.iloc[0]
-                        dt = pd.to_datetime(first_val, errors="coerce")
-                        if pd.notna(dt):
-                            existing_dates.add(dt.date())
-                        else:
-                            logger.debug(f"First createdAt not a valid datetime in {file}: {first_val}")
+                # Streams the sheet only up to the first createdAt row
+                first = read_first_timestamp(path)
+                if first is not None:
+                    existing_dates.add(pd.Timestamp(first).date())
                 else:
-                    logger.debug(f"'createdAt' column not found in {file}")
+                    logger.debug(f"No valid createdAt found in {file}")
             except Exception as e:
                 logger.warning(f"Could not read {path}: {e}")
     return existing_dates
@@ -172,69 +275,152 @@ def extract_all_links(msg):
     return links
 
 
+@timed("phase2.download_file")
 def download_file(url, folder, date_range=None):
-    """Download file from given URL."""
+    """
+    Download file from given URL into the vehicle folder's content index.
+    Returns the saved path, or None when it failed or duplicates a file already there:
+    same IMEI/day with an equally preferred variant (skipped before the request)
+    or byte-identical content (hashed while streaming, never written).
+    """
     base_name = url.split("/")[-1].split("?")[0]
     if date_range:
         base_name = f"{date_range.replace('/', '-')}_{base_name}"
     local_filename = os.path.join(folder, base_name)
 
+    with content_index.folder_lock(folder):
+        index = content_index.ContentIndex(folder)
+        if index.refresh():
+            index.save()
+    key, kind = content_index.file_key(base_name), content_index.file_kind(base_name)
+    rank = content_index.KIND_PRIORITY.get(kind, 0)
+    same_day = [n for n, e in index.entries.items()
+                if key and e["key"] == key and content_index.KIND_PRIORITY.get(e["kind"], 0) >= rank]
+    if not same_day and key in compaction.archived_keys(folder):
+        same_day = [f"{compaction.ARCHIVE_DIR_NAME}/"]
+    if same_day:
+        logger.info(f"Skipping {base_name}: {same_day[0]} already covers {key}")
+        annotate(duplicate="key")
+        return None
+
     logger.info(f"Downloading: {url}")
+    part = local_filename + ".part"
     try:
-        resp = requests.get(url, stream=True, timeout=30)
+        resp = HTTP_GET(url, stream=True, timeout=HTTP_TIMEOUT_SECS)
         resp.raise_for_status()
-        with open(local_filename, "wb") as f:
+        size = 0
+        digest = hashlib.sha256()
+        with open(part, "wb") as f:
             for chunk in resp.iter_content(chunk_size=8192):
                 f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        annotate(bytes=size)
+        sha = digest.hexdigest()
+        with content_index.folder_lock(folder):
+            index = content_index.ContentIndex(folder)
+            twin = index.find_hash(sha)
+            if twin:
+                os.remove(part)
+                logger.info(f"Discarded {base_name}: identical to {twin}")
+                annotate(duplicate="content")
+                return None
+            os.replace(part, local_filename)
+            index.add(base_name, sha, size)
+            index.save()
         logger.info(f"Saved file: {local_filename}")
         return local_filename
     except Exception as e:
         logger.error(f"Failed to download {url}: {e}")
+        annotate(error=type(e).__name__)
+        if os.path.exists(part):
+            os.remove(part)
         return None
 
 
-def process_vehicle(mail, vehicle_id):
-    """Process a single vehicle email and download reports."""
-    logger.info(f"Processing vehicle: {vehicle_id}")
-    email_id = search_latest_vehicle_email(mail, vehicle_id)
-    if not email_id:
+def ingest_downloaded_file(path, vehicle_id):
+    """Parse a fresh download into the telemetry store once, so later phases read it from there."""
+    try:
+        from telemetry_store import get_store
+        store = get_store()
+        rows = store.ingest_file(path, vehicle_id)
+        logger.info(f"Ingested {rows} rows from {os.path.basename(path)} into telemetry store")
+    except Exception as e:
+        logger.warning(f"Could not ingest {path} into telemetry store: {e}")
         return
+    try:
+        # Rolling imbalance stats, O(rows of this file); breaches go to the alerts outbox
+        imbalance_alerts.observe_file(path, vehicle_id, store.read_file(path, vehicle_id))
+    except Exception as e:
+        logger.warning(f"Could not update imbalance alerts for {path}: {e}")
 
-    status, msg_data = mail.fetch(email_id, "(RFC822)")
-    if status != "OK":
-        logger.error(f"Failed to fetch email for {vehicle_id}")
-        return
 
-    raw_msg = msg_data[0][1]
-    msg = email.message_from_bytes(raw_msg)
+@timed("phase2.process_vehicle", vehicle="vehicle_id")
+def process_vehicle(mail, vehicle_id):
+    """
+    Process every recent report email of a vehicle (newest first) and download its reports.
+    Returns one set of report-row dates per email whose links were processed.
+    """
+    logger.info(f"Processing vehicle: {vehicle_id}")
+    with span("phase2.search_email"):
+        email_ids = search_vehicle_emails(mail, vehicle_id)
+    if not email_ids:
+        return []
 
     vehicle_folder = clean_or_create_folder(vehicle_id)
-    existing_first_dates = get_existing_first_created_dates(vehicle_folder)
+    with span("phase2.existing_dates"):
+        existing_first_dates = get_existing_first_created_dates(vehicle_folder)
+
+    processed = []
+    for email_id in email_ids:
+        with span("phase2.fetch_email") as sp:
+            status, msg_data = mail.fetch(email_id, "(RFC822)")
+            if status == "OK":
+                sp["bytes"] = len(msg_data[0][1])
+        if status != "OK":
+            logger.error(f"Failed to fetch email {email_id!r} for {vehicle_id}")
+            continue
 
-    links = extract_all_links(msg)
-    if not links:
-        logger.warning(f"No report links found for {vehicle_id}")
-        return
+        raw_msg = msg_data[0][1]
+        msg = email.message_from_bytes(raw_msg)
 
-    for idx, (link, date_range, report_type) in enumerate(links, 1):
-        link_date = parse_email_date(date_range)
-        if not link_date:
-            logger.warning(f"Invalid date in email row for {vehicle_id}: {date_range}")
+        with span("phase2.extract_links"):
+            links = extract_all_links(msg)
+        if not links:
+            logger.warning(f"No report links found in email {email_id!r} for {vehicle_id}")
             continue
+        email_days = set()
+        processed.append(email_days)
 
-        if link_date in existing_first_dates:
-            logger.info(f"Skipping {vehicle_id} report for {link_date} (already present by first createdAt in some xlsx)")
-            continue
+        for idx, (link, date_range, report_type) in enumerate(links, 1):
+            link_date = parse_email_date(date_range)
+            if not link_date:
+                logger.warning(f"Invalid date in email row for {vehicle_id}: {date_range}")
+                continue
+            email_days.add(link_date)
+
+            if link_date in existing_first_dates:
+                logger.info(f"Skipping {vehicle_id} report for {link_date} (already present by first createdAt in some xlsx)")
+                continue
 
-        logger.info(
-            f"Downloading {report_type.upper()} report {idx}/{len(links)} "
-            f"for {vehicle_id} (Date: {date_range})"
-        )
-        download_file(link, vehicle_folder, date_range)
+            logger.info(
+                f"Downloading {report_type.upper()} report {idx}/{len(links)} "
+                f"for {vehicle_id} (Date: {date_range})"
+            )
+            saved = download_file(link, vehicle_folder, date_range)
+            if saved:
+                existing_first_dates.add(link_date)  # An older email listing the same day is skipped
+                with span("phase2.ingest"):
+                    ingest_downloaded_file(saved, vehicle_id)
+    return processed
 
 
+@timed("phase2.all")
 def fetch_reports_for_all_vehicles(vehicle_file="vehicle_list.txt"):
-    """Fetch reports for all vehicles listed in the text file."""
+    """
+    Fetch reports for every active vehicle in the registry (vehicle_list.txt).
+    Returns {vehicle: [set of report-row dates per processed email]}.
+    """
     logger.info("Starting Phase 2: Fetching reports from email...")
 
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -242,27 +428,30 @@ def fetch_reports_for_all_vehicles(vehicle_file="vehicle_list.txt"):
 
     if not os.path.exists(file_path):
         logger.error(f"{vehicle_file} not found.")
-        return
-
-    with open(file_path, "r") as f:
-        vehicle_ids = [line.split(",")[0].strip() for line in f if line.strip()]
+        return {}
 
+    vehicle_ids = get_registry(file_path).active_ids()
     if not vehicle_ids:
-        logger.warning(f"{vehicle_file} is empty. Nothing to process.")
-        return
+        logger.warning(f"{vehicle_file} has no active vehicles. Nothing to process.")
+        return {}
 
-    mail = connect_to_mailbox()
+    processed = {}
+    pool = ImapConnectionPool(min(IMAP_WORKERS, len(vehicle_ids)))
     try:
-        for vehicle_id in vehicle_ids:
-            try:
-                process_vehicle(mail, vehicle_id)
-            except Exception as e:
-                logger.error(f"Error processing {vehicle_id}: {e}")
-                continue
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            futures = {executor.submit(pool.run, process_vehicle, vehicle_id): vehicle_id for vehicle_id in vehicle_ids}
+            for fut in as_completed(futures):
+                try:
+                    processed[futures[fut]] = fut.result() or []
+                except Exception as e:
+                    logger.error(f"Error processing {futures[fut]}: {e}")
     finally:
-        mail.logout()
+        pool.close()
+    if pool.reconnects:
+        logger.info(f"IMAP pool reconnected {pool.reconnects} time(s)")
 
     logger.info("✅ All email reports fetched successfully.")
+    return processed
 
 
 # ----------------- Countdown GUI -----------------
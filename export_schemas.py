@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Known layouts of the Octopus Internal Report exports (CAN / CSV parsed xlsx).
+Each schema names the timestamp column and its exact format, the SoC column
+and the per-cell temperature columns. A file's schema is detected once from
+its header row; readers then parse with the explicit timestamp format and
+plain NumPy casts. Headers no schema matches fall back to the generic
+regex-based column selection with format inference.
+
+    python export_schemas.py FILE.xlsx ...   # which schema each export matches
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+
+# =========================
+# Schemas
+# =========================
+@dataclass(frozen=True)
+class ExportSchema:
+    name: str
+    timestamp_column: str
+    timestamp_format: str | None  # None: let pandas infer (fallback only)
+    soc_column: str
+    temp_column_re: re.Pattern  # Full-name match of a per-cell temperature column
+
+    def select(self, names):
+        """(ts_idx, soc_idx, soc_name, [(temp_idx, temp_name)]) for a header, or None if it does not fit."""
+        if self.timestamp_column not in names or self.soc_column not in names:
+            return None
+        temps = [(i, n) for i, n in enumerate(names) if self.temp_column_re.fullmatch(n)]
+        if not temps:
+            return None
+        return names.index(self.timestamp_column), names.index(self.soc_column), self.soc_column, temps
+
+
+EXPORT_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # createdAt text, e.g. "2025-08-31 00:00:04"
+
+# Tried in order; the first one that fits the header wins
+EXPORT_SCHEMAS = {
+    # CAN exports and most CSV exports: camelCase columns, batteryBmsTemperature1..N
+    "camel": ExportSchema("camel", "createdAt", EXPORT_TIMESTAMP_FORMAT, "batteryStateOfCharge",
+                          re.compile(r"batteryBmsTemperature\d+")),
+    # Older CSV exports: snake_case columns, battery_bms_temperature_1..N
+    "snake": ExportSchema("snake", "createdAt", EXPORT_TIMESTAMP_FORMAT, "battery_state_of_charge",
+                          re.compile(r"battery_bms_temperature_\d+")),
+}
+
+TIMESTAMP_COLUMN = "createdAt"
+SOC_CANDIDATES = ['batteryStateOfCharge', 'battery_state_of_charge', 'SoC']
+TEMP_COLUMN_RE = re.compile(r'battery.*temp.*\d+', flags=re.IGNORECASE)
+
+
+def header_names(header):
+    return [str(h) if h is not None else "" for h in header]
+
+
+def fallback_select(names):
+    """Generic selection for unknown layouts: createdAt, first known SoC name, every battery*temp*N column."""
+    if TIMESTAMP_COLUMN not in names:
+        return None
+    soc_name = next((c for c in SOC_CANDIDATES if c in names), None)
+    if soc_name is None:
+        return None
+    temps = [(i, n) for i, n in enumerate(names) if TEMP_COLUMN_RE.search(n)]
+    if not temps:
+        return None
+    return names.index(TIMESTAMP_COLUMN), names.index(soc_name), soc_name, temps
+
+
+FALLBACK_SCHEMA = ExportSchema("fallback", TIMESTAMP_COLUMN, None, "", TEMP_COLUMN_RE)
+
+
+def detect_schema(header):
+    """
+    (schema, selection) for a header row. selection is
+    (ts_idx, soc_idx, soc_name, [(temp_idx, temp_name)]), or None when the
+    sheet has no usable createdAt / SoC / temperature columns.
+    """
+    names = header_names(header)
+    for schema in EXPORT_SCHEMAS.values():
+        selected = schema.select(names)
+        if selected is not None:
+            return schema, selected
+    return FALLBACK_SCHEMA, fallback_select(names)
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    import openpyxl
+    for path in sys.argv[1:]:
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            header = next(wb.worksheets[0].iter_rows(values_only=True), None) or ()
+        finally:
+            wb.close()
+        schema, selected = detect_schema(header)
+        detail = f"{len(selected[3])} temperature column(s), SoC {selected[2]}" if selected else "unusable"
+        print(f"{schema.name:<9} {detail}  {path}")
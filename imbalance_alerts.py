@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Incremental temperature-imbalance analytics, updated as each export is ingested.
+Per vehicle it keeps running totals — max TempImbalance (max - min cell
+temperature), how often each cell is the hottest, and a per-row EWMA of the
+imbalance — so every new file costs O(its rows) and no history is re-read.
+Threshold breaches are appended to a local outbox (JSON Lines) immediately
+instead of waiting for someone to open the DOCX.
+
+    python imbalance_alerts.py show                  # rolling stats per vehicle
+    python imbalance_alerts.py rebuild [DOWNLOAD_ROOT]  # recompute from the stored exports
+"""
+
+import os
+import json
+import uuid
+import logging
+import argparse
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+
+from telemetry_frame import NO_CELL, TelemetryFrame
+from telemetry_reader import TEMP_CLIP
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Configuration
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(BASE_DIR, "imbalance_state.json")
+OUTBOX_PATH = os.path.join(BASE_DIR, "alerts_outbox.jsonl")
+MAX_IMBALANCE_ALERT = 5.0  # °C between hottest and coldest cell in any single row
+EWMA_ALPHA = 0.01  # Per-row smoothing (~100-row memory)
+EWMA_ALERT = 3.0  # Sustained imbalance, °C …
+EWMA_MIN_ROWS = 100  # … above the threshold for this many consecutive rows (~1 h of a daily export)
+HOTSPOT_SHARE = 0.6  # One cell hottest in this share of all rows …
+HOTSPOT_MIN_ROWS = 5000  # … once at least this many rows have been seen
+MAX_TRACKED_FILES = 1000  # Most recent file names kept per vehicle to skip re-sent exports (~3 years of dailies)
+
+_lock = threading.Lock()
+_state = None
+
+
+# =========================
+# State
+# =========================
+def _new_vehicle_state():
+    return {"rows": 0, "max_imbalance": None, "max_at": None, "ewma": None, "ewma_run": 0, "last_ts": None,
+            "hot_counts": {}, "files": [], "active": []}
+
+
+def load_state(path=None):
+    global _state
+    with _lock:
+        if _state is None:
+            try:
+                with open(path or STATE_PATH, "r", encoding="utf-8") as f:
+                    _state = json.load(f)
+            except (OSError, ValueError):
+                _state = {}
+        return _state
+
+
+def save_state(path=None):
+    with _lock:
+        tmp = (path or STATE_PATH) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_state or {}, f, indent=1, sort_keys=True)
+        os.replace(tmp, path or STATE_PATH)
+
+
+def _post(alerts, path=None):
+    if not alerts:
+        return
+    with _lock:
+        with open(path or OUTBOX_PATH, "a", encoding="utf-8") as f:
+            for a in alerts:
+                f.write(json.dumps(a) + "\n")
+    for a in alerts:
+        logger.warning(f"🚨 {a['message']}")
+
+
+def _alert(vehicle, kind, value, threshold, at, source, message):
+    return {
+        "id": uuid.uuid4().hex,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "vehicle": vehicle, "kind": kind, "value": round(float(value), 3), "threshold": threshold,
+        "at": at, "file": os.path.basename(source) if source else None, "message": message,
+    }
+
+
+# =========================
+# Incremental update
+# =========================
+def _ts(value):
+    return str(np.datetime_as_string(value, unit="s"))
+
+
+def _sensor_imbalance(frame):
+    """
+    Per-row (imbalance, hottest cell code), NaN / NO_CELL for rows with any
+    reading pinned at the TEMP_CLIP bounds: those are corrupt frames (the
+    other cells of such rows read garbage too), not cell temperatures.
+    """
+    if not frame.cell_names:
+        return np.full(len(frame), np.nan, np.float32), np.full(len(frame), NO_CELL)
+    temps = frame.temps
+    pinned = ((temps <= TEMP_CLIP[0]) | (temps >= TEMP_CLIP[1])).any(axis=1)
+    valid = ~np.isnan(temps) & ~pinned[:, None]
+    any_valid = valid.any(axis=1)
+    hot = np.where(valid, temps, -np.inf)
+    cold = np.where(valid, temps, np.inf)
+    max_idx = hot.argmax(axis=1)
+    rows = np.arange(len(frame))
+    imbalance = np.where(any_valid, hot[rows, max_idx] - cold.min(axis=1), np.nan).astype(np.float32)
+    return imbalance, np.where(any_valid, max_idx, NO_CELL)
+
+
+def _runs_above(above, carried):
+    """Length of the run of consecutive True values ending at each row; the first run continues `carried`."""
+    idx = np.arange(len(above))
+    last_below = np.maximum.accumulate(np.where(above, -1, idx))
+    runs = np.where(above, idx - last_below, 0)
+    return np.where(above & (last_below < 0), runs + carried, runs)
+
+
+def update(vehicle, frame: TelemetryFrame):
+    """
+    Fold one frame's rows into the vehicle's rolling stats and return the
+    alerts it raises. Rows not newer than the last one seen (re-sent or
+    back-filled exports) count toward max and hot spots but not the EWMA.
+    A frame whose source file was already folded in is skipped. Each alert
+    kind fires once, then re-arms when its value falls back below threshold.
+    """
+    alerts = []
+    state = load_state()
+    imbalance, max_cell = _sensor_imbalance(frame)
+    valid = ~np.isnan(imbalance)
+    imbalance, created_at, max_cell = imbalance[valid], frame.created_at[valid], max_cell[valid]
+    if len(imbalance) == 0:
+        return alerts
+
+    source_name = os.path.basename(frame.source) if frame.source else None
+    with _lock:
+        vs = state.setdefault(vehicle, _new_vehicle_state())
+        if source_name and source_name in vs["files"]:
+            return alerts
+        active = set(vs["active"])
+        vs["rows"] += len(imbalance)
+
+        # Max imbalance — alert on the first file that reaches the threshold, re-armed by a file that stays below
+        i = int(imbalance.argmax())
+        file_max = float(imbalance[i])
+        if vs["max_imbalance"] is None or file_max > vs["max_imbalance"]:
+            vs["max_imbalance"], vs["max_at"] = file_max, _ts(created_at[i])
+        if file_max >= MAX_IMBALANCE_ALERT:
+            if "max_imbalance" not in active:
+                active.add("max_imbalance")
+                alerts.append(_alert(vehicle, "max_imbalance", file_max, MAX_IMBALANCE_ALERT, _ts(created_at[i]),
+                                     frame.source, f"{vehicle}: imbalance {file_max:.1f}°C at {_ts(created_at[i])}"))
+        else:
+            active.discard("max_imbalance")
+
+        # Hot-spot counts per cell (bincount over the cell codes); rows where all cells
+        # read the same temperature have no hottest cell
+        codes = max_cell[(max_cell >= 0) & (imbalance > 0)].astype(np.int64)
+        for code, n in enumerate(np.bincount(codes, minlength=len(frame.cell_names)).tolist()):
+            if n:
+                name = frame.cell_names[code]
+                vs["hot_counts"][name] = vs["hot_counts"].get(name, 0) + n
+        total_hot = sum(vs["hot_counts"].values())
+        for name, n in vs["hot_counts"].items():
+            key = f"hotspot:{name}"
+            share = n / total_hot if total_hot else 0.0
+            if total_hot >= HOTSPOT_MIN_ROWS and share >= HOTSPOT_SHARE:
+                if key not in active:
+                    active.add(key)
+                    alerts.append(_alert(vehicle, "hotspot", share, HOTSPOT_SHARE, _ts(created_at[-1]), frame.source,
+                                         f"{vehicle}: {name} is the hottest cell in {share:.0%} of {total_hot} rows"))
+            else:
+                active.discard(key)
+
+        # EWMA over rows newer than the last one folded in; alert once it stayed above the
+        # threshold for EWMA_MIN_ROWS consecutive rows, so short spikes do not count
+        newer = created_at > np.datetime64(vs["last_ts"]) if vs["last_ts"] else np.ones(len(created_at), bool)
+        if newer.any():
+            order = np.argsort(created_at[newer], kind="stable")
+            x = imbalance[newer][order].astype(np.float64)
+            seed = [vs["ewma"]] if vs["ewma"] is not None else []
+            series = pd.Series(seed + x.tolist()).ewm(alpha=EWMA_ALPHA, adjust=False).mean().to_numpy()[len(seed):]
+            vs["ewma"] = float(series[-1])
+            vs["last_ts"] = _ts(created_at[newer][order][-1])
+            runs = _runs_above(series >= EWMA_ALERT, vs.get("ewma_run", 0))
+            vs["ewma_run"] = int(runs[-1])
+            over = np.flatnonzero(runs >= EWMA_MIN_ROWS)
+            if len(over) and "ewma" not in active:
+                active.add("ewma")
+                at = _ts(created_at[newer][order][over[0]])
+                alerts.append(_alert(vehicle, "ewma", series[over[0]], EWMA_ALERT, at, frame.source,
+                                     f"{vehicle}: sustained imbalance, EWMA {series[over[0]]:.2f}°C from {at}"))
+            elif vs["ewma"] < EWMA_ALERT:
+                active.discard("ewma")
+
+        vs["active"] = sorted(active)
+        if source_name:
+            vs["files"] = (vs["files"] + [source_name])[-MAX_TRACKED_FILES:]
+    return alerts
+
+
+def observe_file(path, vehicle, cols):
+    """Ingest hook: fold a freshly ingested export (TelemetryColumns) in once, post its alerts."""
+    if cols is None or len(cols) == 0:
+        return []
+    frame = TelemetryFrame.from_columns(cols)
+    frame.source = frame.source or path
+    alerts = update(vehicle, frame)
+    _post(alerts)
+    save_state()
+    return alerts
+
+
+# =========================
+# Standalone
+# =========================
+def _rebuild(download_root):
+    global _state
+    from compaction import read_archived, report_files
+    from telemetry_store import get_store
+    from vehicle_registry import get_registry
+    _state = {}
+    store = get_store()
+    for v in get_registry().active_ids():
+        folder = os.path.join(download_root, v)
+        if not os.path.isdir(folder):
+            continue
+        for path in report_files(folder):
+            cols = store.read_file(path, v) if os.path.exists(path) else read_archived(path)
+            if cols is not None and len(cols):
+                update(v, TelemetryFrame.from_columns(cols))
+    save_state()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rolling imbalance stats and alerts")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("show")
+    rb = sub.add_parser("rebuild", help="recompute the rolling state from the stored exports (no alerts posted)")
+    rb.add_argument("download_root", nargs="?", default=os.path.join(BASE_DIR, "download"))
+    args = ap.parse_args()
+
+    if args.cmd == "rebuild":
+        _rebuild(args.download_root)
+    for v, s in sorted(load_state().items()):
+        hot = max(s["hot_counts"].items(), key=lambda kv: kv[1])[0] if s["hot_counts"] else "-"
+        print(f"{v:<16} rows {s['rows']:>8}  max {s['max_imbalance'] or 0:5.1f}°C  "
+              f"ewma {s['ewma'] or 0:5.2f}  hottest {hot:<24} {', '.join(s['active']) or 'ok'}")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing spans for the whole pipeline (Shepherd automation, email
+fetch, report generation, Drive upload).
+Each finished span is appended to timings.jsonl as one JSON object:
+    {"run", "ts", "stage", "vehicle", "seconds", "ok", "parent", ...attrs}
+
+    with span("phase3.render", vehicle="EMCH-6559", format="docx"):
+        ...
+
+    @timed("phase2.process_vehicle", vehicle="vehicle_id")
+    def process_vehicle(mail, vehicle_id): ...
+
+    python instrumentation.py summary [--runs N] [--vehicle V] [--stage PREFIX]
+"""
+
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import datetime
+import functools
+import threading
+from contextlib import contextmanager
+
+# =========================
+# Configuration
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TIMINGS_PATH = os.environ.get("OCTOPUS_TIMINGS", os.path.join(BASE_DIR, "timings.jsonl"))
+TIMINGS_ENABLED = os.environ.get("OCTOPUS_TIMINGS_DISABLED", "") == ""
+
+# One id per process, so spans of the same night can be grouped
+RUN_ID = f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+
+_write_lock = threading.Lock()
+_local = threading.local()
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _write(record, path=None):
+    line = json.dumps(record, default=str, ensure_ascii=False)
+    with _write_lock:
+        with open(path or TIMINGS_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+# =========================
+# Spans
+# =========================
+@contextmanager
+def span(stage: str, vehicle: str | None = None, **attrs):
+    """
+    Time the enclosed block as `stage`. The vehicle is inherited from the
+    enclosing span on the same thread when not given. The yielded dict can
+    be filled with extra attributes (bytes, rows, …) before the block ends;
+    an "error" attribute marks the span failed although nothing was raised.
+    """
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    if vehicle is None and parent is not None:
+        vehicle = parent["vehicle"]
+    record = {"run": RUN_ID, "ts": time.time(), "stage": stage, "vehicle": vehicle,
+              "parent": parent["stage"] if parent else None}
+    record.update(attrs)
+    stack.append(record)
+    started = time.perf_counter()
+    try:
+        yield record
+        record["ok"] = "error" not in record
+    except BaseException as e:
+        record["ok"] = False
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["seconds"] = round(time.perf_counter() - started, 6)
+        stack.pop()
+        if TIMINGS_ENABLED:
+            try:
+                _write(record)
+            except OSError:
+                pass
+
+
+def timed(stage: str, vehicle=None):
+    """
+    Decorator form of span(). vehicle is the name of the argument holding
+    the vehicle id, or a callable taking the bound arguments dict.
+    """
+    def decorator(fn):
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            vehicle_id = None
+            if vehicle is not None:
+                try:
+                    bound = sig.bind(*args, **kwargs)
+                    bound.apply_defaults()
+                    vehicle_id = vehicle(bound.arguments) if callable(vehicle) else bound.arguments.get(vehicle)
+                except Exception:
+                    vehicle_id = None
+            with span(stage, vehicle=vehicle_id):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attrs):
+    """Add attributes (bytes, rows, …) to the innermost open span of this thread."""
+    stack = _stack()
+    if stack:
+        stack[-1].update(attrs)
+
+
+def folder_vehicle(arg_name: str):
+    """vehicle= helper for functions taking a vehicle folder path."""
+    return lambda arguments: os.path.basename(os.path.normpath(arguments[arg_name]))
+
+
+# =========================
+# Summary
+# =========================
+def load_records(path=None):
+    records = []
+    try:
+        with open(path or TIMINGS_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _percentile(sorted_vals, q):
+    if len(sorted_vals) == 1:
+        return sorted_vals[0]
+    pos = (len(sorted_vals) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+
+def summarize(records, runs=None, vehicle=None, stage_prefix=None):
+    """{stage: {"count", "failed", "p50", "p95", "max", "total"}} over the last `runs` runs."""
+    if runs:
+        keep = sorted({r["run"] for r in records})[-runs:]
+        records = [r for r in records if r["run"] in keep]
+    if vehicle:
+        records = [r for r in records if r.get("vehicle") == vehicle]
+    if stage_prefix:
+        records = [r for r in records if r["stage"].startswith(stage_prefix)]
+
+    by_stage = {}
+    for r in records:
+        by_stage.setdefault(r["stage"], []).append(r)
+    summary = {}
+    for stage, rs in sorted(by_stage.items()):
+        secs = sorted(r["seconds"] for r in rs)
+        summary[stage] = {
+            "count": len(rs),
+            "failed": sum(1 for r in rs if not r.get("ok", True)),
+            "p50": _percentile(secs, 0.50),
+            "p95": _percentile(secs, 0.95),
+            "max": secs[-1],
+            "total": sum(secs),
+        }
+    return summary
+
+
+def print_summary(summary):
+    if not summary:
+        print("No timings recorded.")
+        return
+    width = max(len(s) for s in summary)
+    print(f"{'stage':<{width}}  {'count':>6} {'failed':>6} {'p50 s':>9} {'p95 s':>9} {'max s':>9} {'total s':>10}")
+    for stage, s in summary.items():
+        print(f"{stage:<{width}}  {s['count']:>6} {s['failed']:>6} {s['p50']:>9.3f} {s['p95']:>9.3f} "
+              f"{s['max']:>9.3f} {s['total']:>10.1f}")
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Pipeline stage timings")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sp = sub.add_parser("summary", help="p50/p95 per stage across runs")
+    sp.add_argument("--file", default=TIMINGS_PATH)
+    sp.add_argument("--runs", type=int, help="only the last N runs")
+    sp.add_argument("--vehicle")
+    sp.add_argument("--stage", help="stage name prefix, e.g. phase3")
+    args = ap.parse_args()
+
+    if args.command == "summary":
+        recs = load_records(args.file)
+        print(f"{len({r['run'] for r in recs})} run(s), {len(recs)} span(s) in {args.file}", file=sys.stderr)
+        print_summary(summarize(recs, runs=args.runs, vehicle=args.vehicle, stage_prefix=args.stage))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Day charts for temperature reports (MaxTemp / MinTemp / Imbalance vs SoC).
+The plot is drawn onto caller-supplied axes so the same chart can be
+saved as a raster/SVG image (DOCX, HTML) or placed on a vector PDF page.
+
+chart_image() is the raster pipeline used for embedded charts: resolution
+matched to the embed width, palette-quantized PNG or JPEG / WebP, and a
+cache so identical day slices are rendered and encoded only once.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from PIL import Image
+
+CHART_FIGSIZE = (8, 4.5)
+CHART_DPI = 120
+
+# =========================
+# Image pipeline configuration
+# =========================
+CHART_EMBED_WIDTH_IN = 6.5  # Width the chart is shown at in the DOCX / HTML page
+CHART_TARGET_PPI = 110  # Pixels per embedded inch (DPI is derived from this and the embed width)
+CHART_PNG_COLORS = 64  # Palette-quantize PNG / lossless WebP charts to this many colours; 0 keeps full colour
+CHART_JPEG_QUALITY = 85
+CHART_WEBP_LOSSLESS = True  # Flat-colour line charts compress better lossless than at lossy quality 80
+CHART_WEBP_QUALITY = 80  # Used when CHART_WEBP_LOSSLESS is False
+CHART_CACHE_SIZE = 256  # Encoded charts kept for identical day slices
+
+
+def plot_day_chart(ax1, group):
+    """Draw one DaySlice onto ax1 (temperatures) and a twin axis (imbalance)."""
+    x = range(len(group))
+    soc_vals = group.soc
+
+    ax1.plot(x, group.max_temp, color="blue", linewidth=1.2, label="MaxTemp (°C)")
+    ax1.plot(x, group.min_temp, color="green", linewidth=1.2, label="MinTemp (°C)")
+    ax1.set_xlabel("BatteryStateOfCharge (SoC)")
+    ax1.set_ylabel("Temperature (°C)")
+    try:
+        ax1.set_xticks(x)
+        ax1.set_xticklabels([f"{v:.0f}" for v in soc_vals], rotation=45, ha="right")
+        if len(soc_vals) > 25:
+            step = max(1, len(soc_vals) // 25)
+            for i, label in enumerate(ax1.xaxis.get_ticklabels()):
+                if i % step != 0:
+                    label.set_visible(False)
+    except Exception:
+        pass
+    ax2 = ax1.twinx()
+    ax2.plot(x, group.imbalance, color="red", linewidth=1.2, label="TempImbalance (°C)")
+    ax2.set_ylabel("Imbalance (°C)")
+    lines_1, labels_1 = ax1.get_legend_handles_labels()
+    lines_2, labels_2 = ax2.get_legend_handles_labels()
+    ax1.legend(lines_1 + lines_2, labels_1 + labels_2, loc="upper left", frameon=False)
+    ax2.set_title(f"Battery Temperatures & Imbalance — {group.date}", fontsize=11, weight="bold")
+    ax2.grid(True, linestyle="--", linewidth=0.5, alpha=0.7)
+    return ax2
+
+
+def render_day_chart(group, fmt: str = "png", dpi: int = CHART_DPI, pil_kwargs=None) -> BytesIO:
+    """Chart of one DaySlice saved as fmt ("png", "svg", "webp", ...) into a BytesIO."""
+    fig, ax1 = plt.subplots(figsize=CHART_FIGSIZE)
+    plot_day_chart(ax1, group)
+    fig.tight_layout()
+    img_stream = BytesIO()
+    # svg.fonttype "none" keeps labels as <text> instead of one path per glyph
+    with plt.rc_context({"svg.fonttype": "none"}):
+        fig.savefig(img_stream, format=fmt, bbox_inches="tight", dpi=dpi, pil_kwargs=pil_kwargs)
+    plt.close(fig)
+    img_stream.seek(0)
+    return img_stream
+
+
+@dataclass
+class ChartImage:
+    data: bytes
+    fmt: str  # "png" | "jpeg" | "webp"
+    px_width: int
+    px_height: int
+    digest: str  # sha1 of data — identical images share it
+
+    @property
+    def mime(self):
+        return f"image/{self.fmt}"
+
+    def stream(self) -> BytesIO:
+        return BytesIO(self.data)
+
+
+_cache_lock = threading.Lock()
+_image_cache = OrderedDict()
+
+
+def _group_key(group):
+    h = hashlib.sha1(str(group.date).encode())
+    for arr in (group.soc, group.max_temp, group.min_temp, group.imbalance):
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def _encode(fig, fmt, dpi):
+    if fmt not in ("png", "jpeg", "webp"):
+        raise ValueError(f"Unsupported chart image format: {fmt}")
+    raw = BytesIO()
+    fig.savefig(raw, format="png", bbox_inches="tight", dpi=dpi)
+    img = Image.open(raw).convert("RGB")
+    # Lossless formats get the reduced palette: the chart is a handful of flat
+    # colours plus anti-aliasing, so 64 colours are visually identical
+    if fmt != "jpeg" and CHART_PNG_COLORS:
+        img = img.quantize(colors=CHART_PNG_COLORS, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+
+    buf = BytesIO()
+    if fmt == "png":
+        img.save(buf, format="PNG", optimize=True)
+    elif fmt == "jpeg":
+        img.save(buf, format="JPEG", quality=CHART_JPEG_QUALITY, optimize=True)
+    elif CHART_WEBP_LOSSLESS:
+        img.save(buf, format="WEBP", lossless=True)
+    else:
+        img.convert("RGB").save(buf, format="WEBP", quality=CHART_WEBP_QUALITY)
+    return buf.getvalue()
+
+
+def chart_image(group, fmt: str = "png", embed_width_in: float = CHART_EMBED_WIDTH_IN,
+                ppi: int = CHART_TARGET_PPI) -> ChartImage:
+    """
+    Encoded chart of one DaySlice, sized so the tight-cropped image is
+    embed_width_in * ppi pixels wide. Identical slices hit the cache.
+    """
+    key = (_group_key(group), fmt, embed_width_in, ppi, CHART_PNG_COLORS, CHART_JPEG_QUALITY,
+           CHART_WEBP_LOSSLESS, CHART_WEBP_QUALITY)
+    with _cache_lock:
+        cached = _image_cache.get(key)
+        if cached is not None:
+            _image_cache.move_to_end(key)
+            return cached
+
+    fig, ax1 = plt.subplots(figsize=CHART_FIGSIZE)
+    plot_day_chart(ax1, group)
+    fig.tight_layout()
+    tight_width_in = fig.get_tightbbox(fig.canvas.get_renderer()).width
+    dpi = embed_width_in * ppi / tight_width_in
+    data = _encode(fig, fmt, dpi)
+    plt.close(fig)
+
+    with Image.open(BytesIO(data)) as img:
+        px_width, px_height = img.size
+    image = ChartImage(data, fmt, px_width, px_height, hashlib.sha1(data).hexdigest())
+    with _cache_lock:
+        _image_cache[key] = image
+        while len(_image_cache) > CHART_CACHE_SIZE:
+            _image_cache.popitem(last=False)
+    return image
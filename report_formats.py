@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Lightweight alternatives to the DOCX temperature report, built from the same
+day sections and charts:
+  - html: one self-contained file, charts inlined as WebP (or PNG / JPEG / SVG);
+          a chart that occurs more than once is embedded once
+  - pdf:  vector PDF via matplotlib, one A4 page per day section
+"""
+
+import os
+import base64
+from collections import Counter
+from html import escape
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+
+from report_charts import chart_image, plot_day_chart, render_day_chart
+
+# =========================
+# Configuration
+# =========================
+HTML_CHART_FORMAT = "webp"  # "webp" | "png" | "jpeg" (report_charts.chart_image) | "svg"
+PDF_PAGE_SIZE = (8.27, 11.69)  # A4 portrait, inches
+SHADE_COLOR = "#FF0000"
+
+
+def section_table_rows(m):
+    """Metrics table of one day section: [(label, value, shaded)]."""
+    return [
+        ("Start BatteryStateOfCharge", f"{m.start_soc:.2f}", False),
+        ("End BatteryStateOfCharge", f"{m.end_soc:.2f}", False),
+        ("Most data point of MaxTempCell", str(m.max_cell), False),
+        ("Most data point of MinTempCell", str(m.min_cell), False),
+        ("Max imbalance logged", f"{m.max_imbalance:.2f} (Count: {m.imbalance_count})", True),
+        ("Total Records (this date)", str(m.rows), False),
+    ]
+
+
+# =========================
+# HTML
+# =========================
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>
+body{{font-family:Calibri,Arial,sans-serif;max-width:820px;margin:auto;padding:12px}}
+section{{border:1px solid #000;padding:16px;margin-bottom:24px;page-break-after:always}}
+h1{{font-size:18px;margin:0 0 4px}} h2{{font-size:15px;color:#2F5496;margin:0 0 8px}}
+img,svg{{width:100%;height:auto}}
+div.chart{{width:100%;background-size:contain;background-repeat:no-repeat;-webkit-print-color-adjust:exact;print-color-adjust:exact}}
+table{{border-collapse:collapse;width:100%}} td{{border-top:1px solid #4472C4;padding:4px 6px;width:50%}}
+tr.shade td{{background:{shade};color:#fff;font-weight:bold}}
+p.summary{{color:{shade};font-weight:bold}}
+</style></head><body>
+"""
+_SHADED_ROW = ' class="shade"'
+
+
+def _data_uri(image):
+    return f"data:{image.mime};base64,{base64.b64encode(image.data).decode('ascii')}"
+
+
+def write_html_report(sections, out_path, summary_text=None, on_section=None, chart_format=HTML_CHART_FORMAT,
+                      prepared_charts=None):
+    """
+    sections: [(report_id, DaySlice, metrics row)] -> one self-contained HTML file.
+    prepared_charts: {DaySlice: ChartImage} already encoded in chart_format; other sections are rendered here.
+    """
+    prepared_charts = prepared_charts or {}
+    charts = []
+    for report_id, group, m in sections:
+        if chart_format == "svg":
+            svg = render_day_chart(group, fmt="svg").getvalue().decode("utf-8")
+            charts.append(svg[svg.index("<svg"):])
+        else:
+            charts.append(prepared_charts.get(group) or chart_image(group, chart_format))
+        if on_section:
+            on_section(report_id, m)
+
+    # Charts used more than once are stored once as CSS variables and referenced by each section
+    # (as backgrounds, kept when printing by print-color-adjust in _HTML_HEAD)
+    images = [c for c in charts if not isinstance(c, str)]
+    counts = Counter(image.digest for image in images)
+    shared = {}
+    for image in images:
+        if counts[image.digest] > 1 and image.digest not in shared:
+            shared[image.digest] = (f"--chart-{len(shared)}", image)
+
+    parts = [_HTML_HEAD.format(title=escape(os.path.basename(out_path)), shade=SHADE_COLOR)]
+    if shared:
+        variables = "".join(f"{var}:url({_data_uri(image)});" for var, image in shared.values())
+        parts.append(f"<style>:root{{{variables}}}</style>\n")
+    if summary_text:
+        parts.append(f'<p class="summary">{escape(summary_text)}</p>\n')
+    for (report_id, group, m), image in zip(sections, charts):
+        if isinstance(image, str):
+            chart = image
+        elif image.digest in shared:
+            chart = (f'<div class="chart" role="img" aria-label="chart {m.date}" style="aspect-ratio:'
+                     f'{image.px_width}/{image.px_height};background-image:var({shared[image.digest][0]})"></div>')
+        else:
+            chart = f'<img alt="chart {m.date}" src="{_data_uri(image)}">'
+        rows = "".join(
+            f'<tr{_SHADED_ROW if shaded else ""}><td>{escape(k)}</td><td>{escape(v)}</td></tr>'
+            for k, v, shaded in section_table_rows(m)
+        )
+        parts.append(
+            f"<section><h1>TEMPERATURE PROFILE FOR {escape(str(report_id))}</h1>"
+            f"<h2>Date: {m.date}</h2>{chart}<table>{rows}</table></section>\n"
+        )
+    parts.append("</body></html>\n")
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("".join(parts))
+
+
+# =========================
+# PDF
+# =========================
+def _pdf_page(report_id, group, m, summary_text=None):
+    fig = plt.figure(figsize=PDF_PAGE_SIZE)
+    top = 0.95
+    if summary_text:
+        fig.text(0.08, top, summary_text, color=SHADE_COLOR, fontsize=10, weight="bold")
+        top -= 0.03
+    fig.text(0.08, top, f"TEMPERATURE PROFILE FOR {report_id}", fontsize=14, weight="bold")
+    fig.text(0.08, top - 0.03, f"Date: {m.date}", fontsize=12, color="#2F5496")
+
+    ax1 = fig.add_axes([0.1, top - 0.45, 0.78, 0.36])
+    plot_day_chart(ax1, group)
+
+    ax_t = fig.add_axes([0.08, top - 0.75, 0.84, 0.2])
+    ax_t.axis("off")
+    rows = section_table_rows(m)
+    table = ax_t.table(cellText=[[k, v] for k, v, _ in rows], loc="upper center", cellLoc="left")
+    table.scale(1, 1.6)
+    for i, (_, _, shaded) in enumerate(rows):
+        for j in range(2):
+            cell = table[i, j]
+            cell.set_edgecolor("#4472C4")
+            if shaded:
+                cell.set_facecolor(SHADE_COLOR)
+                cell.get_text().set_color("white")
+                cell.get_text().set_weight("bold")
+    return fig
+
+
+def write_pdf_report(sections, out_path, summary_text=None, on_section=None, prepared_charts=None):
+    """
+    sections: [(report_id, DaySlice, metrics row)] -> vector PDF, one page per section.
+    prepared_charts is not used: pages draw their charts as vectors.
+    """
+    with PdfPages(out_path, metadata={"Title": "Temperature report"}) as pdf:
+        for i, (report_id, group, m) in enumerate(sections):
+            fig = _pdf_page(report_id, group, m, summary_text if i == 0 else None)
+            pdf.savefig(fig)
+            plt.close(fig)
+            if on_section:
+                on_section(report_id, m)
@@ -9,9 +9,9 @@ import re
 import time
 import traceback
 import threading
-from collections import Counter
-from io import BytesIO
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
 
 import pandas as pd
 from docx import Document
@@ -19,14 +19,32 @@ from docx.shared import Inches, Pt, RGBColor
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from telemetry_reader import read_telemetry
+from telemetry_store import get_store
+from telemetry_frame import TelemetryFrame, daily_metrics
+from docx_template import TEMPLATE_PATH, assemble_docx_template
+from report_charts import chart_image
+from report_formats import HTML_CHART_FORMAT, write_html_report, write_pdf_report
+from instrumentation import folder_vehicle, span, timed
+from vehicle_registry import get_registry
+from compaction import read_archived, report_files
+from report_scheduler import REPORT_MEMORY_BUDGET_MB, Task, estimate_job, makespan_report, run_scheduled
+from work_leases import CLAIMED, DONE, LeaseSession, input_fingerprint, shard_ids
 
 # =========================
 # Configuration
 # =========================
 MAX_CONCURRENT_VEHICLES = 5  # Change this number to control concurrency
+USE_TELEMETRY_STORE = True  # Parse each xlsx once, then read it back from telemetry_store
+DOCX_ASSEMBLY = "template"  # "template": bulk XML into templates/temp_report_template.docx | "incremental": python-docx per element
+REPORT_MODE = "best_day"  # "best_day": busiest day of each file | "all_days": every day, de-duplicated across files
+DOCX_CHART_FORMAT = "png"  # "png" (palette-quantized, see report_charts) | "jpeg"
+REPORT_FORMATS = ("docx",)  # Any of "docx", "html", "pdf" — each is written as temp_report_<vehicle>.<ext>
+REPORT_LEASE_STAGE = "phase3.report"  # work_leases stage: one live report run per vehicle across processes / hosts
+FLEET_SUMMARY_LEASE_STAGE = "phase3.fleet_summary"
+# Code a report depends on: an edit to any of these (size / mtime) invalidates earlier reports
+RENDER_SOURCES = ("report_generator.py", "report_formats.py", "report_charts.py", "docx_template.py",
+                  "telemetry_frame.py")
 
 # Pull the download root from Script 2 so we never hardcode paths
 try:
@@ -173,240 +191,341 @@ def _safe_basename_no_ext(path: str) -> str:
     stem, _ = os.path.splitext(base)
     return stem
 
+def load_columns(file_path: str, vehicle_name: str):
+    if not os.path.exists(file_path):
+        return read_archived(file_path)
+    if USE_TELEMETRY_STORE:
+        return get_store().read_file(file_path, vehicle_name)
+    return read_telemetry(file_path)
+
+def format_size_time(stat):
+    return f"{stat['bytes'] / 1e6:.2f} MB, {stat['seconds']:.1f}s"
+
+def _report_id_for(file_path: str) -> str:
+    match = re.search(r'Parsed_(\d+)', os.path.basename(file_path))
+    return match.group(1) if match else _safe_basename_no_ext(file_path)
+
+# =========================
+# Day sections
+# =========================
+def collect_day_sections(files_with_cols, mode: str = REPORT_MODE):
+    """
+    Turn parsed files into report sections: a list of (report_id, DaySlice, metrics row).
+    "best_day": the busiest day of each file, in file order.
+    "all_days": every day of every file; a day exported by several files
+                (overlapping ranges, CAN + CSV variants) is kept once, from
+                the file with the most rows that day. Sections are in date order.
+    "per_file": every day of every file, not yet merged (see merge_day_sections).
+    """
+    sections = []
+    for file_path, cols in files_with_cols:
+        frame = TelemetryFrame.from_columns(cols)
+        metrics = daily_metrics(frame)
+        if metrics.empty:
+            continue
+        if mode == "best_day":
+            metrics = metrics[metrics["day"] == frame.busiest_day().day]
+        report_id = _report_id_for(file_path)
+        for row in metrics.itertuples(index=False):
+            sections.append((report_id, frame.day_slice(row.day), row))
+    return merge_day_sections([sections], mode) if mode == "all_days" else sections
+
+def merge_day_sections(per_file_sections, mode: str = REPORT_MODE):
+    """Concatenate per-file sections in file order; "all_days" keeps the fullest section per day, in date order."""
+    sections = [s for file_sections in per_file_sections for s in file_sections]
+    if mode == "all_days":
+        fullest = {}
+        for section in sections:
+            day = section[2].day
+            if day not in fullest or section[2].rows > fullest[day][2].rows:
+                fullest[day] = section
+        sections = [fullest[d] for d in sorted(fullest)]
+    return sections
+
+def add_day_section(doc, report_id, m, image_stream):
+    # Heading
+    h = doc.add_heading(f"TEMPERATURE PROFILE FOR {report_id}", level=0)
+    h.runs[0].font.size = Pt(14)
+    h.runs[0].bold = True
+    doc.add_heading(f"Date: {m.date}", level=1)
+
+    # Plot
+    doc.add_picture(image_stream, width=Inches(6.5))
+
+    # Table
+    table = doc.add_table(rows=6, cols=2)
+    table.style = 'Light List Accent 1'
+    table.cell(0, 0).text = "Start BatteryStateOfCharge"
+    table.cell(0, 1).text = f"{m.start_soc:.2f}"
+    table.cell(1, 0).text = "End BatteryStateOfCharge"
+    table.cell(1, 1).text = f"{m.end_soc:.2f}"
+    table.cell(2, 0).text = "Most data point of MaxTempCell"
+    table.cell(2, 1).text = str(m.max_cell)
+    table.cell(3, 0).text = "Most data point of MinTempCell"
+    table.cell(3, 1).text = str(m.min_cell)
+    cell0 = table.cell(4, 0)
+    cell1 = table.cell(4, 1)
+    cell0.text = "Max imbalance logged"
+    cell1.text = f"{m.max_imbalance:.2f} (Count: {m.imbalance_count})"
+    for cell in (cell0, cell1):
+        tc = cell._tc
+        tcPr = tc.get_or_add_tcPr()
+        shd = OxmlElement('w:shd')
+        shd.set(qn('w:fill'), "FF0000")
+        tcPr.append(shd)
+        for paragraph in cell.paragraphs:
+            for run in paragraph.runs:
+                run.font.color.rgb = RGBColor(255, 255, 255)
+                run.font.bold = True
+    table.cell(5, 0).text = "Total Records (this date)"
+    table.cell(5, 1).text = str(m.rows)
+
+    doc.add_page_break()
+    set_page_border(doc.sections[-1])
+
+def overall_max_text(metrics_rows):
+    """Summary line for the first section holding the highest max imbalance, or None."""
+    best = None
+    for m in metrics_rows:
+        if best is None or m.max_imbalance > best.max_imbalance:
+            best = m
+    if best is None:
+        return None
+    return (
+        f"MAX imbalance observed across all Days: {float(best.max_imbalance):.2f} "
+        f"(Count: {best.imbalance_count}), on Date: {best.date}"
+    )
+
+def assemble_docx_incremental(rendered, summary_text=None):
+    """rendered: [(report_id, metrics row, image stream)] — one python-docx call per element."""
+    doc = Document()
+    set_page_border(doc.sections[0])
+    for report_id, m, image_stream in rendered:
+        add_day_section(doc, report_id, m, image_stream)
+    if summary_text:
+        p = doc.paragraphs[0].insert_paragraph_before()
+        run = p.add_run(summary_text)
+        run.font.size = Pt(11)
+        run.font.bold = True
+        run.font.color.rgb = RGBColor(255, 0, 0)
+    return doc
+
+DOCX_ASSEMBLERS = {
+    "template": assemble_docx_template,
+    "incremental": assemble_docx_incremental,
+}
+
+def write_docx_report(sections, out_path, summary_text=None, on_section=None, prepared_charts=None):
+    """
+    sections: [(report_id, DaySlice, metrics row)] -> DOCX; identical charts are stored once in the package.
+    prepared_charts: {DaySlice: ChartImage} already encoded as DOCX_CHART_FORMAT; other sections are rendered here.
+    """
+    prepared_charts = prepared_charts or {}
+    rendered = []
+    for report_id, group, m in sections:
+        image = prepared_charts.get(group) or chart_image(group, DOCX_CHART_FORMAT)
+        rendered.append((report_id, m, image.stream()))
+        if on_section:
+            on_section(report_id, m)
+    doc = DOCX_ASSEMBLERS[DOCX_ASSEMBLY](rendered, summary_text)
+    doc.save(out_path)
+
+# Every renderer takes the same sections (and the charts prepared for its format) and writes one file
+REPORT_RENDERERS = {
+    "docx": write_docx_report,
+    "html": write_html_report,
+    "pdf": write_pdf_report,
+}
+
 # =========================
 # Core per-vehicle generator
 # =========================
-def generate_report_for_vehicle(vehicle_folder: str, progress_cb=None):
-    vehicle_name = os.path.basename(vehicle_folder)
-    # Delete old DOCX
+@dataclass
+class FileSections:
+    """Per-file work unit: the file's report sections and their encoded charts."""
+    path: str
+    rows: int = 0
+    sections: list = field(default_factory=list)  # [(report_id, DaySlice, metrics row)]
+    peak_rss_mb: float | None = None
+    charts: dict = field(default_factory=dict)  # {report format: {DaySlice: ChartImage}}
+
+
+def _chart_formats(formats):
+    return {fmt: chart_fmt for fmt, chart_fmt in (("docx", DOCX_CHART_FORMAT), ("html", HTML_CHART_FORMAT))
+            if fmt in formats}
+
+
+@timed("phase3.prepare_file", vehicle="vehicle_name")
+def prepare_file(file_path: str, vehicle_name: str, mode: str = REPORT_MODE, formats=None) -> FileSections:
+    """Parse + metrics + charts for one export; any worker can run it."""
+    try:
+        cols = load_columns(file_path, vehicle_name)
+    except Exception:
+        cols = None
+    if cols is None or len(cols) == 0:
+        return FileSections(file_path)
+    sections = collect_day_sections([(file_path, cols)], mode="best_day" if mode == "best_day" else "per_file")
+    # Kept with the sections, so assembly does not depend on the chart cache still holding them
+    charts = {fmt: {group: chart_image(group, chart_fmt) for _, group, _ in sections}
+              for fmt, chart_fmt in _chart_formats(list(formats or REPORT_FORMATS)).items()}
+    return FileSections(file_path, len(cols), sections, cols.peak_rss_mb, charts)
+
+
+def _remove_old_reports(vehicle_folder, formats):
+    extensions = tuple(f".{fmt}" for fmt in formats)
     for f in os.listdir(vehicle_folder):
-        if f.lower().endswith(".docx") and f.startswith("temp_report_"):
+        if f.lower().endswith(extensions) and f.startswith("temp_report_"):
             try:
                 os.remove(os.path.join(vehicle_folder, f))
             except Exception:
                 pass
 
-    xlsx_files = [os.path.join(vehicle_folder, f) for f in os.listdir(vehicle_folder) if f.lower().endswith(".xlsx")]
-    if not xlsx_files:
-        if progress_cb:
-            progress_cb(vehicle_name, 0, f"❌ No Excel files found in {vehicle_folder}")
-        return
-
-    try:
-        all_dfs = []
-        total_rows = 0
-        for f in xlsx_files:
-            try:
-                df_tmp = pd.read_excel(f)
-            except Exception:
-                df_tmp = pd.DataFrame()
-            if df_tmp.empty:
-                continue
-            total_rows += len(df_tmp)
-            all_dfs.append((f, df_tmp))
-
-        if total_rows == 0:
-            if progress_cb:
-                progress_cb(vehicle_name, 0, "❌ All Excel files are empty")
-            return
 
+@timed("phase3.assemble", vehicle=folder_vehicle("vehicle_folder"))
+def assemble_vehicle_report(vehicle_folder: str, prepared, progress_cb=None, mode: str = REPORT_MODE, formats=None):
+    """
+    Merge the vehicle's FileSections (in report_files order, i.e. by first day)
+    and write temp_report_<vehicle>.<ext> for each format.
+    Returns {format: {"bytes": size, "seconds": generation time}} for the files written.
+    """
+    vehicle_name = os.path.basename(vehicle_folder)
+    formats = list(formats or REPORT_FORMATS)
+    stats = {}
+    total_rows = sum(p.rows for p in prepared)
+    if total_rows == 0:
         if progress_cb:
-            progress_cb(vehicle_name, 1, f"Found {len(all_dfs)} file(s), {total_rows} rows…")
-
-        doc = Document()
-        set_page_border(doc.sections[0])
-        overall_max_val = None
-        overall_max_count = None
-        overall_max_date = None
-        processed_rows = 0
-
-        for file_path, df in all_dfs:
-            if progress_cb:
-                pct_now = int((processed_rows / total_rows) * 100) if total_rows else 0
-                progress_cb(vehicle_name, pct_now, f"Reading {os.path.basename(file_path)} …")
-
-            match = re.search(r'Parsed_(\d+)', os.path.basename(file_path))
-            report_id = match.group(1) if match else _safe_basename_no_ext(file_path)
-
-            temp_columns = [c for c in df.columns if re.search(r'battery.*temp.*\d+', c, flags=re.IGNORECASE)]
-            if not temp_columns:
-                continue
-
-            soc_col = get_closest_column(df.columns, ['batteryStateOfCharge', 'battery_state_of_charge', 'SoC'])
-            if not soc_col or 'createdAt' not in df.columns:
-                continue
-
-            df[temp_columns] = df[temp_columns].apply(pd.to_numeric, errors='coerce').clip(-50, 300)
-            df[soc_col] = pd.to_numeric(df[soc_col], errors='coerce')
-            df['createdAt'] = pd.to_datetime(df['createdAt'], errors='coerce')
-            df.dropna(subset=[soc_col, 'createdAt'], inplace=True)
-            if df.empty:
-                continue
-
-            df['MaxTemp'] = df[temp_columns].max(axis=1)
-            df['MinTemp'] = df[temp_columns].min(axis=1)
-            df['TempImbalance'] = df['MaxTemp'] - df['MinTemp']
-            try:
-                df['MaxTempCell'] = df[temp_columns].idxmax(axis=1)
-                df['MinTempCell'] = df[temp_columns].idxmin(axis=1)
-            except Exception:
-                df['MaxTempCell'] = None
-                df['MinTempCell'] = None
+            progress_cb(vehicle_name, 0, "❌ All Excel files are empty")
+        return stats
+
+    if progress_cb:
+        peak_mb = next((p.peak_rss_mb for p in reversed(prepared) if p.peak_rss_mb is not None), None)
+        mem = f", peak RSS {peak_mb:.0f} MB" if peak_mb is not None else ""
+        progress_cb(vehicle_name, 1, f"Found {sum(1 for p in prepared if p.rows)} file(s), {total_rows} rows{mem}…")
+
+    with span("phase3.sections", mode=mode) as sp:
+        sections = merge_day_sections([p.sections for p in prepared], mode=mode)
+        sp["sections"] = len(sections)
+    section_rows = sum(m.rows for _, _, m in sections)
+
+    summary_text = overall_max_text(m for _, _, m in sections)
+    work_rows = section_rows * len(formats)
+    processed_rows = 0
+
+    def on_section(report_id, m):
+        nonlocal processed_rows
+        processed_rows += m.rows
+        if work_rows > 0 and progress_cb:
+            pct = int((processed_rows / work_rows) * 100)
+            progress_cb(vehicle_name, pct, f"Processing {report_id} {m.date} … {pct}%")
+
+    for fmt in formats:
+        out_path = os.path.join(vehicle_folder, f"temp_report_{vehicle_name}.{fmt}")
+        prepared_charts = {}
+        for p in prepared:
+            prepared_charts.update(p.charts.get(fmt, {}))
+        started = time.perf_counter()
+        with span(f"phase3.render_{fmt}") as sp:
+            REPORT_RENDERERS[fmt](sections, out_path, summary_text, on_section=on_section,
+                                  prepared_charts=prepared_charts)
+            sp["bytes"] = os.path.getsize(out_path)
+        stats[fmt] = {"bytes": sp["bytes"], "seconds": time.perf_counter() - started}
+        if progress_cb:
+            pct = int((processed_rows / work_rows) * 100) if work_rows else 100
+            progress_cb(vehicle_name, pct, f"✅ Saved {out_path} ({format_size_time(stats[fmt])})")
+    return stats
+
+
+@timed("phase3.report_vehicle", vehicle=folder_vehicle("vehicle_folder"))
+def generate_report_for_vehicle(vehicle_folder: str, progress_cb=None, mode: str = REPORT_MODE, formats=None):
+    """
+    Write temp_report_<vehicle>.<ext> for each of formats (default REPORT_FORMATS),
+    preparing the files one after another in this thread.
+    Returns {format: {"bytes": size, "seconds": generation time}} for the files written.
+    """
+    vehicle_name = os.path.basename(vehicle_folder)
+    formats = list(formats or REPORT_FORMATS)
+    # Delete old reports of the formats being regenerated
+    _remove_old_reports(vehicle_folder, formats)
 
-            df['date'] = df['createdAt'].dt.date
-            if df['date'].dropna().empty:
-                continue
-            try:
-                best_date = df['date'].value_counts().idxmax()
-            except Exception:
-                continue
-            group = df[df['date'] == best_date].copy()
-            if group.empty:
-                continue
-
-            # Metrics
-            start_soc = group[soc_col].iloc[0]
-            end_soc = group[soc_col].iloc[-1]
-            most_max_cell = Counter(group['MaxTempCell']).most_common(1)[0][0] if not group['MaxTempCell'].isnull().all() else None
-            most_min_cell = Counter(group['MinTempCell']).most_common(1)[0][0] if not group['MinTempCell'].isnull().all() else None
-            max_imbalance = group['TempImbalance'].max()
-            imbalance_count = int((group['TempImbalance'] == max_imbalance).sum())
-            if (overall_max_val is None) or (max_imbalance > overall_max_val):
-                overall_max_val = float(max_imbalance)
-                overall_max_count = imbalance_count
-                overall_max_date = best_date
-
-            # Heading
-            h = doc.add_heading(f"TEMPERATURE PROFILE FOR {report_id}", level=0)
-            h.runs[0].font.size = Pt(14)
-            h.runs[0].bold = True
-            doc.add_heading(f"Date: {best_date}", level=1)
-
-            # Plot
-            x = range(len(group))
-            soc_vals = group[soc_col].values
-            y_max = group['MaxTemp'].values
-            y_min = group['MinTemp'].values
-            y_imb = group['TempImbalance'].values
-
-            fig, ax1 = plt.subplots(figsize=(8, 4.5))
-            ax1.plot(x, y_max, color="blue", linewidth=1.2, label="MaxTemp (°C)")
-            ax1.plot(x, y_min, color="green", linewidth=1.2, label="MinTemp (°C)")
-            ax1.set_xlabel("BatteryStateOfCharge (SoC)")
-            ax1.set_ylabel("Temperature (°C)")
-            try:
-                ax1.set_xticks(x)
-                ax1.set_xticklabels([f"{v:.0f}" for v in soc_vals], rotation=45, ha="right")
-                if len(soc_vals) > 25:
-                    step = max(1, len(soc_vals) // 25)
-                    for i, label in enumerate(ax1.xaxis.get_ticklabels()):
-                        if i % step != 0:
-                            label.set_visible(False)
-            except Exception:
-                pass
-            ax2 = ax1.twinx()
-            ax2.plot(x, y_imb, color="red", linewidth=1.2, label="TempImbalance (°C)")
-            ax2.set_ylabel("Imbalance (°C)")
-            lines_1, labels_1 = ax1.get_legend_handles_labels()
-            lines_2, labels_2 = ax2.get_legend_handles_labels()
-            ax1.legend(lines_1 + lines_2, labels_1 + labels_2, loc="upper left", frameon=False)
-            plt.title(f"Battery Temperatures & Imbalance — {best_date}", fontsize=11, weight="bold")
-            plt.grid(True, linestyle="--", linewidth=0.5, alpha=0.7)
-            plt.tight_layout()
-            img_stream = BytesIO()
-            plt.savefig(img_stream, bbox_inches="tight", dpi=120)
-            plt.close(fig)
-            img_stream.seek(0)
-            doc.add_picture(img_stream, width=Inches(6.5))
-
-            # Table
-            table = doc.add_table(rows=6, cols=2)
-            table.style = 'Light List Accent 1'
-            table.cell(0, 0).text = "Start BatteryStateOfCharge"
-            table.cell(0, 1).text = f"{start_soc:.2f}"
-            table.cell(1, 0).text = "End BatteryStateOfCharge"
-            table.cell(1, 1).text = f"{end_soc:.2f}"
-            table.cell(2, 0).text = "Most data point of MaxTempCell"
-            table.cell(2, 1).text = str(most_max_cell)
-            table.cell(3, 0).text = "Most data point of MinTempCell"
-            table.cell(3, 1).text = str(most_min_cell)
-            cell0 = table.cell(4, 0)
-            cell1 = table.cell(4, 1)
-            cell0.text = "Max imbalance logged"
-            cell1.text = f"{max_imbalance:.2f} (Count: {imbalance_count})"
-            for cell in (cell0, cell1):
-                tc = cell._tc
-                tcPr = tc.get_or_add_tcPr()
-                shd = OxmlElement('w:shd')
-                shd.set(qn('w:fill'), "FF0000")
-                tcPr.append(shd)
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.font.color.rgb = RGBColor(255, 255, 255)
-                        run.font.bold = True
-            table.cell(5, 0).text = "Total Records (this date)"
-            table.cell(5, 1).text = str(len(group))
-
-            doc.add_page_break()
-            set_page_border(doc.sections[-1])
-
-            processed_rows += len(group)
-            if total_rows > 0 and progress_cb:
-                pct = int((processed_rows / total_rows) * 100)
-                progress_cb(vehicle_name, pct, f"Processing {_safe_basename_no_ext(file_path)} … {pct}%")
-
-            time.sleep(0.02)
-
-        if overall_max_val is not None:
-            p = doc.paragraphs[0].insert_paragraph_before()
-            run = p.add_run(
-                f"MAX imbalance observed across all Days: {overall_max_val:.2f} "
-                f"(Count: {overall_max_count}), on Date: {overall_max_date}"
-            )
-            run.font.size = Pt(11)
-            run.font.bold = True
-            run.font.color.rgb = RGBColor(255, 0, 0)
-
-        out_path = os.path.join(vehicle_folder, f"temp_report_{os.path.basename(vehicle_folder)}.docx")
-        doc.save(out_path)
+    # One canonical export per IMEI/day; re-sent and CSV duplicates stay on disk but are not reported twice.
+    # Exports compacted into monthly archives keep their xlsx path and load from the archive.
+    xlsx_files = report_files(vehicle_folder)
+    if not xlsx_files:
         if progress_cb:
-            progress_cb(vehicle_name, 100, f"✅ Saved {out_path}")
+            progress_cb(vehicle_name, 0, f"❌ No Excel files found in {vehicle_folder}")
+        return {}
 
+    try:
+        with span("phase3.load", files=len(xlsx_files)) as sp:
+            prepared = [prepare_file(f, vehicle_name, mode, formats) for f in xlsx_files]
+            sp["rows"] = sum(p.rows for p in prepared)
+        return assemble_vehicle_report(vehicle_folder, prepared, progress_cb, mode, formats)
     except Exception as e:
         if progress_cb:
             progress_cb(vehicle_name, 0, f"❌ Error: {e}")
         traceback.print_exc()
+    return {}
 
 
 # =========================
 # Batch driver (multi-threaded)
 # =========================
 
-# Running lock / flag to avoid concurrent runs
-_running_lock = threading.Lock()
-_running = False
-
-def generate_all_reports(download_root: str | None = None, show_gui: bool = True, max_workers: int = MAX_CONCURRENT_VEHICLES):
-    global _running
-    # Prevent re-entrance
-    with _running_lock:
-        if _running:
-            print("⚠️ generate_all_reports already running — skipping new call.")
-            return
-        _running = True
-
-    try:
+def _render_fingerprint(job, mode, formats):
+    """
+    Inputs of a vehicle's report: its exports, the options, the rendering
+    config and the template and rendering code (by size and mtime), so any
+    of them changing rebuilds the report.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    sources = [TEMPLATE_PATH] + [os.path.join(here, name) for name in RENDER_SOURCES]
+    return input_fingerprint([f.path for f in job.files] + sources, mode, *sorted(formats), DOCX_ASSEMBLY,
+                             DOCX_CHART_FORMAT, HTML_CHART_FORMAT)
+
+
+def _report_fingerprint(job, mode, formats, force=False):
+    """As _render_fingerprint; None when forced or an output is missing, so the report is always rebuilt."""
+    outputs = [os.path.join(job.folder, f"temp_report_{job.name}.{fmt}") for fmt in formats]
+    if force or not all(os.path.exists(p) for p in outputs):
+        return None
+    return _render_fingerprint(job, mode, formats)
+
+
+@timed("phase3.all")
+def generate_all_reports(download_root: str | None = None, show_gui: bool = True, max_workers: int = MAX_CONCURRENT_VEHICLES,
+                         mode: str = REPORT_MODE, fleet_summary: bool = True, formats=None, vehicles=None,
+                         memory_budget_mb: float = REPORT_MEMORY_BUDGET_MB, force: bool = False):
+    """
+    Report every vehicle in `vehicles` (default: the registry's active
+    vehicles, restricted to this process's shard, work_leases.SHARD) that
+    has a folder under download_root. Files are prepared as independent
+    tasks, largest first within memory_budget_mb, and each vehicle is
+    assembled once its last file is done (see report_scheduler).
+
+    Vehicles are claimed through work_leases, largest first, keeping about
+    max_workers vehicles in flight, so concurrent runs (GUI and scheduled
+    job, or several hosts on a shared workspace) split the fleet instead of
+    repeating it. Vehicles another run holds, or has already reported from
+    the same inputs and rendering setup, are skipped; force=True rebuilds
+    those too.
+    """
+    with LeaseSession(REPORT_LEASE_STAGE) as leases:
         root = download_root or DEFAULT_DOWNLOAD_ROOT
 
         if not os.path.isdir(root):
             print(f"❌ Download folder not found: {root}")
             return
 
-        vehicle_folders = [
-            os.path.join(root, d)
-            for d in os.listdir(root)
-            if os.path.isdir(os.path.join(root, d))
-        ]
+        # Only the default (registry) list is sharded; vehicles the caller names are all reported
+        sharded = vehicles is None
+        if sharded:
+            vehicles = get_registry().active_ids()
+        fleet_vehicles = [v for v in vehicles if os.path.isdir(os.path.join(root, v))]
+        if sharded:
+            vehicles = shard_ids(vehicles)
+        vehicle_folders = [os.path.join(root, v) for v in vehicles if os.path.isdir(os.path.join(root, v))]
+        if len(vehicle_folders) < len(vehicles):
+            print(f"ℹ️ {len(vehicles) - len(vehicle_folders)} active vehicle(s) have no download folder yet")
         if not vehicle_folders:
             print("❌ No vehicle folders found")
             return
@@ -420,29 +539,125 @@ def generate_all_reports(download_root: str | None = None, show_gui: bool = True
             else:
                 print(f"[{v_name}] {pct}% - {msg}")
 
-        def task(folder):
-            name = os.path.basename(folder)
-            progress_wrapper(name, 0, f"📂 Starting {name}")
-            generate_report_for_vehicle(folder, progress_cb=progress_wrapper)
+        fleet_stats = {}
+        stats_lock = threading.Lock()
+        formats = list(formats or REPORT_FORMATS)
+        jobs = {}
+        prepared = {}
+        remaining = {}
+        unclaimed = deque()  # VehicleJobs not yet claimed, largest first
+
+        def claim_next():
+            """File tasks of the next claimable vehicles, up to max_workers vehicles in flight."""
+            tasks = []
+            while True:
+                with stats_lock:
+                    if not unclaimed or len(remaining) >= max_workers:
+                        break
+                    job = unclaimed.popleft()
+                    remaining[job.name] = len(job.files)  # Holds the in-flight slot while claiming
+                status = leases.acquire(job.name, _report_fingerprint(job, mode, formats, force))
+                if status != CLAIMED:
+                    with stats_lock:
+                        del remaining[job.name]
+                    note = "Up to date" if status == DONE else "Other worker"
+                    progress_wrapper(job.name, 100 if status == DONE else 0,
+                                     f"⏭️ {note} — skipped" if status == DONE else "🔒 Claimed by another run — skipped")
+                    if gui:
+                        gui.mark_vehicle_done(job.name, note)
+                    continue
+                _remove_old_reports(job.folder, formats)
+                with stats_lock:
+                    jobs[job.name] = job
+                    prepared[job.name] = [None] * len(job.files)
+                progress_wrapper(job.name, 0, f"📂 Starting {job.name}")
+                tasks.extend(
+                    Task(job.name, partial(prepare_file, fc.path, job.name, mode, formats),
+                         cost=fc.cost, mem_mb=fc.mem_mb, tag=i)
+                    for i, fc in enumerate(job.files)
+                )
+            return tasks
+
+        def assemble(job):
+            stats = assemble_vehicle_report(job.folder, prepared.pop(job.name), progress_cb=progress_wrapper,
+                                            mode=mode, formats=formats)
             if gui:
-                gui.mark_vehicle_done(name, "Done ✅")
-            return name
+                gui.mark_vehicle_done(job.name, "Done ✅")
+            return stats
+
+        def on_result(task, result, error):
+            job = jobs[task.vehicle]
+            if task.tag == "assemble":
+                with stats_lock:
+                    remaining.pop(job.name, None)
+                # assemble_vehicle_report reports its own errors and returns {} — nothing to mark done then
+                if error is not None or not result:
+                    if error is not None:
+                        print(f"❌ Error processing vehicle {job.name}:", error)
+                        progress_wrapper(job.name, 0, f"❌ Error: {error}")
+                        if gui:
+                            gui.mark_vehicle_done(job.name, "Failed ❌")
+                    leases.release(job.name)
+                    return claim_next()
+                leases.complete(job.name, _render_fingerprint(job, mode, formats))
+                with stats_lock:
+                    for fmt, stat in (result or {}).items():
+                        total = fleet_stats.setdefault(fmt, {"bytes": 0, "seconds": 0.0, "reports": 0})
+                        total["bytes"] += stat["bytes"]
+                        total["seconds"] += stat["seconds"]
+                        total["reports"] += 1
+                return claim_next()
+
+            if error is not None:
+                print(f"❌ Error reading {os.path.basename(job.files[task.tag].path)}:", error)
+            with stats_lock:
+                prepared[job.name][task.tag] = result or FileSections(job.files[task.tag].path)
+                remaining[job.name] -= 1
+                left = remaining[job.name]
+            done = len(job.files) - left
+            # The vehicle's assembly counts as one more step after its files
+            progress_wrapper(job.name, done * 100 // (len(job.files) + 1),
+                             f"📄 Prepared {done}/{len(job.files)} file(s)")
+            if left:
+                return None
+            # Last file of the vehicle: its assembly goes ahead of any remaining file work
+            return [Task(job.name, partial(assemble, job), cost=job.rows, mem_mb=job.mem_mb, priority=1, tag="assemble")]
 
         def run_executor():
             try:
-                with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                    futures = {executor.submit(task, f): f for f in vehicle_folders}
-                    for fut in as_completed(futures):
-                        try:
-                            fut.result()
-                        except Exception as e:
-                            print("❌ Error processing vehicle:", e)
+                # Per-file tasks, largest first and admitted against the memory budget,
+                # then one assembly task per vehicle once all its files are prepared;
+                # vehicles are claimed (largest first) as earlier ones finish
+                found = []
+                for folder in vehicle_folders:
+                    job = estimate_job(folder)
+                    if not job.files:
+                        _remove_old_reports(folder, formats)
+                        progress_wrapper(job.name, 0, f"❌ No Excel files found in {folder}")
+                        if gui:
+                            gui.mark_vehicle_done(job.name, "No files")
+                        continue
+                    found.append(job)
+                unclaimed.extend(sorted(found, key=lambda j: j.cost, reverse=True))
+                makespan, done = run_scheduled(claim_next(), max_workers, memory_budget_mb, on_result=on_result)
+                print(makespan_report(done, makespan, max_workers, vehicle_names))
             except Exception as e:
                 print("❌ Executor error:", e)
             finally:
-                # final GUI update happens in main thread via mark_done
-               
+                for fmt, total in fleet_stats.items():
+                    print(f"📊 {fmt}: {total['reports']} report(s), {format_size_time(total)} total")
+                if fleet_summary:
+                    # Whole fleet from the store's metrics, whatever this run's shard; one writer at a time
+                    try:
+                        with LeaseSession(FLEET_SUMMARY_LEASE_STAGE) as summary_lease:
+                            if summary_lease.acquire("fleet") == CLAIMED:
+                                generate_fleet_summary(root, vehicles=fleet_vehicles)
+                            else:
+                                print("ℹ️ Fleet summary is being written by another run — skipped")
+                    except Exception as e:
+                        print("❌ Fleet summary error:", e)
 
+                # final GUI update happens in main thread via mark_done
                 if gui:
                     gui.mark_done("✅ All reports generated")
                 else:
@@ -464,13 +679,105 @@ def generate_all_reports(download_root: str | None = None, show_gui: bool = True
             # No GUI: just wait for worker to finish
             t.join()
 
-    finally:
-        with _running_lock:
-            _running = False
 
+# =========================
+# Fleet summary (cross-vehicle, from cached metrics)
+# =========================
+FLEET_SUMMARY_BASENAME = "fleet_temp_summary"
+
+def compute_fleet_summary(metrics: pd.DataFrame) -> pd.DataFrame:
+    """
+    One ranked row per vehicle from per-vehicle/per-day metrics
+    (telemetry_store.daily_metrics), in a single group-by pass.
+    """
+    if metrics.empty:
+        return pd.DataFrame()
+    m = metrics.dropna(subset=["max_imbalance"])
+    by_vehicle = m.groupby("vehicle", sort=False)
+    summary = by_vehicle.agg(
+        days=("day", "nunique"),
+        max_imbalance=("max_imbalance", "max"),
+        mean_daily_max_imbalance=("max_imbalance", "mean"),
+        soc_min=("min_soc", "min"),
+        soc_max=("max_soc", "max"),
+        first_date=("date", "min"),
+        last_date=("date", "max"),
+    )
+    worst = m.loc[by_vehicle["max_imbalance"].idxmax(), ["vehicle", "date", "imbalance_count"]].set_index("vehicle")
+    summary["max_imbalance_date"] = worst["date"]
+    summary["max_imbalance_count"] = worst["imbalance_count"]
+
+    # Hottest cell: the cell that was the day's most frequent MaxTempCell on the most days
+    # (ties go to the lowest cell number — Temperature2 before Temperature10 — so reruns pick the same one)
+    hot = m.dropna(subset=["max_cell"]).groupby(["vehicle", "max_cell"]).size().rename("hot_days").reset_index()
+    hot["cell_no"] = pd.to_numeric(hot["max_cell"].str.extract(r"(\d+)$", expand=False)).fillna(float("inf"))
+    hot = (hot.sort_values(["vehicle", "hot_days", "cell_no", "max_cell"], ascending=[True, False, True, True])
+           .drop_duplicates("vehicle").set_index("vehicle"))
+    summary["hottest_cell"] = hot["max_cell"]
+    summary["hottest_cell_days"] = hot["hot_days"].reindex(summary.index).fillna(0).astype(int)
+    summary["hottest_cell_share"] = summary["hottest_cell_days"] / summary["days"]
+
+    summary = summary.sort_values(["max_imbalance", "mean_daily_max_imbalance"], ascending=False).reset_index()
+    summary.insert(0, "rank", range(1, len(summary) + 1))
+    return summary
+
+def write_fleet_summary_docx(summary: pd.DataFrame, out_path: str):
+    doc = Document()
+    set_page_border(doc.sections[0])
+    h = doc.add_heading("FLEET TEMPERATURE IMBALANCE SUMMARY", level=0)
+    h.runs[0].font.size = Pt(14)
+    h.runs[0].bold = True
+    doc.add_paragraph(f"Generated {time.strftime('%Y-%m-%d %H:%M')} — {len(summary)} vehicle(s), ranked by max imbalance")
+
+    headers = ["#", "Vehicle", "Days", "Max imbalance (°C)", "On date", "Mean daily max (°C)",
+               "Hottest cell", "Hot days", "SoC range"]
+    table = doc.add_table(rows=len(summary) + 1, cols=len(headers))
+    table.style = 'Light List Accent 1'
+    for j, title in enumerate(headers):
+        table.cell(0, j).text = title
+    for i, r in enumerate(summary.itertuples(index=False), start=1):
+        values = [
+            str(r.rank), r.vehicle, str(r.days), f"{r.max_imbalance:.2f} (Count: {r.max_imbalance_count})",
+            str(r.max_imbalance_date), f"{r.mean_daily_max_imbalance:.2f}", str(r.hottest_cell),
+            f"{r.hottest_cell_days} ({r.hottest_cell_share:.0%})", f"{r.soc_min:.0f}–{r.soc_max:.0f}",
+        ]
+        for j, v in enumerate(values):
+            table.cell(i, j).text = v
+    doc.save(out_path)
+
+@timed("phase3.fleet_summary")
+def generate_fleet_summary(download_root: str | None = None, vehicles=None, out_dir: str | None = None):
+    """
+    Cross-vehicle ranked table (DOCX + CSV) built from the telemetry store's
+    cached per-day metrics. No per-vehicle chart is rendered; only files not
+    yet in the store are parsed.
+    """
+    root = download_root or DEFAULT_DOWNLOAD_ROOT
+    out_dir = out_dir or root
+    store = get_store()
+    if vehicles is None:
+        vehicles = [os.path.basename(f) for f in get_registry().active_folders(root)]
+    for v in vehicles:
+        store.ingest_folder(os.path.join(root, v))
+
+    summary = compute_fleet_summary(store.daily_metrics(vehicles=list(vehicles)))
+    if summary.empty:
+        print("❌ Fleet summary: no metrics available")
+        return None
+
+    csv_path = os.path.join(out_dir, f"{FLEET_SUMMARY_BASENAME}.csv")
+    docx_path = os.path.join(out_dir, f"{FLEET_SUMMARY_BASENAME}.docx")
+    summary.to_csv(csv_path, index=False, float_format="%.2f")
+    write_fleet_summary_docx(summary, docx_path)
+    print(f"✅ Fleet summary saved: {docx_path}")
+    return summary
 
 # =========================
 # Standalone
 # =========================
 if __name__ == "__main__":
-    generate_all_reports(show_gui=True)
+    import argparse
+    ap = argparse.ArgumentParser(description="Generate per-vehicle temperature reports")
+    ap.add_argument("--force", action="store_true", help="rebuild reports that are up to date")
+    args = ap.parse_args()
+    generate_all_reports(show_gui=True, force=args.force)
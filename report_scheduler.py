@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Size- and memory-aware scheduling of report work.
+Work is split per export file (parse + metrics + charts), so one large
+vehicle spreads over every worker; when a vehicle's last file is done its
+assembly task (merge sections, write the reports) is queued with priority.
+
+Costs are estimated from the files: rows known to the telemetry store or the
+archive manifests, otherwise estimated from xlsx bytes, with a penalty for
+files that still need parsing. Tasks are dispatched largest-first (LPT) and
+admitted against a memory budget: a worker that cannot fit the next-largest
+task takes the largest one that does fit; a task bigger than the whole
+budget runs alone.
+
+After a run, the achieved makespan is compared with a list-scheduling
+simulation of the same measured work done one whole vehicle at a time in
+the naive (registry) order.
+"""
+
+import os
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+from compaction import archived_members, report_files
+from telemetry_store import get_store
+
+# =========================
+# Configuration
+# =========================
+REPORT_MEMORY_BUDGET_MB = 1024  # Estimated working set allowed across concurrent tasks
+REPORT_BASE_MB = 40  # Per-task overhead: charts, DOCX package, interpreter churn
+REPORT_BYTES_PER_ROW = 400  # Columns + frame + per-day metrics per telemetry row
+XLSX_BYTES_PER_ROW = 300  # Rows estimated from file size when the store has not seen a file
+PARSE_COST_FACTOR = 8  # An unparsed xlsx row costs this many stored rows of work
+
+
+# =========================
+# Cost estimates
+# =========================
+@dataclass
+class FileCost:
+    path: str
+    bytes: int = 0
+    rows: int = 0
+    uncached_rows: int = 0
+
+    @property
+    def cost(self):
+        return self.rows + self.uncached_rows * (PARSE_COST_FACTOR - 1)
+
+    @property
+    def mem_mb(self):
+        return REPORT_BASE_MB + self.rows * REPORT_BYTES_PER_ROW / 1e6
+
+
+@dataclass
+class VehicleJob:
+    folder: str
+    files: list = field(default_factory=list)  # [FileCost] in report_files order
+
+    @property
+    def name(self):
+        return os.path.basename(self.folder)
+
+    @property
+    def bytes(self):
+        return sum(f.bytes for f in self.files)
+
+    @property
+    def rows(self):
+        return sum(f.rows for f in self.files)
+
+    @property
+    def cost(self):
+        return sum(f.cost for f in self.files)
+
+    @property
+    def mem_mb(self):
+        return REPORT_BASE_MB + self.rows * REPORT_BYTES_PER_ROW / 1e6
+
+
+def estimate_job(vehicle_folder, store=None):
+    store = store or get_store()
+    job = VehicleJob(vehicle_folder)
+    archived = None
+    for path in report_files(vehicle_folder):
+        fc = FileCost(path)
+        if not os.path.exists(path):
+            archived = archived if archived is not None else archived_members(vehicle_folder)
+            fc.rows = archived.get(os.path.basename(path), (None, {}))[1].get("rows_read", 0)
+        else:
+            fc.bytes = os.path.getsize(path)
+            rows = store.stored_rows(path)
+            if rows is None:
+                rows = fc.uncached_rows = fc.bytes // XLSX_BYTES_PER_ROW
+            fc.rows = rows
+        job.files.append(fc)
+    return job
+
+
+# =========================
+# Scheduling
+# =========================
+@dataclass
+class Task:
+    vehicle: str
+    fn: Callable[[], object]
+    cost: float = 0
+    mem_mb: float = REPORT_BASE_MB
+    priority: int = 0  # Higher runs first, whatever the cost
+    tag: object = None  # Caller's bookkeeping (file index, "assemble", …)
+    seconds: float | None = None  # Measured once the task has run
+
+
+def simulate_makespan(durations, workers):
+    """List scheduling: each job in the given order goes to the worker that frees up first."""
+    free_at = [0.0] * max(1, workers)
+    for d in durations:
+        i = free_at.index(min(free_at))
+        free_at[i] += d
+    return max(free_at) if durations else 0.0
+
+
+def run_scheduled(tasks, workers, budget_mb=REPORT_MEMORY_BUDGET_MB, on_result=None):
+    """
+    Run every task's fn() on `workers` threads, highest (priority, cost) first,
+    within budget_mb of estimated memory. on_result(task, result, error) is
+    called from the worker thread as each task finishes and may return
+    follow-up tasks, which are queued right away.
+    Returns (makespan seconds, all tasks run, with .seconds filled in).
+    """
+    pending = list(tasks)
+    done = []
+    cond = threading.Condition()
+    state = {"in_use": 0.0, "running": 0}
+
+    def take():
+        with cond:
+            while pending or state["running"]:
+                pending.sort(key=lambda t: (t.priority, t.cost), reverse=True)
+                free = budget_mb - state["in_use"]
+                task = next((t for t in pending if t.mem_mb <= free), None)
+                if task is None and pending and state["running"] == 0:
+                    task = pending[0]  # Over budget on its own: run it alone
+                if task is not None:
+                    pending.remove(task)
+                    state["in_use"] += task.mem_mb
+                    state["running"] += 1
+                    return task
+                cond.wait()
+            return None
+
+    def finish(task, follow_ups):
+        with cond:
+            state["in_use"] -= task.mem_mb
+            state["running"] -= 1
+            done.append(task)
+            pending.extend(follow_ups or ())
+            cond.notify_all()
+
+    def worker():
+        while (task := take()) is not None:
+            started = time.perf_counter()
+            result = error = None
+            try:
+                result = task.fn()
+            except Exception as e:
+                error = e
+            task.seconds = time.perf_counter() - started
+            follow_ups = None
+            try:
+                if on_result:
+                    follow_ups = on_result(task, result, error)
+            finally:
+                finish(task, follow_ups)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, done
+
+
+def makespan_report(tasks, makespan, workers, naive_order):
+    """
+    One line: achieved makespan against whole vehicles run in naive_order
+    (vehicle names), both from the measured task durations.
+    """
+    per_vehicle = {}
+    for t in tasks:
+        per_vehicle[t.vehicle] = per_vehicle.get(t.vehicle, 0.0) + (t.seconds or 0.0)
+    durations = [per_vehicle.get(v, 0.0) for v in naive_order]
+    naive = simulate_makespan(durations, workers)
+    total = sum(per_vehicle.values())
+    return (f"⏱️ Makespan {makespan:.1f}s on {workers} worker(s); vehicle-at-a-time in registry order would take "
+            f"~{naive:.1f}s (largest vehicle {max(durations, default=0):.1f}s, total work / workers "
+            f"{total / max(1, workers):.1f}s)")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Phase 1 delta planner: which Shepherd date ranges still need requesting.
+A vehicle's local coverage is the set of createdAt days in its downloaded
+exports (read through the telemetry store, so each xlsx is parsed once).
+Only the missing days between the registry start date and yesterday are
+requested, merged into contiguous ranges; up-to-date vehicles get no request.
+
+Days a vehicle never reports (parked, no telemetry) would otherwise be
+requested on every run, so each requested day is counted in a small JSON
+ledger and given up after MAX_REQUESTS_PER_DAY attempts.
+
+    python request_planner.py [--end 2025-09-30] [--vehicle EMCH-5016]
+"""
+
+import os
+import sys
+import json
+import argparse
+import datetime
+import threading
+from dataclasses import dataclass, field
+
+from compaction import archived_days
+from telemetry_store import get_store
+from vehicle_registry import get_registry
+
+# =========================
+# Configuration
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DOWNLOAD_ROOT = os.path.join(BASE_DIR, "download")
+LEDGER_PATH = os.path.join(BASE_DIR, "phase1_requests.json")
+MERGE_GAP_DAYS = 2  # Covered gaps up to this long are re-requested rather than splitting into two submissions
+MAX_REQUESTS_PER_DAY = 3  # After this many requests without data, a day is treated as a no-data day
+
+
+# =========================
+# Helpers
+# =========================
+def _days(start, end):
+    return [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def missing_ranges(covered, start, end, merge_gap_days=MERGE_GAP_DAYS, skip=()):
+    """
+    Contiguous (first, last) date ranges in [start, end] not in `covered`
+    (nor in `skip`). Ranges separated by at most merge_gap_days covered days
+    are merged, since one longer request is cheaper than two submissions.
+    """
+    ranges = []
+    for day in _days(start, end):
+        if day in covered or day in skip:
+            continue
+        if ranges and (day - ranges[-1][1]).days <= merge_gap_days + 1:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(r) for r in ranges]
+
+
+def yesterday():
+    return datetime.date.today() - datetime.timedelta(days=1)
+
+
+# =========================
+# Request ledger
+# =========================
+class RequestLedger:
+    """Per vehicle/day request counts, persisted as {vehicle: {"YYYY-MM-DD": n}}."""
+
+    def __init__(self, path=LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._counts = json.load(f)
+        except (OSError, ValueError):
+            self._counts = {}
+
+    def attempts(self, vehicle, day):
+        return self._counts.get(vehicle, {}).get(day.isoformat(), 0)
+
+    def exhausted(self, vehicle, days, limit=MAX_REQUESTS_PER_DAY):
+        return {d for d in days if self.attempts(vehicle, d) >= limit}
+
+    def record(self, vehicle, ranges, covered=()):
+        """Count a submission of `ranges`; days now covered are dropped from the ledger."""
+        with self._lock:
+            counts = self._counts.setdefault(vehicle, {})
+            for d in covered:
+                counts.pop(d.isoformat(), None)
+            for first, last in ranges:
+                for d in _days(first, last):
+                    if d not in covered:
+                        counts[d.isoformat()] = counts.get(d.isoformat(), 0) + 1
+
+    def save(self):
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._counts, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+# =========================
+# Planner
+# =========================
+@dataclass
+class VehiclePlan:
+    vehicle: str
+    start: datetime.date
+    end: datetime.date
+    ranges: list = field(default_factory=list)  # [(first, last)] to request
+    covered: set = field(default_factory=set)  # createdAt days present locally
+    given_up: set = field(default_factory=set)  # missing days past MAX_REQUESTS_PER_DAY
+
+    @property
+    def up_to_date(self):
+        return not self.ranges
+
+    @property
+    def requested_days(self):
+        return sum((last - first).days + 1 for first, last in self.ranges)
+
+
+def local_coverage(vehicle, download_root=DOWNLOAD_ROOT, store=None):
+    """createdAt days present in the vehicle's downloaded exports and monthly archives."""
+    store = store or get_store()
+    folder = os.path.join(download_root, vehicle)
+    if not os.path.isdir(folder):
+        return store.coverage(vehicle)
+    store.ingest_folder(folder)  # no-op for files already in the store
+    return store.coverage(vehicle) | archived_days(folder)
+
+
+def plan_vehicle(vehicle, download_root=DOWNLOAD_ROOT, end=None, ledger=None, store=None):
+    """`vehicle` is a vehicle_registry.Vehicle."""
+    start, end = vehicle.window(end)
+    plan = VehiclePlan(vehicle.reg_no, start, end)
+    if start > end:
+        return plan
+    plan.covered = {d for d in local_coverage(vehicle.reg_no, download_root, store) if start <= d <= end}
+    if ledger is not None:
+        missing = [d for d in _days(start, end) if d not in plan.covered]
+        plan.given_up = ledger.exhausted(vehicle.reg_no, missing)
+    plan.ranges = missing_ranges(plan.covered, start, end, skip=plan.given_up)
+    return plan
+
+
+def plan_fleet(vehicles=None, download_root=DOWNLOAD_ROOT, end=None, ledger=None, store=None):
+    """Plans for the registry's active vehicles (or the given Vehicle records)."""
+    vehicles = get_registry().active() if vehicles is None else vehicles
+    return [plan_vehicle(v, download_root, end, ledger, store) for v in vehicles]
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Show the Phase 1 request plan (dry run)")
+    ap.add_argument("--end", type=datetime.date.fromisoformat, default=None, help="last day (default yesterday)")
+    ap.add_argument("--vehicle", action="append", help="only these vehicles")
+    ap.add_argument("--download-root", default=DOWNLOAD_ROOT)
+    args = ap.parse_args()
+
+    registry = get_registry()
+    vehicles = [registry.get(v) for v in args.vehicle if v in registry] if args.vehicle else None
+    plans = plan_fleet(vehicles, args.download_root, args.end, RequestLedger())
+    for p in plans:
+        if p.up_to_date:
+            print(f"{p.vehicle:<16} up to date ({len(p.covered)} day(s) present)")
+            continue
+        spans = ", ".join(f"{a:%d-%b}" if a == b else f"{a:%d-%b}→{b:%d-%b}" for a, b in p.ranges)
+        note = f", {len(p.given_up)} no-data day(s) skipped" if p.given_up else ""
+        print(f"{p.vehicle:<16} {len(p.ranges)} request(s), {p.requested_days} day(s): {spans}{note}")
+    todo = [p for p in plans if not p.up_to_date]
+    full = sum((p.end - p.start).days + 1 for p in plans if p.start <= p.end)
+    print(f"{len(todo)}/{len(plans)} vehicle(s) to request, {sum(p.requested_days for p in todo)}/{full} day(s)",
+          file=sys.stderr)
@@ -5,23 +5,41 @@ Standalone version with automated token reuse
 """
 
 import os
+import json
+import time
+import random
+import socket
 import threading
+from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import ttk
 from google_auth_oauthlib.flow import InstalledAppFlow
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 
+from instrumentation import annotate, folder_vehicle, span, timed
+from vehicle_registry import get_registry
+
 # =========================
 # CONFIGURATION
 # =========================
 DOWNLOAD_FOLDER = r"D:\OCTOPUS_AUTOMATION\download"  # Root vehicle folders
 OAUTH_JSON_FILE = r"D:\OCTOPUS_AUTOMATION\ntc_tracker_oauth.json"
 TOKEN_FILE = r"D:\OCTOPUS_AUTOMATION\token.json"    # OAuth token will be saved here
-MAX_CONCURRENT_UPLOADS = 2  # Simultaneous uploads
+INITIAL_CONCURRENT_UPLOADS = 2  # Simultaneous uploads at start
+MIN_CONCURRENT_UPLOADS = 1
+MAX_CONCURRENT_UPLOADS = 8  # Ceiling for the adaptive controller
+HTTP_TIMEOUT_SECS = 60
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Resumable chunk size (must be a multiple of 256 KB)
+MAX_RETRIES = 6  # Per request / per chunk
+BACKOFF_BASE_SECS = 1.0
+BACKOFF_MAX_SECS = 32.0
 AUTO_CLOSE_SECS = 2  # GUI auto-close after uploads
 ROOT_DRIVE_FOLDER_NAME = "NTC TRACKER"  # Root folder in Google Drive
 
@@ -118,10 +136,101 @@ class UploadProgressGUI:
         except:
             pass
 
+# =========================
+# Retry / Backoff
+# =========================
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+def _error_reasons(err):
+    try:
+        payload = json.loads(err.content.decode("utf-8") if isinstance(err.content, bytes) else err.content)
+        return {e.get("reason") for e in payload.get("error", {}).get("errors", [])}
+    except Exception:
+        return set()
+
+def classify_error(err):
+    """Return 'throttle', 'transient' or None (not retryable)."""
+    if isinstance(err, HttpError):
+        status = err.resp.status
+        if status == 429 or (status == 403 and _error_reasons(err) & RATE_LIMIT_REASONS):
+            return "throttle"
+        if status >= 500:
+            return "transient"
+        return None
+    if isinstance(err, (ConnectionError, socket.timeout, TimeoutError)):
+        return "transient"
+    if type(err).__module__.startswith("httplib2"):
+        return "transient"
+    return None
+
+def call_with_backoff(fn, controller=None, on_retry=None):
+    """Run fn(), retrying throttled/5xx/transport failures with jittered exponential backoff."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return fn()
+        except Exception as e:
+            kind = classify_error(e)
+            if kind is None or attempt == MAX_RETRIES:
+                raise
+            if kind == "throttle" and controller:
+                controller.on_throttle()
+            delay = min(BACKOFF_MAX_SECS, BACKOFF_BASE_SECS * (2 ** attempt)) + random.uniform(0, 1)
+            if on_retry:
+                on_retry(attempt + 1, delay, e)
+            time.sleep(delay)
+
+# =========================
+# Adaptive Concurrency
+# =========================
+class AdaptiveConcurrency:
+    """
+    AIMD limiter for Drive uploads: one more slot after every
+    `increase_after` clean uploads, halved as soon as Drive throttles.
+    """
+    def __init__(self, initial=INITIAL_CONCURRENT_UPLOADS, minimum=MIN_CONCURRENT_UPLOADS,
+                 maximum=MAX_CONCURRENT_UPLOADS, increase_after=2):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(maximum, initial))
+        self.increase_after = increase_after
+        self._active = 0
+        self._clean_streak = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._clean_streak += 1
+            if self._clean_streak >= self.increase_after and self.limit < self.maximum:
+                self.limit += 1
+                self._clean_streak = 0
+                self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._clean_streak = 0
+
 # =========================
 # Google Drive Helpers
 # =========================
-def get_drive_service():
+def _save_credentials(creds):
+    with open(TOKEN_FILE, 'w') as token:
+        token.write(creds.to_json())
+
+def get_credentials():
     creds = None
     # Load token if exists
     if os.path.exists(TOKEN_FILE):
@@ -135,58 +244,144 @@ def get_drive_service():
             flow = InstalledAppFlow.from_client_secrets_file(OAUTH_JSON_FILE, SCOPES)
             creds = flow.run_local_server(port=0)
         # Save credentials for next time
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
-
-    service = build('drive', 'v3', credentials=creds)
-    return service
-
-def get_or_create_folder(service, parent_id, folder_name):
+        _save_credentials(creds)
+    return creds
+
+class _FactoryHttp(AuthorizedHttp):
+    """
+    AuthorizedHttp whose token refresh goes through DriveClientFactory: one
+    refresh under its lock, saved to TOKEN_FILE. The transport's own refresh
+    (before a request, or on 401) would bypass both.
+    """
+    def __init__(self, factory, http):
+        super().__init__(factory.creds, http=http, refresh_status_codes=())
+        self._factory = factory
+
+    def request(self, *args, **kwargs):
+        self._factory._ensure_fresh()
+        return super().request(*args, **kwargs)
+
+class DriveClientFactory:
+    """
+    httplib2.Http is not thread-safe, so every worker thread gets its own
+    Drive service and transport, built from the discovery document bundled
+    with googleapiclient (no network). The credentials object is shared and
+    refreshed under a lock.
+    """
+    def __init__(self, creds):
+        self.creds = creds
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+
+    def _ensure_fresh(self):
+        if self.creds.valid:
+            return
+        with self._refresh_lock:
+            if not self.creds.valid:
+                self.creds.refresh(Request())
+                _save_credentials(self.creds)
+
+    def get(self):
+        self._ensure_fresh()
+        service = getattr(self._local, "service", None)
+        if service is None:
+            http = _FactoryHttp(self, httplib2.Http(timeout=HTTP_TIMEOUT_SECS))
+            service = build('drive', 'v3', http=http, static_discovery=True)
+            self._local.service = service
+        return service
+
+def get_or_create_folder(service, parent_id, folder_name, controller=None, on_retry=None):
     query = f"mimeType='application/vnd.google-apps.folder' and trashed=false and name='{folder_name}' and '{parent_id}' in parents"
-    res = service.files().list(q=query, fields="files(id, name)").execute()
+    res = call_with_backoff(service.files().list(q=query, fields="files(id, name)").execute,
+                            controller=controller, on_retry=on_retry)
     files = res.get("files", [])
     if files:
         return files[0]["id"]
     metadata = {"name": folder_name, "mimeType": "application/vnd.google-apps.folder", "parents":[parent_id]}
-    folder = service.files().create(body=metadata, fields="id").execute()
+    folder = call_with_backoff(service.files().create(body=metadata, fields="id").execute,
+                               controller=controller, on_retry=on_retry)
     return folder["id"]
 
-def delete_existing_docs(service, folder_id):
+def delete_existing_docs(service, folder_id, controller=None, on_retry=None):
     query = f"'{folder_id}' in parents and trashed=false and mimeType='application/vnd.openxmlformats-officedocument.wordprocessingml.document'"
-    res = service.files().list(q=query, fields="files(id, name)").execute()
+    res = call_with_backoff(service.files().list(q=query, fields="files(id, name)").execute,
+                            controller=controller, on_retry=on_retry)
     for f in res.get("files", []):
-        service.files().delete(fileId=f["id"]).execute()
-
-def upload_docx(service, folder_id, local_file_path):
-    media = MediaFileUpload(local_file_path, mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+        call_with_backoff(service.files().delete(fileId=f["id"]).execute, controller=controller, on_retry=on_retry)
+
+@timed("phase4.upload_docx")
+def upload_docx(service, folder_id, local_file_path, controller=None, progress_cb=None, on_retry=None):
+    """
+    Resumable chunked upload. A failed chunk is retried from the last byte
+    Drive acknowledged instead of restarting the file.
+    progress_cb(bytes_sent, total_bytes) is called after every chunk.
+    """
+    media = MediaFileUpload(local_file_path, mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                            chunksize=UPLOAD_CHUNK_SIZE, resumable=True)
     fname = os.path.basename(local_file_path)
-    service.files().create(body={"name": fname, "parents":[folder_id]}, media_body=media, fields="id").execute()
+    total = media.size() or 0
+    request = service.files().create(body={"name": fname, "parents":[folder_id]}, media_body=media, fields="id")
+    response = None
+    while response is None:
+        status, response = call_with_backoff(request.next_chunk, controller=controller, on_retry=on_retry)
+        if progress_cb:
+            sent = total if response is not None else (status.resumable_progress if status else 0)
+            progress_cb(sent, total)
+    annotate(bytes=total)
+    return response
 
 # =========================
 # Per-Vehicle Upload
 # =========================
-def upload_vehicle_report(vehicle_folder, service, root_folder_id, progress_cb=None):
+@timed("phase4.upload_vehicle_report", vehicle=folder_vehicle("vehicle_folder"))
+def upload_vehicle_report(vehicle_folder, service, root_folder_id, progress_cb=None, controller=None):
+    """
+    Upload the vehicle's report, replacing the one in its Drive folder.
+    Returns True for a clean upload (no throttled retry on any Drive call),
+    False when there was no report or Drive throttled along the way.
+    """
     vehicle_name = os.path.basename(vehicle_folder)
     report_files = [f for f in os.listdir(vehicle_folder) if f.lower().endswith(".docx") and f.startswith("temp_report_")]
+    last_pct = [0]
+    throttled = [False]
 
-    vehicle_folder_id = get_or_create_folder(service, root_folder_id, vehicle_name)
+    def on_retry(attempt, delay, err):
+        annotate(retries=attempt)
+        if classify_error(err) == "throttle":
+            throttled[0] = True
+        if progress_cb:
+            progress_cb(vehicle_name, last_pct[0], f"Retry {attempt}/{MAX_RETRIES} in {delay:.0f}s ({err})")
+
+    with span("phase4.get_or_create_folder"):
+        vehicle_folder_id = get_or_create_folder(service, root_folder_id, vehicle_name,
+                                                 controller=controller, on_retry=on_retry)
 
     if not report_files:
         if progress_cb:
             progress_cb(vehicle_name, 0, "Processed, but no report ❌")
-        return
+        return False
 
     report_file = os.path.join(vehicle_folder, report_files[0])
     if progress_cb:
         progress_cb(vehicle_name, 5, "Preparing upload…")
 
-    delete_existing_docs(service, vehicle_folder_id)
+    with span("phase4.delete_existing_docs"):
+        delete_existing_docs(service, vehicle_folder_id, controller=controller, on_retry=on_retry)
     if progress_cb:
-        progress_cb(vehicle_name, 50, "Old files deleted…")
+        progress_cb(vehicle_name, 10, "Old files deleted…")
+
+    last_pct[0] = 10
+
+    def on_bytes(sent, total):
+        if progress_cb and total:
+            last_pct[0] = 10 + int(90 * sent / total)
+            progress_cb(vehicle_name, last_pct[0], f"Uploading… {sent / 1e6:.1f}/{total / 1e6:.1f} MB")
 
-    upload_docx(service, vehicle_folder_id, report_file)
+    upload_docx(service, vehicle_folder_id, report_file, controller=controller,
+                progress_cb=on_bytes, on_retry=on_retry)
     if progress_cb:
         progress_cb(vehicle_name, 100, f"Uploaded {os.path.basename(report_file)} ✅")
+    return not throttled[0]
 
 # =========================
 # Main Batch Upload
@@ -196,8 +391,7 @@ def main():
         print(f"❌ Download folder not found: {DOWNLOAD_FOLDER}")
         return
 
-    vehicle_folders = [os.path.join(DOWNLOAD_FOLDER, d) for d in os.listdir(DOWNLOAD_FOLDER)
-                       if os.path.isdir(os.path.join(DOWNLOAD_FOLDER, d))]
+    vehicle_folders = get_registry().active_folders(DOWNLOAD_FOLDER)
     if not vehicle_folders:
         print("❌ No vehicle folders found")
         return
@@ -205,25 +399,35 @@ def main():
     vehicle_names = [os.path.basename(v) for v in vehicle_folders]
     gui = UploadProgressGUI(vehicle_names)
 
-    service = get_drive_service()
-    root_folder_id = get_or_create_folder(service, "root", ROOT_DRIVE_FOLDER_NAME)
+    controller = AdaptiveConcurrency()
+    clients = DriveClientFactory(get_credentials())
+    root_folder_id = get_or_create_folder(clients.get(), "root", ROOT_DRIVE_FOLDER_NAME, controller=controller)
 
     def progress_wrapper(vname, pct, status):
         gui.update_progress(vname, pct, status)
 
     def task(folder):
-        upload_vehicle_report(folder, service, root_folder_id, progress_cb=progress_wrapper)
+        with controller.slot():
+            clean = upload_vehicle_report(folder, clients.get(), root_folder_id, progress_cb=progress_wrapper,
+                                          controller=controller)
+        if clean:
+            controller.on_success()
         gui.mark_vehicle_done(os.path.basename(folder))
 
     def run_executor():
+        failed = 0
         with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_UPLOADS) as executor:
-            futures = [executor.submit(task, f) for f in vehicle_folders]
+            futures = {executor.submit(task, f): f for f in vehicle_folders}
             for f in as_completed(futures):
                 try:
                     f.result()
                 except Exception as e:
-                    print("❌ Error:", e)
-        gui.mark_done("✅ All uploads completed")
+                    failed += 1
+                    vname = os.path.basename(futures[f])
+                    gui.mark_vehicle_done(vname, f"Upload failed ❌ {e}")
+                    print(f"❌ Error uploading {vname}:", e)
+        print(f"ℹ️ Upload concurrency settled at {controller.limit}")
+        gui.mark_done("✅ All uploads completed" if not failed else f"⚠️ Completed with {failed} failed upload(s)")
 
     t = threading.Thread(target=run_executor, daemon=True)
     t.start()
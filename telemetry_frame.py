@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory telemetry frame.
+float32 temperature matrix, int8 cell-index codes mapped to column names,
+datetime64 timestamps and integer day numbers. Per-day groups are slices
+(views) of the frame, never copies.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86_400 * 10**9
+NO_CELL = -1  # Cell code for rows without any valid temperature
+
+
+class DaySlice:
+    """View over one day's rows of a TelemetryFrame (file order preserved)."""
+
+    def __init__(self, frame, day, start, stop):
+        self.frame = frame
+        self.day = int(day)
+        rows = slice(start, stop)
+        self.created_at = frame.created_at[rows]
+        self.soc = frame.soc[rows]
+        self.max_temp = frame.max_temp[rows]
+        self.min_temp = frame.min_temp[rows]
+        self.imbalance = frame.imbalance[rows]
+        self.max_cell = frame.max_cell[rows]
+        self.min_cell = frame.min_cell[rows]
+
+    def __len__(self):
+        return len(self.soc)
+
+    @property
+    def date(self) -> datetime.date:
+        return day_to_date(self.day)
+
+    def most_common_max_cell(self):
+        return self.frame.cell_name(most_common_code(self.max_cell))
+
+    def most_common_min_cell(self):
+        return self.frame.cell_name(most_common_code(self.min_cell))
+
+
+class TelemetryFrame:
+    def __init__(self, created_at, soc, temps, cell_names, source=""):
+        self.source = source
+        self.cell_names = tuple(cell_names)
+        code_dtype = np.int8 if len(self.cell_names) < 127 else np.int16
+
+        created_at = np.asarray(created_at, dtype="datetime64[ns]")
+        soc = np.asarray(soc, dtype=np.float64)
+        temps = np.asarray(temps, dtype=np.float32)
+        days = (created_at.view(np.int64) // NS_PER_DAY).astype(np.int32)
+
+        # Group rows of the same day together once (stable, so file order is kept
+        # within a day); every later per-day access is then a slice.
+        self._first_seen = None
+        if len(days) > 1 and np.any(np.diff(days) < 0):
+            uniq, first_row = np.unique(days, return_index=True)
+            self._first_seen = dict(zip(uniq.tolist(), first_row.tolist()))
+            order = np.argsort(days, kind="stable")
+            created_at, soc, temps, days = created_at[order], soc[order], temps[order], days[order]
+
+        self.created_at = created_at
+        self.soc = soc
+        self.temps = np.ascontiguousarray(temps)
+        self.days = days
+
+        valid = ~np.isnan(self.temps)
+        any_valid = valid.any(axis=1)
+        hot = np.where(valid, self.temps, -np.inf)
+        cold = np.where(valid, self.temps, np.inf)
+        max_idx = hot.argmax(axis=1) if self.cell_names else np.zeros(len(days), dtype=np.int64)
+        min_idx = cold.argmin(axis=1) if self.cell_names else np.zeros(len(days), dtype=np.int64)
+        rows = np.arange(len(days))
+
+        self.max_temp = np.where(any_valid, hot[rows, max_idx], np.nan).astype(np.float32)
+        self.min_temp = np.where(any_valid, cold[rows, min_idx], np.nan).astype(np.float32)
+        self.imbalance = self.max_temp - self.min_temp
+        self.max_cell = np.where(any_valid, max_idx, NO_CELL).astype(code_dtype)
+        self.min_cell = np.where(any_valid, min_idx, NO_CELL).astype(code_dtype)
+
+        self._day_index = None
+
+    @classmethod
+    def from_columns(cls, cols):
+        """Build from a telemetry_reader.TelemetryColumns."""
+        return cls(cols.created_at, cols.soc, cols.temps, cols.temp_columns, source=cols.path)
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (
+            self.created_at, self.soc, self.temps, self.days, self.max_temp,
+            self.min_temp, self.imbalance, self.max_cell, self.min_cell,
+        ))
+
+    def cell_name(self, code):
+        if code is None or code == NO_CELL:
+            return None
+        return self.cell_names[code]
+
+    def day_index(self):
+        """(days, starts, stops) — one entry per distinct day, in day order."""
+        if self._day_index is None:
+            if len(self.days) == 0:
+                empty = np.empty(0, dtype=np.int64)
+                self._day_index = (empty, empty, empty)
+            else:
+                bounds = np.flatnonzero(np.diff(self.days)) + 1
+                starts = np.concatenate(([0], bounds))
+                stops = np.concatenate((bounds, [len(self.days)]))
+                self._day_index = (self.days[starts], starts, stops)
+        return self._day_index
+
+    def first_rows(self):
+        """{day: position of the day's first row in the original (file) row order}."""
+        if self._first_seen is not None:
+            return self._first_seen
+        days, starts, _ = self.day_index()
+        return dict(zip(days.tolist(), starts.tolist()))
+
+    def day_slice(self, day):
+        """DaySlice for one day number, or None if the frame has no rows that day."""
+        days, starts, stops = self.day_index()
+        i = int(np.searchsorted(days, day))
+        if i >= len(days) or days[i] != day:
+            return None
+        return DaySlice(self, days[i], starts[i], stops[i])
+
+    def iter_days(self):
+        for day, start, stop in zip(*self.day_index()):
+            yield DaySlice(self, day, start, stop)
+
+    def busiest_day(self):
+        """DaySlice of the day with the most rows (ties: earliest row in the file wins)."""
+        days, starts, stops = self.day_index()
+        if len(days) == 0:
+            return None
+        counts = stops - starts
+        best = np.flatnonzero(counts == counts.max())
+        # Ties go to the day seen first in the file, like value_counts().idxmax()
+        if len(best) > 1 and self._first_seen is not None:
+            best = sorted(best, key=lambda i: self._first_seen[int(days[i])])
+        i = best[0]
+        return DaySlice(self, days[i], starts[i], stops[i])
+
+
+# =========================
+# Per-day metrics (group-by engine)
+# =========================
+DAILY_METRIC_COLUMNS = [
+    "day", "date", "rows", "start_soc", "end_soc", "min_soc", "max_soc",
+    "max_imbalance", "imbalance_count", "max_cell", "min_cell",
+]
+
+
+def daily_metrics(frame: TelemetryFrame) -> pd.DataFrame:
+    """
+    Metrics for every day of the frame in one vectorized group-by-day pass.
+    Rows are already contiguous per day, so each aggregate is a single
+    ufunc.reduceat over the day segments.
+    """
+    days, starts, stops = frame.day_index()
+    if len(days) == 0:
+        return pd.DataFrame(columns=DAILY_METRIC_COLUMNS)
+    counts = stops - starts
+
+    max_imb = np.fmax.reduceat(frame.imbalance, starts)
+    at_max = frame.imbalance == np.repeat(max_imb, counts)
+    imb_count = np.add.reduceat(at_max.astype(np.int64), starts)
+
+    soc = frame.soc
+    min_soc = np.fmin.reduceat(soc, starts)
+    max_soc = np.fmax.reduceat(soc, starts)
+
+    day_idx = np.repeat(np.arange(len(days)), counts)
+    max_cells = _mode_per_group(frame.max_cell, day_idx, len(days), len(frame.cell_names))
+    min_cells = _mode_per_group(frame.min_cell, day_idx, len(days), len(frame.cell_names))
+
+    return pd.DataFrame({
+        "day": days.astype(np.int64),
+        "date": [day_to_date(d) for d in days],
+        "rows": counts.astype(np.int64),
+        "start_soc": soc[starts],
+        "end_soc": soc[stops - 1],
+        "min_soc": min_soc,
+        "max_soc": max_soc,
+        "max_imbalance": max_imb.astype(np.float64),
+        "imbalance_count": imb_count,
+        "max_cell": [frame.cell_name(c) for c in max_cells],
+        "min_cell": [frame.cell_name(c) for c in min_cells],
+    })
+
+
+def _mode_per_group(codes, group_idx, n_groups, n_cells):
+    """Most frequent code per group (ties: first seen in the group), None where a group has no valid code."""
+    if n_cells == 0:
+        return [None] * n_groups
+    valid = codes != NO_CELL
+    key = group_idx[valid] * n_cells + codes[valid].astype(np.int64)
+    counts = np.bincount(key, minlength=n_groups * n_cells).reshape(n_groups, n_cells)
+    first_pos = np.full(n_groups * n_cells, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first_pos, key, np.flatnonzero(valid))
+    first_pos = first_pos.reshape(n_groups, n_cells)
+
+    # Among the cells with the top count, pick the one seen first
+    tied = counts == counts.max(axis=1, keepdims=True)
+    best = np.where(tied, first_pos, np.iinfo(np.int64).max).argmin(axis=1)
+    has_any = counts.sum(axis=1) > 0
+    return [int(b) if ok else None for b, ok in zip(best, has_any)]
+
+
+# =========================
+# Helpers
+# =========================
+def day_to_date(day) -> datetime.date:
+    return datetime.date(1970, 1, 1) + datetime.timedelta(days=int(day))
+
+
+def most_common_code(codes):
+    """Most frequent cell code ignoring NO_CELL (ties: first seen wins), or None."""
+    codes = codes[codes != NO_CELL]
+    if len(codes) == 0:
+        return None
+    counts = np.bincount(codes.astype(np.int64))
+    winners = counts == counts.max()
+    return int(codes[np.flatnonzero(winners[codes])[0]])
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for Octopus Internal Report exports (CAN / CSV parsed xlsx).
+Only createdAt, the SoC column and the battery*temp*N columns are pulled out
+of the sheet, in row chunks, straight into typed NumPy arrays.
+"""
+
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from export_schemas import TIMESTAMP_COLUMN, detect_schema, fallback_select, header_names
+
+# =========================
+# Configuration
+# =========================
+READ_BACKEND = "auto"  # "auto" | "calamine" | "openpyxl"
+CHUNK_ROWS = 20000  # Rows parsed per chunk
+TEMP_CLIP = (-50, 300)
+
+
+
+@dataclass
+class TelemetryColumns:
+    path: str
+    created_at: np.ndarray  # datetime64[ns], shape (n,)
+    soc: np.ndarray  # float64, shape (n,)
+    temps: np.ndarray  # float32, shape (n, k)
+    temp_columns: list = field(default_factory=list)
+    soc_column: str = ""
+    rows_read: int = 0  # Data rows in the sheet, before dropping invalid ones
+    backend: str = ""
+    schema: str = ""  # export_schemas name the header matched ("fallback" if none)
+    elapsed_s: float = 0.0
+    peak_rss_mb: float | None = None
+
+    def __len__(self):
+        return len(self.created_at)
+
+    @property
+    def nbytes(self):
+        return self.created_at.nbytes + self.soc.nbytes + self.temps.nbytes
+
+    def to_dataframe(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.temps, columns=self.temp_columns)
+        df[self.soc_column] = self.soc
+        df[TIMESTAMP_COLUMN] = self.created_at
+        return df
+
+
+# =========================
+# Helpers
+# =========================
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def select_columns(header):
+    """Return (ts_idx, soc_idx, soc_name, [(temp_idx, temp_name)]) or None if the sheet is unusable."""
+    return fallback_select(header_names(header))
+
+
+def _resolve_backend(backend):
+    if backend != "auto":
+        return backend
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return "openpyxl"
+
+
+def _iter_rows_openpyxl(path):
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        for row in ws.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def _iter_rows_calamine(path):
+    from python_calamine import CalamineWorkbook
+    sheet = CalamineWorkbook.from_path(path).get_sheet_by_index(0)
+    if hasattr(sheet, "iter_rows"):
+        yield from sheet.iter_rows()
+    else:
+        yield from sheet.to_python(skip_empty_area=False)
+
+
+_ROW_ITERATORS = {
+    "openpyxl": _iter_rows_openpyxl,
+    "calamine": _iter_rows_calamine,
+}
+
+
+def parse_timestamps(values, fmt=None):
+    """
+    datetime64[ns] array from createdAt cells. With a known format every
+    cell is parsed with it; cells it does not fit (datetime objects, other
+    text) are re-parsed with inference. Unparseable cells become NaT.
+    """
+    series = pd.Series(values, dtype=object)
+    if fmt is None:
+        return pd.to_datetime(series, errors="coerce").to_numpy("datetime64[ns]")
+    ts = pd.to_datetime(series, format=fmt, errors="coerce").to_numpy("datetime64[ns]")
+    retry = np.isnat(ts) & series.notna().to_numpy()
+    if retry.any():
+        ts[retry] = pd.to_datetime(series[retry], errors="coerce").to_numpy("datetime64[ns]")
+    return ts
+
+
+def _to_float(values, dtype):
+    """One NumPy cast when every cell is a number or None; pd.to_numeric coercion otherwise."""
+    try:
+        return np.asarray(values, dtype=dtype)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype)
+
+
+def _parse_chunk(ts_vals, soc_vals, temp_vals, ts_format=None):
+    ts = parse_timestamps(ts_vals, ts_format)
+    soc = _to_float(soc_vals, np.float64)
+    try:
+        # All temperature columns in one cast: (cells, rows) -> (rows, cells)
+        temps = np.asarray(temp_vals, dtype=np.float32).T
+    except (TypeError, ValueError):
+        temps = np.column_stack([_to_float(col, np.float32) for col in temp_vals])
+    temps = np.ascontiguousarray(temps, dtype=np.float32)
+    np.clip(temps, TEMP_CLIP[0], TEMP_CLIP[1], out=temps)
+
+    keep = ~(np.isnat(ts) | np.isnan(soc))
+    return ts[keep], soc[keep], temps[keep]
+
+
+# =========================
+# Reader
+# =========================
+def read_telemetry(path: str, backend: str = READ_BACKEND, chunk_rows: int = CHUNK_ROWS):
+    """
+    Stream one export and return a TelemetryColumns, or None if the sheet is
+    empty or lacks createdAt / SoC / temperature columns.
+    Rows with an invalid createdAt or SoC are dropped, temperatures are clipped.
+    """
+    started = time.perf_counter()
+    backend = _resolve_backend(backend)
+    rows = _ROW_ITERATORS[backend](path)
+
+    header = next(rows, None)
+    schema, selected = detect_schema(header) if header else (None, None)
+    if selected is None:
+        rows.close()
+        return None
+    ts_idx, soc_idx, soc_name, temps = selected
+    temp_idx = [i for i, _ in temps]
+
+    chunks = []
+    rows_read = 0
+
+    def flush(buf_ts, buf_soc, buf_temps):
+        if buf_ts:
+            chunks.append(_parse_chunk(buf_ts, buf_soc, buf_temps, schema.timestamp_format))
+
+    buf_ts, buf_soc, buf_temps = [], [], [[] for _ in temp_idx]
+    for row in rows:
+        if row is None or len(row) <= ts_idx:
+            continue
+        rows_read += 1
+        width = len(row)
+        buf_ts.append(row[ts_idx])
+        buf_soc.append(row[soc_idx] if soc_idx < width else None)
+        for col, i in zip(buf_temps, temp_idx):
+            col.append(row[i] if i < width else None)
+        if len(buf_ts) >= chunk_rows:
+            flush(buf_ts, buf_soc, buf_temps)
+            buf_ts, buf_soc, buf_temps = [], [], [[] for _ in temp_idx]
+    flush(buf_ts, buf_soc, buf_temps)
+
+    if chunks:
+        created_at = np.concatenate([c[0] for c in chunks])
+        soc = np.concatenate([c[1] for c in chunks])
+        temp_matrix = np.concatenate([c[2] for c in chunks])
+    else:
+        created_at = np.empty(0, dtype="datetime64[ns]")
+        soc = np.empty(0, dtype=np.float64)
+        temp_matrix = np.empty((0, len(temp_idx)), dtype=np.float32)
+
+    return TelemetryColumns(
+        path=path,
+        created_at=created_at,
+        soc=soc,
+        temps=temp_matrix,
+        temp_columns=[n for _, n in temps],
+        soc_column=soc_name,
+        rows_read=rows_read,
+        backend=backend,
+        schema=schema.name,
+        elapsed_s=time.perf_counter() - started,
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def read_first_timestamp(path: str, backend: str = READ_BACKEND):
+    """
+    First (top-most) valid createdAt of an export as datetime64[ns], or None.
+    Streams only until that row; parsed with the detected schema's format.
+    """
+    rows = _ROW_ITERATORS[_resolve_backend(backend)](path)
+    try:
+        header = next(rows, None)
+        schema, _ = detect_schema(header) if header else (None, None)
+        names = header_names(header or ())
+        if TIMESTAMP_COLUMN not in names:
+            return None
+        ts_idx = names.index(TIMESTAMP_COLUMN)
+        for row in rows:
+            if row is None or len(row) <= ts_idx or row[ts_idx] is None:
+                continue
+            ts = parse_timestamps([row[ts_idx]], schema.timestamp_format)[0]
+            if not np.isnat(ts):
+                return ts
+        return None
+    finally:
+        rows.close()
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    for p in sys.argv[1:]:
+        cols = read_telemetry(p)
+        if cols is None:
+            print(f"{os.path.basename(p)}: no usable columns")
+            continue
+        mem = f", peak RSS {cols.peak_rss_mb:.0f} MB" if cols.peak_rss_mb is not None else ""
+        print(
+            f"{os.path.basename(p)}: {len(cols)}/{cols.rows_read} rows, {len(cols.temp_columns)} temp cols, "
+            f"{cols.nbytes / 1e6:.2f} MB arrays, {cols.elapsed_s:.2f}s ({cols.backend}){mem}"
+        )
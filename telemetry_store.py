@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Local fleet telemetry store (SQLite).
+Each downloaded export is ingested once into per-(file, day) columnar blocks
+(timestamps, SoC, float32 temperature matrix as raw array bytes) plus its
+per-day metrics, indexed on vehicle, IMEI and day. Readers pull any
+vehicle/date range back as a TelemetryFrame without touching the xlsx files.
+
+The store runs in WAL mode, so it is single-host: processes on one machine
+may share it (OCTOPUS_STORE), but it must not sit on a network share used
+by several hosts. Each host keeps its own store.
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+
+from telemetry_reader import read_telemetry, TelemetryColumns, peak_rss_mb
+from telemetry_frame import TelemetryFrame, daily_metrics, DAILY_METRIC_COLUMNS
+
+# =========================
+# Configuration
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_PATH = os.environ.get("OCTOPUS_STORE", os.path.join(BASE_DIR, "telemetry_store.sqlite"))  # Local disk only (WAL)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id     INTEGER PRIMARY KEY,
+    vehicle     TEXT NOT NULL,
+    imei        TEXT,
+    path        TEXT NOT NULL UNIQUE,
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    soc_column  TEXT,
+    cell_names  TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    rows_read   INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_vehicle ON files(vehicle);
+
+CREATE TABLE IF NOT EXISTS blocks (
+    file_id   INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE,
+    vehicle   TEXT NOT NULL,
+    imei      TEXT,
+    day       INTEGER NOT NULL,
+    first_row INTEGER NOT NULL,
+    rows      INTEGER NOT NULL,
+    ts        BLOB NOT NULL,
+    soc       BLOB NOT NULL,
+    temps     BLOB NOT NULL,
+    PRIMARY KEY (file_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_blocks_vehicle_day ON blocks(vehicle, day);
+CREATE INDEX IF NOT EXISTS idx_blocks_imei_day ON blocks(imei, day);
+
+CREATE TABLE IF NOT EXISTS daily_metrics (
+    file_id         INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE,
+    vehicle         TEXT NOT NULL,
+    imei            TEXT,
+    day             INTEGER NOT NULL,
+    date            TEXT NOT NULL,
+    rows            INTEGER NOT NULL,
+    start_soc       REAL,
+    end_soc         REAL,
+    min_soc         REAL,
+    max_soc         REAL,
+    max_imbalance   REAL,
+    imbalance_count INTEGER,
+    max_cell        TEXT,
+    min_cell        TEXT,
+    PRIMARY KEY (file_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_daily_vehicle_day ON daily_metrics(vehicle, day);
+"""
+
+
+# =========================
+# Helpers
+# =========================
+def imei_from_filename(path):
+    match = re.search(r'Parsed_(\d+)', os.path.basename(path))
+    return match.group(1) if match else None
+
+
+def to_day(value):
+    """date/datetime/str -> day number since epoch (None passes through)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return (value - datetime.date(1970, 1, 1)).days
+
+
+def _cell_key(name):
+    # batteryBmsTemperature1 and battery_bms_temperature_1 are the same cell
+    return re.sub(r'[^0-9a-z]', '', name.lower())
+
+
+def _align_temps(blocks):
+    """Stack temperature blocks whose cell columns may differ in naming/order."""
+    names, keys = [], {}
+    for cell_names, _ in blocks:
+        for n in cell_names:
+            k = _cell_key(n)
+            if k not in keys:
+                keys[k] = len(names)
+                names.append(n)
+    if all(tuple(c) == tuple(names) for c, _ in blocks):
+        return names, np.concatenate([t for _, t in blocks])
+    out = []
+    for cell_names, temps in blocks:
+        aligned = np.full((len(temps), len(names)), np.nan, dtype=np.float32)
+        for j, n in enumerate(cell_names):
+            aligned[:, keys[_cell_key(n)]] = temps[:, j]
+        out.append(aligned)
+    return names, np.concatenate(out)
+
+
+# =========================
+# Store
+# =========================
+class TelemetryStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Single-host: WAL's shared-memory index is per machine
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------- ingest ----------
+    def _file_row(self, path):
+        return self._conn.execute(
+            "SELECT file_id, size, mtime, cell_names, soc_column, rows_read FROM files WHERE path = ?",
+            (os.path.abspath(path),),
+        ).fetchone()
+
+    def is_current(self, path):
+        st = os.stat(path)
+        with self._lock:
+            row = self._file_row(path)
+        return row is not None and row[1] == st.st_size and row[2] == st.st_mtime
+
+    def stored_rows(self, path):
+        """Data rows of a stored, current export (rows_read), or None if it is not in the store."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._file_row(path)
+        if row is None or row[1] != st.st_size or row[2] != st.st_mtime:
+            return None
+        return row[5]
+
+    def ingest_file(self, path, vehicle=None, cols=None, force=False):
+        """
+        Ingest one export (no-op if the same path/size/mtime is already stored).
+        Returns the number of rows stored, 0 if skipped or unusable.
+        """
+        path = os.path.abspath(path)
+        if not force and self.is_current(path):
+            return 0
+        if cols is None:
+            cols = read_telemetry(path)
+        vehicle = vehicle or os.path.basename(os.path.dirname(path))
+        st = os.stat(path)
+        imei = imei_from_filename(path)
+        if cols is None:
+            cols = TelemetryColumns(path, np.empty(0, "datetime64[ns]"), np.empty(0), np.empty((0, 0), np.float32))
+
+        frame = TelemetryFrame.from_columns(cols)
+        metrics = daily_metrics(frame)
+        days, starts, stops = frame.day_index()
+        first_rows = frame.first_rows()
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            cur = self._conn.execute(
+                "INSERT INTO files (vehicle, imei, path, size, mtime, soc_column, cell_names, rows, rows_read, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (vehicle, imei, path, st.st_size, st.st_mtime, cols.soc_column, json.dumps(list(frame.cell_names)),
+                 len(frame), cols.rows_read, datetime.datetime.now().isoformat(timespec="seconds")),
+            )
+            file_id = cur.lastrowid
+            self._conn.executemany(
+                "INSERT INTO blocks (file_id, vehicle, imei, day, first_row, rows, ts, soc, temps) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (file_id, vehicle, imei, int(d), int(first_rows[int(d)]), int(b - a),
+                     frame.created_at[a:b].view(np.int64).tobytes(),
+                     frame.soc[a:b].tobytes(),
+                     np.ascontiguousarray(frame.temps[a:b]).tobytes())
+                    for d, a, b in zip(days, starts, stops)
+                ],
+            )
+            self._conn.executemany(
+                f"INSERT INTO daily_metrics (file_id, vehicle, imei, {', '.join(DAILY_METRIC_COLUMNS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(DAILY_METRIC_COLUMNS))})",
+                [
+                    (file_id, vehicle, imei, int(m.day), m.date.isoformat(), int(m.rows), float(m.start_soc),
+                     float(m.end_soc), float(m.min_soc), float(m.max_soc), float(m.max_imbalance),
+                     int(m.imbalance_count), m.max_cell, m.min_cell)
+                    for m in metrics.itertuples(index=False)
+                ],
+            )
+        return len(frame)
+
+    def ingest_folder(self, vehicle_folder):
+        vehicle = os.path.basename(vehicle_folder)
+        total = 0
+        for f in sorted(os.listdir(vehicle_folder)):
+            if f.lower().endswith(".xlsx"):
+                total += self.ingest_file(os.path.join(vehicle_folder, f), vehicle)
+        return total
+
+    def ingest_tree(self, download_root):
+        total = 0
+        for d in sorted(os.listdir(download_root)):
+            folder = os.path.join(download_root, d)
+            if os.path.isdir(folder):
+                total += self.ingest_folder(folder)
+        return total
+
+    def forget_file(self, path):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (os.path.abspath(path),))
+
+    # ---------- read ----------
+    def read_file(self, path, vehicle=None):
+        """
+        TelemetryColumns for one export: from the store if it is current,
+        otherwise parsed from the xlsx and ingested on the way.
+        """
+        path = os.path.abspath(path)
+        if not self.is_current(path):
+            cols = read_telemetry(path)
+            self.ingest_file(path, vehicle, cols=cols, force=True)
+            return cols
+        with self._lock:
+            file_id, _, _, cell_names, soc_column, rows_read = self._file_row(path)
+            blocks = self._conn.execute(
+                "SELECT ts, soc, temps, rows FROM blocks WHERE file_id = ? ORDER BY first_row", (file_id,)
+            ).fetchall()
+        if not blocks and not json.loads(cell_names):
+            return None
+        created_at, soc, temps = self._decode(blocks, len(json.loads(cell_names)))
+        return TelemetryColumns(
+            path=path, created_at=created_at, soc=soc, temps=temps,
+            temp_columns=json.loads(cell_names), soc_column=soc_column,
+            rows_read=rows_read, backend="store", peak_rss_mb=peak_rss_mb(),
+        )
+
+    @staticmethod
+    def _decode(blocks, n_cells):
+        if not blocks:
+            return np.empty(0, "datetime64[ns]"), np.empty(0), np.empty((0, n_cells), np.float32)
+        ts = np.concatenate([np.frombuffer(b[0], dtype=np.int64) for b in blocks]).view("datetime64[ns]")
+        soc = np.concatenate([np.frombuffer(b[1], dtype=np.float64) for b in blocks])
+        temps = np.concatenate([np.frombuffer(b[2], dtype=np.float32).reshape(b[3], n_cells) for b in blocks])
+        return ts, soc, temps
+
+    def _select_blocks(self, vehicle=None, imei=None, start=None, end=None):
+        clauses, params = [], []
+        if vehicle is not None:
+            clauses.append("b.vehicle = ?")
+            params.append(vehicle)
+        if imei is not None:
+            clauses.append("b.imei = ?")
+            params.append(str(imei))
+        if start is not None:
+            clauses.append("b.day >= ?")
+            params.append(to_day(start))
+        if end is not None:
+            clauses.append("b.day <= ?")
+            params.append(to_day(end))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT b.day, b.rows, b.ts, b.soc, b.temps, f.cell_names, b.file_id "
+                f"FROM blocks b JOIN files f USING (file_id) {where} ORDER BY b.day, b.file_id",
+                params,
+            ).fetchall()
+
+    def query(self, vehicle=None, imei=None, start=None, end=None, dedupe=True):
+        """
+        TelemetryFrame for a vehicle and/or IMEI over [start, end] (dates, inclusive),
+        or None if nothing is stored. With dedupe, a day exported by several files
+        comes from the file with the most rows that day.
+        """
+        rows = self._select_blocks(vehicle, imei, start, end)
+        if dedupe:
+            fullest = {}
+            for r in rows:
+                if r[0] not in fullest or r[1] > fullest[r[0]][1]:
+                    fullest[r[0]] = r
+            rows = [fullest[d] for d in sorted(fullest)]
+        if not rows:
+            return None
+        parts = []
+        for day, n, ts, soc, temps, cell_names, _ in rows:
+            names = json.loads(cell_names)
+            parts.append((
+                np.frombuffer(ts, dtype=np.int64),
+                np.frombuffer(soc, dtype=np.float64),
+                names,
+                np.frombuffer(temps, dtype=np.float32).reshape(n, len(names)),
+            ))
+        cell_names, temps = _align_temps([(p[2], p[3]) for p in parts])
+        created_at = np.concatenate([p[0] for p in parts]).view("datetime64[ns]")
+        soc = np.concatenate([p[1] for p in parts])
+        source = f"store:{vehicle or imei}"
+        return TelemetryFrame(created_at, soc, temps, cell_names, source=source)
+
+    def daily_metrics(self, vehicles=None, start=None, end=None) -> pd.DataFrame:
+        """Cached per-file, per-day metrics rows (one per vehicle/day after de-duplication)."""
+        clauses, params = [], []
+        if vehicles:
+            clauses.append(f"vehicle IN ({', '.join('?' * len(vehicles))})")
+            params.extend(vehicles)
+        if start is not None:
+            clauses.append("day >= ?")
+            params.append(to_day(start))
+        if end is not None:
+            clauses.append("day <= ?")
+            params.append(to_day(end))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            df = pd.read_sql_query(f"SELECT * FROM daily_metrics {where} ORDER BY vehicle, day, rows DESC", self._conn, params=params)
+        return df.drop_duplicates(subset=["vehicle", "day"], keep="first").reset_index(drop=True)
+
+    def coverage(self, vehicle):
+        """Set of dates with at least one stored row for the vehicle."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT day FROM blocks WHERE vehicle = ?", (vehicle,)).fetchall()
+        return {datetime.date(1970, 1, 1) + datetime.timedelta(days=r[0]) for r in rows}
+
+    def vehicles(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT vehicle FROM files ORDER BY vehicle")]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store(path=STORE_PATH):
+    """Process-wide shared store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TelemetryStore(path)
+        return _store
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    import time
+    store = get_store()
+    if len(sys.argv) >= 2 and sys.argv[1] == "ingest":
+        root = sys.argv[2] if len(sys.argv) > 2 else os.path.join(BASE_DIR, "download")
+        t = time.perf_counter()
+        n = store.ingest_tree(root)
+        print(f"Ingested {n} new rows in {time.perf_counter() - t:.1f}s")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "query":
+        vehicle = sys.argv[2]
+        start = sys.argv[3] if len(sys.argv) > 3 else None
+        end = sys.argv[4] if len(sys.argv) > 4 else None
+        t = time.perf_counter()
+        frame = store.query(vehicle, start=start, end=end)
+        ms = (time.perf_counter() - t) * 1000
+        if frame is None:
+            print("No data")
+        else:
+            print(f"{len(frame)} rows, {len(frame.day_index()[0])} day(s), {len(frame.cell_names)} cells in {ms:.1f} ms")
+    else:
+        print("usage: telemetry_store.py ingest [download_root] | query VEHICLE [START END]")
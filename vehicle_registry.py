@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Vehicle registry: the one parser of vehicle_list.txt.
+Each line becomes a typed Vehicle (registration, IMEI, start date, active
+flag); the registry is loaded once per process and reloaded only when the
+file changes. Every phase scopes its work to registry.active() so retired or
+stray folders under download/ are never scanned.
+
+    EMCH-7851, Start date 19Aug2025
+    EMCH-5016, Start date 20Aug2025, IMEI 861409078038958
+    EMCH-1200, Start date 01Jun2025, inactive
+    # comment lines and blank lines are ignored
+"""
+
+import os
+import sys
+import logging
+import datetime
+import threading
+from dataclasses import dataclass
+
+from telemetry_store import imei_from_filename
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Configuration
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VEHICLE_LIST_PATH = os.path.join(BASE_DIR, "vehicle_list.txt")
+START_DATE_FORMAT = "%d%b%Y"  # "Start date 19Aug2025"
+INACTIVE_MARKERS = ("inactive", "retired")
+
+
+# =========================
+# Records
+# =========================
+@dataclass(frozen=True)
+class Vehicle:
+    reg_no: str
+    start_date: datetime.date
+    imei: str | None = None
+    active: bool = True
+
+    def folder(self, download_root):
+        return os.path.join(download_root, self.reg_no)
+
+    def window(self, end=None):
+        """Phase 1 request window: start date → end (default yesterday)."""
+        end = end or datetime.date.today() - datetime.timedelta(days=1)
+        return self.start_date, end
+
+
+def parse_line(line):
+    """One vehicle_list.txt line → Vehicle, None for blank/comment lines. Raises ValueError."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    reg_no, *fields = (f.strip() for f in line.split(","))
+    if not reg_no:
+        raise ValueError("missing registration number")
+    start_date, imei, active = None, None, True
+    for field in filter(None, fields):
+        key = field.lower()
+        if key.startswith("start date"):
+            start_date = datetime.datetime.strptime(field[len("start date"):].strip(), START_DATE_FORMAT).date()
+        elif key.startswith("imei"):
+            imei = field[len("imei"):].strip(" :") or None
+        elif key in INACTIVE_MARKERS:
+            active = False
+        elif key == "active":
+            active = True
+        else:
+            raise ValueError(f"unknown field {field!r}")
+    if start_date is None:
+        raise ValueError("missing 'Start date'")
+    return Vehicle(reg_no, start_date, imei, active)
+
+
+# =========================
+# Registry
+# =========================
+class VehicleRegistry:
+    def __init__(self, vehicles=(), path=None):
+        self.path = path
+        self._vehicles = {}
+        for v in vehicles:
+            if v.reg_no in self._vehicles:
+                logger.warning(f"Duplicate vehicle {v.reg_no} in {path or 'registry'} — keeping the first entry")
+                continue
+            self._vehicles[v.reg_no] = v
+        self._imei_cache = {}
+        self._imei_lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path=VEHICLE_LIST_PATH):
+        vehicles = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    v = parse_line(line)
+                except ValueError as e:
+                    logger.warning(f"Skipping invalid line: {line.strip()} ({e})")
+                    continue
+                if v:
+                    vehicles.append(v)
+        return cls(vehicles, path)
+
+    def __len__(self):
+        return len(self._vehicles)
+
+    def __iter__(self):
+        return iter(self._vehicles.values())
+
+    def __contains__(self, reg_no):
+        return reg_no in self._vehicles
+
+    def get(self, reg_no):
+        return self._vehicles.get(reg_no)
+
+    def active(self):
+        return [v for v in self._vehicles.values() if v.active]
+
+    def active_ids(self):
+        return [v.reg_no for v in self.active()]
+
+    def active_folders(self, download_root):
+        """Existing download folders of active vehicles, in registry order."""
+        return [v.folder(download_root) for v in self.active() if os.path.isdir(v.folder(download_root))]
+
+    def imei(self, reg_no, download_root=None):
+        """
+        Configured IMEI, else the one in the vehicle's export file names
+        (…_Parsed_<imei>_…), looked up once and cached.
+        """
+        v = self._vehicles.get(reg_no)
+        if v is None:
+            return None
+        if v.imei or download_root is None:
+            return v.imei
+        with self._imei_lock:
+            if reg_no not in self._imei_cache:
+                folder = v.folder(download_root)
+                names = os.listdir(folder) if os.path.isdir(folder) else []
+                self._imei_cache[reg_no] = next(filter(None, map(imei_from_filename, names)), None)
+            return self._imei_cache[reg_no]
+
+
+_registries = {}  # abs path -> (mtime, VehicleRegistry)
+_registries_lock = threading.Lock()
+
+
+def get_registry(path=VEHICLE_LIST_PATH):
+    """Process-wide registry for `path`; reparsed only when the file's mtime changes."""
+    path = os.path.abspath(path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        logger.error(f"{os.path.basename(path)} not found.")
+        return VehicleRegistry(path=path)
+    with _registries_lock:
+        cached = _registries.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _registries[path] = (mtime, VehicleRegistry.from_file(path))
+        return cached[1]
+
+
+def active_vehicles(path=VEHICLE_LIST_PATH):
+    return get_registry(path).active()
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    registry = get_registry(sys.argv[1] if len(sys.argv) > 1 else VEHICLE_LIST_PATH)
+    for v in registry:
+        print(f"{v.reg_no:<16} {v.start_date:%d-%b-%Y}  {v.imei or '-':<16} {'active' if v.active else 'inactive'}")
+    print(f"{len(registry.active())}/{len(registry)} active", file=sys.stderr)
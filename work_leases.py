@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Cross-process work leases (SQLite) for running the pipeline from several
+processes or hosts that share the workspace.
+A lease is a (stage, key) row — e.g. ("phase3.report", "EMCH-5016") —
+owned by one session until it expires. Owners renew their leases from a
+heartbeat thread, so a crashed process's vehicles become claimable again
+after LEASE_TTL_S. Finished work is marked done with a fingerprint of its
+inputs; other sessions skip it until the inputs change.
+
+The lease database uses SQLite's rollback journal, not WAL: WAL needs a
+shared-memory index that only works between processes on one host. Across
+hosts, put LEASE_DB_PATH on a share whose file locks work (SMB, NFS with a
+lock manager); where they do not, give each host its own OCTOPUS_SHARD
+instead of sharing leases.
+
+Vehicles can also be split statically: OCTOPUS_SHARD="i/n" keeps only the
+vehicles whose stable hash falls in shard i of n.
+
+    python work_leases.py [--stage phase3.report]   # who holds what
+"""
+
+import os
+import sys
+import time
+import uuid
+import zlib
+import socket
+import sqlite3
+import hashlib
+import argparse
+import datetime
+import threading
+
+# =========================
+# Configuration
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LEASE_DB_PATH = os.environ.get("OCTOPUS_LEASES", os.path.join(BASE_DIR, "work_leases.sqlite"))
+LEASE_TTL_S = 10 * 60  # A lease not renewed for this long is free again (crashed owner)
+HEARTBEAT_S = 60  # Renewal interval of held leases
+SHARD = os.environ.get("OCTOPUS_SHARD", "")  # "i/n" (0-based) restricts this process to one shard
+
+CLAIMED, HELD, DONE = "claimed", "held", "done"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    stage       TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    owner       TEXT,
+    host        TEXT,
+    pid         INTEGER,
+    expires_at  REAL NOT NULL DEFAULT 0,
+    done_at     REAL,
+    fingerprint TEXT,
+    PRIMARY KEY (stage, key)
+);
+"""
+
+
+# =========================
+# Helpers
+# =========================
+def parse_shard(spec):
+    """"i/n" -> (i, n); "" or None -> None."""
+    if not spec:
+        return None
+    index, count = (int(x) for x in str(spec).split("/"))
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec!r}: expected i/n with 0 <= i < n")
+    return index, count
+
+
+def shard_ids(ids, shard=SHARD):
+    """The ids in shard (i, n) or "i/n", by a hash that is stable across processes and hosts."""
+    shard = parse_shard(shard) if isinstance(shard, str) else shard
+    if shard is None:
+        return list(ids)
+    index, count = shard
+    return [v for v in ids if zlib.crc32(v.encode("utf-8")) % count == index]
+
+
+def input_fingerprint(paths, *extra):
+    """Hash of file names, sizes and mtimes (missing files by name only) plus any extra values."""
+    h = hashlib.sha256()
+    for p in sorted(paths):
+        try:
+            st = os.stat(p)
+            h.update(f"{os.path.basename(p)}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+        except OSError:
+            h.update(f"{os.path.basename(p)}|-\n".encode("utf-8"))
+    for x in extra:
+        h.update(f"{x}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+# =========================
+# Leases
+# =========================
+class LeaseSession:
+    """
+    One owner's leases within a stage. acquire() returns CLAIMED, HELD (a
+    live lease of another owner) or DONE (completed with the same
+    fingerprint). Use as a context manager: leases still held on exit are
+    released, and the heartbeat stops.
+    """
+
+    def __init__(self, stage, path=None, ttl_s=LEASE_TTL_S, heartbeat_s=HEARTBEAT_S):
+        self.stage = stage
+        self.ttl_s = ttl_s
+        self.heartbeat_s = heartbeat_s
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+        self._conn = sqlite3.connect(path or LEASE_DB_PATH, check_same_thread=False, timeout=30,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=DELETE")  # Not WAL: leases may be shared across hosts
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _beat(self):
+        while not self._stop.wait(self.heartbeat_s):
+            try:
+                self.renew()
+            except sqlite3.Error:
+                pass  # Retried on the next beat; the TTL leaves several beats of slack
+
+    def acquire(self, key, fingerprint=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT owner, expires_at, done_at, fingerprint FROM leases WHERE stage = ? AND key = ?",
+                    (self.stage, key)).fetchone()
+                if row:
+                    owner, expires_at, done_at, done_fp = row
+                    if owner and owner != self.owner and expires_at > now:
+                        self._conn.execute("COMMIT")
+                        return HELD
+                    if done_at and fingerprint is not None and done_fp == fingerprint:
+                        self._conn.execute("COMMIT")
+                        return DONE
+                self._conn.execute(
+                    "INSERT INTO leases (stage, key, owner, host, pid, expires_at, done_at, fingerprint) "
+                    "VALUES (?, ?, ?, ?, ?, ?, NULL, NULL) "
+                    "ON CONFLICT(stage, key) DO UPDATE SET owner = excluded.owner, host = excluded.host, "
+                    "pid = excluded.pid, expires_at = excluded.expires_at, done_at = NULL, fingerprint = NULL",
+                    (self.stage, key, self.owner, self.host, os.getpid(), now + self.ttl_s))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.held.add(key)
+            return CLAIMED
+
+    def renew(self):
+        with self._lock:
+            if self.held:
+                self._conn.execute("UPDATE leases SET expires_at = ? WHERE stage = ? AND owner = ?",
+                                   (time.time() + self.ttl_s, self.stage, self.owner))
+
+    def complete(self, key, fingerprint=None):
+        """Mark the work done (skipped by later acquire() with the same fingerprint) and release it."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE leases SET owner = NULL, expires_at = 0, done_at = ?, fingerprint = ? "
+                "WHERE stage = ? AND key = ? AND owner = ?",
+                (time.time(), fingerprint, self.stage, key, self.owner))
+            self.held.discard(key)
+
+    def release(self, key):
+        """Give the lease up without marking the work done (failed, or not started)."""
+        with self._lock:
+            self._conn.execute("UPDATE leases SET owner = NULL, expires_at = 0 WHERE stage = ? AND key = ? "
+                               "AND owner = ?", (self.stage, key, self.owner))
+            self.held.discard(key)
+
+    def close(self):
+        self._stop.set()
+        for key in list(self.held):
+            self.release(key)
+        with self._lock:
+            self._conn.close()
+
+
+def list_leases(path=None, stage=None):
+    conn = sqlite3.connect(path or LEASE_DB_PATH, timeout=30)
+    try:
+        conn.executescript(SCHEMA)
+        sql = "SELECT stage, key, owner, expires_at, done_at FROM leases"
+        rows = conn.execute(sql + " WHERE stage = ? ORDER BY key" if stage else sql + " ORDER BY stage, key",
+                            (stage,) if stage else ()).fetchall()
+    finally:
+        conn.close()
+    return rows
+
+
+# =========================
+# Standalone
+# =========================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Show work leases")
+    ap.add_argument("--stage")
+    ap.add_argument("--db", default=LEASE_DB_PATH)
+    args = ap.parse_args()
+
+    now = time.time()
+    for stage, key, owner, expires_at, done_at in list_leases(args.db, args.stage):
+        if owner and expires_at > now:
+            state = f"held by {owner} ({expires_at - now:.0f}s left)"
+        elif owner:
+            state = f"expired ({owner})"
+        elif done_at:
+            state = f"done {datetime.datetime.fromtimestamp(done_at):%Y-%m-%d %H:%M}"
+        else:
+            state = "free"
+        print(f"{stage:<16} {key:<16} {state}")
+    if SHARD:
+        print(f"This process: shard {SHARD}", file=sys.stderr)